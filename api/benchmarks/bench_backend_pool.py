@@ -0,0 +1,94 @@
+"""
+Benchmark: vision call latency through VisionService with one backend, a
+least-outstanding-requests pool, and the pool with hedging, against local fake
+Ollama servers with different latency profiles. The pool also lists a dead
+backend to show failover and health-probe removal.
+
+    python benchmarks/bench_backend_pool.py
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+from contextlib import ExitStack
+import httpx
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from config import AppConfig
+from services.vision_service import VisionService
+from benchmarks.fakes import FakeServer, create_fake_ollama
+
+REQUESTS = 300
+CONCURRENCY = 6
+DEAD_URL = "http://127.0.0.1:18449"  # Nothing listens here
+
+# name -> (port, fake Ollama settings)
+BACKENDS = {
+    "steady": (18441, dict(base_latency_ms=150, jitter_ms=50, max_parallel=2)),
+    "hiccups": (18442, dict(base_latency_ms=150, jitter_ms=50, stall_probability=0.05, stall_ms=2000, max_parallel=2)),
+    "slow": (18443, dict(base_latency_ms=450, jitter_ms=100, max_parallel=2)),
+}
+
+SCENARIOS = [
+    ("single backend", "http://127.0.0.1:18442", 0),
+    ("pool", "http://127.0.0.1:18441,http://127.0.0.1:18442,http://127.0.0.1:18443|0.5," + DEAD_URL, 0),
+    ("pool + hedge p90", "http://127.0.0.1:18441,http://127.0.0.1:18442,http://127.0.0.1:18443|0.5," + DEAD_URL, 90),
+]
+
+
+def make_image() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (448, 448), (120, 80, 40)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+async def run_scenario(hosts: str, hedge_percentile: float, image: bytes):
+    config = AppConfig(OLLAMA_HOSTS=hosts, OLLAMA_HEDGE_PERCENTILE=hedge_percentile, OLLAMA_HEALTH_INTERVAL=1)
+    async with httpx.AsyncClient(timeout=None) as client:
+        service = VisionService(config, client)
+        service.backends.start()
+        latencies = []
+        queue = asyncio.Queue()
+        for _ in range(REQUESTS):
+            queue.put_nowait(None)
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                await service.analyze_image(image)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(CONCURRENCY)])
+        elapsed = time.perf_counter() - start
+        await service.backends.stop()
+        return np.array(latencies), elapsed, service.backends.stats()
+
+
+def main():
+    image = make_image()
+    print(f"{REQUESTS} requests, concurrency {CONCURRENCY}")
+    print(f"{'scenario':>17} | {'p50 ms':>6} | {'p95 ms':>6} | {'p99 ms':>6} | {'max ms':>6} | {'req/s':>5} | {'hedges':>6} | requests per backend")
+    print("-" * 110)
+
+    with ExitStack() as stack:
+        for port, settings in BACKENDS.values():
+            stack.enter_context(FakeServer(create_fake_ollama(**settings), port))
+
+        for name, hosts, hedge in SCENARIOS:
+            latencies, elapsed, stats = asyncio.run(run_scenario(hosts, hedge, image))
+            names = {f"http://127.0.0.1:{port}": n for n, (port, _) in BACKENDS.items()}
+            spread = ", ".join(f"{names.get(b['url'], 'dead')}={b['requests']}" for b in stats["backends"])
+            print(
+                f"{name:>17} | {np.percentile(latencies, 50):>6.0f} | {np.percentile(latencies, 95):>6.0f} | "
+                f"{np.percentile(latencies, 99):>6.0f} | {latencies.max():>6.0f} | {REQUESTS / elapsed:>5.1f} | "
+                f"{stats['hedges']:>6} | {spread}"
+            )
+
+
+if __name__ == "__main__":
+    main()
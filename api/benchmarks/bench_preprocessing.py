@@ -0,0 +1,70 @@
+"""
+Benchmark: end-to-end vision call latency vs. upload resolution, with and
+without the preprocessing stage, against a fake Ollama whose prompt-eval
+time grows with the number of vision tokens.
+
+    python benchmarks/bench_preprocessing.py
+"""
+import base64
+import io
+import os
+import sys
+import time
+import httpx
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from config import AppConfig
+from services.image_preprocessor import preprocess_image
+from benchmarks.fakes import FakeServer, create_fake_ollama
+
+RESOLUTIONS = [(640, 480), (1280, 960), (2016, 1512), (3024, 4032), (4000, 3000)]
+REPEAT = 3
+PORT = 18434
+
+
+def make_photo(width: int, height: int) -> bytes:
+    """Build a noisy JPEG roughly the size of a phone photo at this resolution."""
+    rng = np.random.default_rng(width * height)
+    pixels = (rng.random((height, width, 3)) * 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def call_vision(client: httpx.Client, url: str, image_bytes: bytes) -> float:
+    """POST one image to /api/generate and return the wall time in ms."""
+    start = time.perf_counter()
+    payload = {"model": "fake", "prompt": "", "images": [base64.b64encode(image_bytes).decode("utf-8")]}
+    client.post(f"{url}/api/generate", json=payload).raise_for_status()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    config = AppConfig()
+    print(f"{'resolution':>11} | {'raw MB':>6} | {'sent KB':>7} | {'tokens':>13} | {'prep ms':>7} | {'raw ms':>7} | {'prepped ms':>10}")
+    print("-" * 82)
+
+    with FakeServer(create_fake_ollama(), PORT) as server, httpx.Client(timeout=None) as client:
+        for width, height in RESOLUTIONS:
+            photo = make_photo(width, height)
+            raw_ms, prep_ms, prepped_ms = [], [], []
+
+            for _ in range(REPEAT):
+                raw_ms.append(call_vision(client, server.url, photo))
+
+                start = time.perf_counter()
+                prepared = preprocess_image(photo, config.IMAGE_MAX_SIDE, config.IMAGE_MAX_PIXELS, config.IMAGE_JPEG_QUALITY)
+                prep_ms.append((time.perf_counter() - start) * 1000)
+                prepped_ms.append(prep_ms[-1] + call_vision(client, server.url, prepared.data))
+
+            tokens = f"{prepared.original_tokens}->{prepared.tokens}"
+            print(
+                f"{width:>5}x{height:<5} | {len(photo) / 1e6:>6.2f} | {prepared.file_size / 1e3:>7.0f} | {tokens:>13} | "
+                f"{np.median(prep_ms):>7.1f} | {np.median(raw_ms):>7.0f} | {np.median(prepped_ms):>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Microbenchmark: VectorIndex vs. per-query sklearn cosine_similarity.
+
+Compares the old path (cosine_similarity + argmax / full argsort for top 5)
+with the pre-normalized matrix product and argpartition top-k, on random
+catalogs from today's 675 aliases up to a few hundred thousand.
+
+Requires scikit-learn for the baseline (not a runtime dependency):
+
+    pip install scikit-learn
+    python benchmarks/bench_vector_search.py
+"""
+import os
+import sys
+import time
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from services.vector_index import VectorIndex
+
+CATALOG_SIZES = [675, 10_000, 100_000, 300_000]
+DIM = 384
+BATCH_SIZE = 32
+TOP_K = 5
+
+
+def time_call(fn, repeat: int) -> float:
+    """Return the median wall time of fn() in milliseconds."""
+    fn()  # Warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'aliases':>8} | {'case':<16} | {'sklearn ms':>10} | {'index ms':>9} | {'speedup':>7}")
+    print("-" * 62)
+
+    for size in CATALOG_SIZES:
+        embeddings = rng.standard_normal((size, DIM)).astype(np.float32)
+        query = rng.standard_normal((1, DIM)).astype(np.float32)
+        batch = rng.standard_normal((BATCH_SIZE, DIM)).astype(np.float32)
+        index = VectorIndex(embeddings)
+        repeat = 50 if size <= 10_000 else 3
+
+        cases = {
+            "best, 1 query": (
+                lambda: np.argmax(cosine_similarity(query, embeddings)[0]),
+                lambda: index.best(query),
+            ),
+            f"top{TOP_K}, 1 query": (
+                lambda: np.argsort(cosine_similarity(query, embeddings)[0])[::-1][:TOP_K],
+                lambda: index.top_k(query, TOP_K),
+            ),
+            f"best, {BATCH_SIZE} queries": (
+                lambda: [np.argmax(cosine_similarity(q[None, :], embeddings)[0]) for q in batch],
+                lambda: index.best(batch),
+            ),
+        }
+
+        for name, (baseline, candidate) in cases.items():
+            baseline_ms = time_call(baseline, repeat)
+            candidate_ms = time_call(candidate, repeat)
+            print(f"{size:>8} | {name:<16} | {baseline_ms:>10.3f} | {candidate_ms:>9.3f} | {baseline_ms / candidate_ms:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
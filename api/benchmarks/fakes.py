@@ -0,0 +1,206 @@
+"""
+Local stand-ins for the Ollama vision backend and the embedding model server,
+used by the benchmarks.
+
+The fake Ollama decodes just the image header to find its size, then sleeps
+for a base latency plus a per-vision-token cost. This mimics prompt-eval time
+growing with image resolution without needing a GPU. The replay variant
+answers each image with the response logged for it instead.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from PIL import Image
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from services.image_preprocessor import dhash, estimate_vision_tokens
+
+DEFAULT_RESPONSE = {"type": "backpack", "color": "black", "material": "nylon"}
+
+
+def make_response(items: int) -> dict:
+    """A vision result with the given number of items, for testing payload size."""
+    colors = ["black", "red", "blue", "silver", "brown"]
+    return {
+        "item_count": items,
+        "items": [
+            {"type": "backpack", "color": colors[i % len(colors)], "material": "nylon",
+             "distinctive_features": ["front zip pocket", "padded straps"], "text": f"tag {i}"}
+            for i in range(items)
+        ],
+    }
+
+
+def sample_latency(mean_ms: float, sigma: float) -> float:
+    """Log-normally distributed latency with the given mean; sigma 0 is constant."""
+    if sigma <= 0:
+        return mean_ms
+    return mean_ms * random.lognormvariate(-sigma * sigma / 2, sigma)
+
+
+def create_fake_ollama(base_latency_ms: float = 200.0, ms_per_image_token: float = 0.5,
+                       response: dict = None, jitter_ms: float = 0.0,
+                       stall_probability: float = 0.0, stall_ms: float = 0.0,
+                       max_parallel: int = 0, latency_sigma: float = 0.0, error_rate: float = 0.0) -> FastAPI:
+    """
+    Create a fake Ollama app whose /api/generate latency scales with image tokens,
+    plus uniform jitter and an occasional stall to mimic a GPU box having a hiccup.
+    latency_sigma makes the latency log-normal around that value, and error_rate
+    answers that share of requests with a 500 like a crashed runner.
+    max_parallel queues requests beyond that many, like OLLAMA_NUM_PARALLEL; 0 is unlimited.
+    """
+    app = FastAPI()
+    slots = asyncio.Semaphore(max_parallel) if max_parallel > 0 else None
+    response_text = json.dumps(response or DEFAULT_RESPONSE)
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        payload = await request.json()
+        image_tokens = 0
+        for image_b64 in payload.get("images", []):
+            width, height = Image.open(io.BytesIO(base64.b64decode(image_b64))).size
+            image_tokens += estimate_vision_tokens(width, height)
+
+        latency_ms = sample_latency(base_latency_ms + ms_per_image_token * image_tokens, latency_sigma)
+        latency_ms += random.uniform(0, jitter_ms)
+        if random.random() < stall_probability:
+            latency_ms += stall_ms
+        latency = latency_ms / 1000
+        if slots is not None:
+            async with slots:
+                await asyncio.sleep(latency)
+        else:
+            await asyncio.sleep(latency)
+        if random.random() < error_rate:
+            return JSONResponse({"error": "llama runner process has terminated"}, status_code=500)
+
+        # Image tokens are billed to prompt evaluation, everything else to generation
+        prompt_eval_seconds = min(latency, ms_per_image_token * image_tokens / 1000)
+        return {
+            "model": payload.get("model"),
+            "response": response_text,
+            "done": True,
+            "total_duration": int(latency * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": image_tokens,
+            "prompt_eval_duration": int(prompt_eval_seconds * 1e9),
+            "eval_count": len(response_text) // 4,
+            "eval_duration": int((latency - prompt_eval_seconds) * 1e9),
+        }
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": []}
+
+    return app
+
+
+def create_replay_ollama(recorded: List[Tuple[int, dict, float]], latency_scale: float = 1.0,
+                         latency_ms: Optional[float] = None) -> FastAPI:
+    """
+    Create a fake Ollama app that answers with logged responses. recorded holds
+    (perceptual hash, response, latency in seconds) per logged request; each
+    incoming image gets the response of the nearest hash, after the recorded
+    latency times latency_scale, or a fixed latency_ms if given.
+    """
+    app = FastAPI()
+    by_hash = {phash: (response, latency) for phash, response, latency in recorded}
+    app.state.misses = 0
+
+    def nearest(phash: int) -> Tuple[dict, float]:
+        if phash in by_hash:
+            return by_hash[phash]
+        app.state.misses += 1
+        closest = min(by_hash, key=lambda known: bin(known ^ phash).count("1"))
+        return by_hash[closest]
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        payload = await request.json()
+        image = Image.open(io.BytesIO(base64.b64decode(payload["images"][0])))
+        response, latency = nearest(dhash(image))
+        latency = latency_ms / 1000 if latency_ms is not None else latency * latency_scale
+        await asyncio.sleep(latency)
+
+        response_text = json.dumps(response)
+        return {
+            "model": payload.get("model"),
+            "response": response_text,
+            "done": True,
+            "total_duration": int(latency * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": estimate_vision_tokens(*image.size),
+            "prompt_eval_duration": int(latency * 0.8 * 1e9),
+            "eval_count": len(response_text) // 4,
+            "eval_duration": int(latency * 0.2 * 1e9),
+        }
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": []}
+
+    return app
+
+
+def create_fake_model_server(dim: int = 384, latency_ms: float = 5.0, latency_sigma: float = 0.0,
+                             error_rate: float = 0.0) -> FastAPI:
+    """
+    Create a fake embedding server with the model server's /encode endpoints.
+    Vectors are random but stable per text, so repeated types hit the same alias.
+    Latency and errors work as in create_fake_ollama.
+    """
+    app = FastAPI()
+
+    async def respond(texts: List[str]):
+        await asyncio.sleep(sample_latency(latency_ms, latency_sigma) / 1000)
+        if random.random() < error_rate:
+            return JSONResponse({"detail": "encoder failed"}, status_code=500)
+        return {"embeddings": [embed(text) for text in texts]}
+
+    def embed(text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    @app.post("/encode")
+    async def encode(request: Request):
+        payload = await request.json()
+        return await respond([payload["type"]])
+
+    @app.post("/encode-batch")
+    async def encode_batch(request: Request):
+        payload = await request.json()
+        return await respond(payload["texts"])
+
+    return app
+
+
+class FakeServer:
+    """Runs an ASGI app with uvicorn on a background thread."""
+
+    def __init__(self, app: FastAPI, port: int, host: str = "127.0.0.1"):
+        self.url = f"http://{host}:{port}"
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
@@ -0,0 +1,99 @@
+"""
+Shared pieces of the end-to-end benchmarks: running the API in a subprocess
+against the local fakes, and sending it images.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+import httpx
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+class ApiProcess:
+    """Runs the API under uvicorn against the given backends, with a throwaway log, image store and caches."""
+
+    def __init__(self, port: int, ollama_url: str, model_server_url: str, env: Optional[Dict[str, str]] = None,
+                 workers: int = 1, startup_timeout: float = 300.0):
+        self.url = f"http://127.0.0.1:{port}"
+        self.port = port
+        self.ollama_url = ollama_url
+        self.model_server_url = model_server_url
+        self.env = env or {}
+        self.workers = workers
+        self.startup_timeout = startup_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self._workdir: Optional[tempfile.TemporaryDirectory] = None
+
+    def __enter__(self):
+        self._workdir = tempfile.TemporaryDirectory()
+        workdir = self._workdir.name
+        env = dict(os.environ)
+        env.update({
+            "OLLAMA_HOST": self.ollama_url,
+            "OLLAMA_HOSTS": "",
+            "MODEL_SERVER": self.model_server_url,
+            "DB_FILE": os.path.join(workdir, "requests.db"),
+            "IMAGE_STORE_DIR": os.path.join(workdir, "images"),
+            "LOG_ARCHIVE_DIR": os.path.join(workdir, "archive"),
+            "RESULT_CACHE_PATH": "",
+            "TYPE_CACHE_PATH": os.path.join(workdir, "type_cache.db"),
+            "LOG_MAINTENANCE_INTERVAL": "0",
+        })
+        env.update(self.env)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "image_recognition_api:app", "--port", str(self.port),
+             "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=API_DIR, env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(self.url, self.process, self.startup_timeout)
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+        self._workdir.cleanup()
+
+
+def wait_until_ready(url: str, process: Optional[subprocess.Popen] = None, timeout: float = 300.0):
+    """Poll the API until it reports ready (models warm), failing early if its process exits."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"API exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/readyz", timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"API at {url} did not come up within {timeout:.0f} seconds")
+
+
+async def send_image(client: httpx.AsyncClient, url: str, image: bytes,
+                     stream: bool = False) -> Tuple[int, float, Optional[float]]:
+    """Send one image; returns (status, latency, time to first field) in seconds, status 0 on a transport error."""
+    files = {"file": ("image.jpg", image, "image/jpeg")}
+    start = time.perf_counter()
+    try:
+        if not stream:
+            response = await client.post(f"{url}/analyze-image", files=files)
+            return response.status_code, time.perf_counter() - start, None
+
+        first_field = None
+        async with client.stream("POST", f"{url}/analyze-image-stream", files=files) as response:
+            async for line in response.aiter_lines():
+                if first_field is None and line and json.loads(line).get("event") == "field":
+                    first_field = time.perf_counter() - start
+        return response.status_code, time.perf_counter() - start, first_field
+    except httpx.HTTPError:
+        return 0, time.perf_counter() - start, None
@@ -0,0 +1,168 @@
+"""
+Open-loop load test: latency versus throughput for the API on local fakes.
+
+Starts a fake Ollama and a fake model server with configurable latency
+distributions, error rates and response sizes, runs the API under uvicorn with
+1..N workers, and sends uploads with Poisson arrivals at increasing rates. For
+each rate it reports achieved throughput, errors and latency percentiles, and
+marks the saturation point: the highest rate the API kept up with inside the
+latency target. Arrivals do not wait for earlier responses, so queueing shows
+up as latency rather than as a lower send rate.
+
+Result and perceptual caches are disabled by default so every request reaches
+the vision stage. The fake Ollama serves requests without a parallelism limit
+unless --ollama-parallel is set, so the API itself is what saturates.
+
+    python benchmarks/load_test.py --rates 2,4,8,16,32 --workers 1,2,4
+    python benchmarks/load_test.py --ollama-latency-ms 2000 --ollama-sigma 0.5 --env VISION_MAX_IN_FLIGHT=16
+"""
+import argparse
+import asyncio
+import csv
+import io
+import os
+import random
+import sys
+import time
+from contextlib import ExitStack
+from typing import Dict, List
+import httpx
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from benchmarks.fakes import FakeServer, create_fake_model_server, create_fake_ollama, make_response
+from benchmarks.harness import ApiProcess, send_image
+
+API_PORT = 18470
+OLLAMA_PORT = 18471
+MODEL_SERVER_PORT = 18472
+VARIANTS_PER_SIZE = 4
+WARMUP_REQUESTS = 5
+# A rate is sustained if nearly every request succeeds within the latency target
+MAX_ERROR_RATIO = 0.01
+
+
+def make_images(sizes: List[str]) -> List[bytes]:
+    """Photo-like JPEGs (smooth noise, so they compress like real photos) at each WIDTHxHEIGHT."""
+    images = []
+    for size in sizes:
+        width, height = (int(side) for side in size.split("x"))
+        for variant in range(VARIANTS_PER_SIZE):
+            noise = Image.effect_noise((max(1, width // 16), max(1, height // 16)), 60).resize((width, height))
+            tint = Image.new("RGB", (width, height), tuple(random.randrange(256) for _ in range(3)))
+            image = Image.merge("RGB", [Image.blend(band, noise, 0.5) for band in tint.split()])
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=90)
+            images.append(buffer.getvalue())
+    return images
+
+
+async def run_rate(url: str, images: List[bytes], rate: float, duration: float, stream: bool) -> Dict:
+    """Send Poisson arrivals at rate for duration seconds and wait for every response."""
+    async with httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=None)) as client:
+        for image in images[:WARMUP_REQUESTS]:
+            await send_image(client, url, image, stream)
+
+        tasks = []
+        start = time.perf_counter()
+        next_arrival = start
+        while next_arrival - start < duration:
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+            tasks.append(asyncio.create_task(send_image(client, url, random.choice(images), stream)))
+            next_arrival += random.expovariate(rate)
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    ok = np.array([latency for status, latency, _ in results if status == 200]) * 1000
+    first_fields = [first for status, _, first in results if status == 200 and first is not None]
+    row = {
+        "offered": rate,
+        "sent": len(results),
+        "throughput": len(ok) / elapsed,
+        "errors": len(results) - len(ok),
+        "rejected": sum(1 for status, _, _ in results if status == 429),
+        "p50_ms": float(np.percentile(ok, 50)) if len(ok) else float("nan"),
+        "p95_ms": float(np.percentile(ok, 95)) if len(ok) else float("nan"),
+        "p99_ms": float(np.percentile(ok, 99)) if len(ok) else float("nan"),
+        "first_field_p50_ms": float(np.percentile(first_fields, 50)) * 1000 if first_fields else float("nan"),
+    }
+    return row
+
+
+def sustained(row: Dict, slo_ms: float) -> bool:
+    # Open-loop overload shows up as growing latency or 429s, not as a lower send rate
+    return row["errors"] <= MAX_ERROR_RATIO * row["sent"] and row["p99_ms"] <= slo_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", default="1,2,4,8,12,16,24,32", help="Arrival rates to try, in requests per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of arrivals per rate")
+    parser.add_argument("--workers", default="1", help="Comma-separated uvicorn worker counts to compare")
+    parser.add_argument("--slo-ms", type=float, default=5000.0, help="p99 latency target for the saturation point")
+    parser.add_argument("--image-sizes", default="640x480,1280x960,3024x4032", help="Upload sizes, chosen at random")
+    parser.add_argument("--stream", action="store_true", help="Use /analyze-image-stream")
+    parser.add_argument("--ollama-latency-ms", type=float, default=500.0, help="Mean vision latency for a small image")
+    parser.add_argument("--ollama-ms-per-token", type=float, default=0.2, help="Extra vision latency per image token")
+    parser.add_argument("--ollama-sigma", type=float, default=0.3, help="Log-normal spread of the vision latency")
+    parser.add_argument("--ollama-error-rate", type=float, default=0.0, help="Share of vision calls that fail with 500")
+    parser.add_argument("--ollama-parallel", type=int, default=0, help="Vision calls served at once; 0 is unlimited")
+    parser.add_argument("--response-items", type=int, default=2, help="Items in each vision response")
+    parser.add_argument("--embed-latency-ms", type=float, default=10.0, help="Mean model server latency")
+    parser.add_argument("--embed-error-rate", type=float, default=0.0, help="Share of model server calls that fail")
+    parser.add_argument("--with-caches", action="store_true", help="Leave the result and perceptual caches on")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra API setting")
+    parser.add_argument("--csv", help="Also write every row to this CSV file")
+    args = parser.parse_args()
+
+    rates = [float(rate) for rate in args.rates.split(",")]
+    env = {} if args.with_caches else {"RESULT_CACHE_SIZE": "0", "PHASH_MAX_DISTANCE": "-1"}
+    env.update(setting.split("=", 1) for setting in args.env)
+    images = make_images(args.image_sizes.split(","))
+    print(f"{len(images)} images of {args.image_sizes}; {args.duration:.0f}s per rate; p99 target {args.slo_ms:.0f} ms")
+
+    ollama = create_fake_ollama(
+        base_latency_ms=args.ollama_latency_ms, ms_per_image_token=args.ollama_ms_per_token,
+        response=make_response(args.response_items), latency_sigma=args.ollama_sigma,
+        error_rate=args.ollama_error_rate, max_parallel=args.ollama_parallel,
+    )
+    model_server = create_fake_model_server(
+        latency_ms=args.embed_latency_ms, latency_sigma=args.ollama_sigma, error_rate=args.embed_error_rate,
+    )
+
+    rows = []
+    header = (f"{'workers':>7} | {'offered/s':>9} | {'sent':>5} | {'done/s':>6} | {'errors':>6} | {'429':>5} | "
+              f"{'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'1st field':>9}")
+    with ExitStack() as stack:
+        ollama_url = stack.enter_context(FakeServer(ollama, OLLAMA_PORT)).url
+        model_server_url = stack.enter_context(FakeServer(model_server, MODEL_SERVER_PORT)).url
+
+        for workers in (int(count) for count in args.workers.split(",")):
+            print(f"\n{header}\n{'-' * len(header)}")
+            saturation = None
+            with ApiProcess(API_PORT, ollama_url, model_server_url, env, workers) as api:
+                for rate in rates:
+                    row = {"workers": workers, **asyncio.run(run_rate(api.url, images, rate, args.duration, args.stream))}
+                    rows.append(row)
+                    print(
+                        f"{workers:>7} | {rate:>9.1f} | {row['sent']:>5} | {row['throughput']:>6.2f} | "
+                        f"{row['errors']:>6} | {row['rejected']:>5} | {row['p50_ms']:>7.0f} | {row['p95_ms']:>7.0f} | "
+                        f"{row['p99_ms']:>7.0f} | {row['first_field_p50_ms']:>9.0f}"
+                    )
+                    if not sustained(row, args.slo_ms):
+                        break  # Past the knee; higher rates only take longer
+                    saturation = rate
+            print(f"Saturation point with {workers} worker(s): "
+                  f"{f'{saturation:.1f} req/s' if saturation is not None else f'below {rates[0]:.1f} req/s'}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Wrote {len(rows)} rows to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Replay logged traffic against the API.
+
+Reads a time window of requests from a logs database (the Streamlit
+streamlit_db.db or the API's own log), starts the API with a fake Ollama that
+answers each image with its logged response, and sends the images at their
+recorded pace or N times faster. Reports throughput, end-to-end latency and
+per-stage latency percentiles from the API's /metrics.
+
+Images come from the image column (base64) or, for rows logged after the
+image store was introduced, from --image-store. Use --env to replay the same
+traffic against a changed configuration:
+
+    python benchmarks/replay.py --db ../streamlit_ui/logs/streamlit_db.db --speed 10
+    python benchmarks/replay.py --db data/api_requests.db --image-store data/images \\
+        --since "2026-10-01" --env VISION_MAX_IN_FLIGHT=8 --env PHASH_MAX_DISTANCE=-1
+
+The API's catalog (CATALOG_DIR) must exist. Embeddings come from a fake
+model server unless --model-server points at a real one.
+"""
+import argparse
+import asyncio
+import base64
+import calendar
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import httpx
+import numpy as np
+from prometheus_client.parser import text_string_to_metric_families
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from config import AppConfig
+from services.image_preprocessor import preprocess_image
+from services.image_store import ImageStore
+from benchmarks.fakes import FakeServer, create_fake_model_server, create_replay_ollama
+from benchmarks.harness import ApiProcess, send_image, wait_until_ready
+
+API_PORT = 18460
+OLLAMA_PORT = 18461
+MODEL_SERVER_PORT = 18462
+
+
+@dataclass
+class RecordedRequest:
+    offset: float  # Seconds after the first request in the window
+    image: bytes
+    response: dict
+    latency: float  # Seconds the vision model took (or the whole request, for older rows)
+
+
+def load_requests(db_path: str, image_store: Optional[ImageStore], since: Optional[str], until: Optional[str],
+                  limit: int) -> List[RecordedRequest]:
+    """Read logged requests with an image and a response, oldest first."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(logs)")}
+    selected = ["created_at", "response", "response_time",
+                "image" if "image" in columns else "NULL",
+                "image_hash" if "image_hash" in columns else "NULL",
+                "total_duration" if "total_duration" in columns else "NULL"]
+    rows = conn.execute(f'''
+        SELECT {", ".join(selected)} FROM logs
+        WHERE response IS NOT NULL AND created_at >= ? AND created_at < ?
+        ORDER BY created_at LIMIT ?
+    ''', (since or "", until or "9999-12-31", limit)).fetchall()
+    conn.close()
+
+    requests, skipped = [], 0
+    start = None
+    for created_at, response, response_time, image_b64, image_hash, total_duration in rows:
+        image = None
+        if image_b64:
+            image = base64.b64decode(image_b64)
+        elif image_hash and image_store is not None:
+            image = image_store.get(image_hash)
+        try:
+            response = json.loads(response)
+        except ValueError:
+            response = None
+        if image is None or not isinstance(response, dict) or "error" in response:
+            skipped += 1
+            continue
+
+        timestamp = calendar.timegm(time.strptime(created_at[:19], "%Y-%m-%d %H:%M:%S"))
+        start = timestamp if start is None else start
+        latency = total_duration / 1e9 if total_duration else (response_time or 0.0)
+        requests.append(RecordedRequest(timestamp - start, image, response, latency))
+    if skipped:
+        print(f"Skipped {skipped} rows without a usable image or response")
+    return requests
+
+
+def recorded_responses(requests: List[RecordedRequest]) -> List[Tuple[int, dict, float]]:
+    """Key each logged response by the perceptual hash the fake Ollama will see."""
+    config = AppConfig()
+    recorded = []
+    for request in requests:
+        prepared = preprocess_image(request.image, config.IMAGE_MAX_SIDE, config.IMAGE_MAX_PIXELS,
+                                    config.IMAGE_JPEG_QUALITY)
+        recorded.append((prepared.phash, request.response, request.latency))
+    return recorded
+
+
+def scrape(url: str) -> Dict[Tuple, float]:
+    """Return every sample on /metrics keyed by (name, sorted labels)."""
+    samples = {}
+    for family in text_string_to_metric_families(httpx.get(f"{url}/metrics", timeout=10.0).text):
+        for sample in family.samples:
+            samples[(sample.name, tuple(sorted(sample.labels.items())))] = sample.value
+    return samples
+
+
+def histogram_percentiles(before: Dict, after: Dict, name: str, label: str,
+                          quantiles=(0.5, 0.95, 0.99)) -> Dict[str, Tuple[int, List[float]]]:
+    """Estimate percentiles per label value from the bucket counts added between two scrapes."""
+    buckets = defaultdict(list)
+    for (sample, labels), value in after.items():
+        if sample != f"{name}_bucket":
+            continue
+        labels = dict(labels)
+        added = value - before.get((sample, tuple(sorted(labels.items()))), 0.0)
+        buckets[labels[label]].append((float(labels["le"]), added))
+
+    estimates = {}
+    for key, counts in buckets.items():
+        counts.sort()
+        total = counts[-1][1]
+        if total <= 0:
+            continue
+        values = []
+        for q in quantiles:
+            lower, below = 0.0, 0.0
+            for upper, cumulative in counts:
+                if cumulative >= q * total:
+                    if upper == float("inf"):
+                        values.append(lower)
+                    else:
+                        fraction = (q * total - below) / (cumulative - below) if cumulative > below else 1.0
+                        values.append(lower + (upper - lower) * fraction)
+                    break
+                lower, below = upper, cumulative
+        estimates[key] = (int(total), values)
+    return estimates
+
+
+async def replay(url: str, requests: List[RecordedRequest], speed: float, stream: bool):
+    """Send each request at its recorded offset divided by speed (0 sends them all at once)."""
+    async with httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=None)) as client:
+        start = time.perf_counter()
+
+        async def scheduled(request: RecordedRequest):
+            if speed > 0:
+                await asyncio.sleep(max(0.0, start + request.offset / speed - time.perf_counter()))
+            return await send_image(client, url, request.image, stream)
+
+        results = await asyncio.gather(*[scheduled(request) for request in requests])
+        return results, time.perf_counter() - start
+
+
+def report(results, elapsed: float, before: Dict, after: Dict):
+    statuses = Counter(status for status, _, _ in results)
+    latencies = np.array([latency for status, latency, _ in results if status == 200]) * 1000
+    first_fields = np.array([first for status, _, first in results if status == 200 and first is not None]) * 1000
+    print(f"\n{len(results)} requests in {elapsed:.1f}s: {len(results) / elapsed:.2f} req/s, "
+          f"status {dict(sorted(statuses.items()))}")
+
+    print(f"\n{'':>22} | {'count':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    print("-" * 64)
+    for name, values in (("end to end", latencies), ("first field", first_fields)):
+        if len(values):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            print(f"{name:>22} | {len(values):>6} | {p50:>8.1f} | {p95:>8.1f} | {p99:>8.1f}")
+    print("-" * 64)
+    stages = histogram_percentiles(before, after, "recognition_stage_seconds", "stage")
+    for stage_name, (count, values) in sorted(stages.items(), key=lambda item: -item[1][1][1]):
+        p50, p95, p99 = (value * 1000 for value in values)
+        print(f"{stage_name:>22} | {count:>6} | {p50:>8.1f} | {p95:>8.1f} | {p99:>8.1f}")
+    print("(stage percentiles are interpolated from histogram buckets)")
+
+    lookups = defaultdict(dict)
+    for (sample, labels), value in after.items():
+        if sample == "recognition_cache_lookups_total":
+            labels = dict(labels)
+            lookups[labels["cache"]][labels["result"]] = value - before.get((sample, tuple(sorted(labels.items()))), 0.0)
+    for cache, counts in sorted(lookups.items()):
+        print(f"{cache} cache: {counts.get('hit', 0):.0f} hits, {counts.get('miss', 0):.0f} misses")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="Logs database to replay")
+    parser.add_argument("--image-store", help="Image store directory for rows that reference image_hash")
+    parser.add_argument("--since", help="First created_at to replay (UTC, e.g. '2026-10-01 08:00:00')")
+    parser.add_argument("--until", help="Replay requests logged before this time")
+    parser.add_argument("--limit", type=int, default=1000, help="Maximum requests to replay")
+    parser.add_argument("--speed", type=float, default=1.0, help="Multiple of the recorded rate; 0 sends all at once")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply the recorded vision latency")
+    parser.add_argument("--latency-ms", type=float, help="Fixed vision latency instead of the recorded one")
+    parser.add_argument("--stream", action="store_true", help="Use /analyze-image-stream and report time to first field")
+    parser.add_argument("--model-server", help="Real model server URL (default: a local fake)")
+    parser.add_argument("--api", help="Replay against a running API instead of starting one; "
+                                      f"point its OLLAMA_HOST at http://127.0.0.1:{OLLAMA_PORT}")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra API setting")
+    args = parser.parse_args()
+
+    image_store = ImageStore(args.image_store) if args.image_store else None
+    requests = load_requests(args.db, image_store, args.since, args.until, args.limit)
+    if not requests:
+        print("No requests to replay in that window")
+        return
+    span = requests[-1].offset
+    print(f"Loaded {len(requests)} requests spanning {span:.0f}s; replaying over ~{span / args.speed if args.speed else 0:.0f}s")
+
+    ollama = create_replay_ollama(recorded_responses(requests), args.latency_scale, args.latency_ms)
+    with ExitStack() as stack:
+        stack.enter_context(FakeServer(ollama, OLLAMA_PORT))
+        model_server = args.model_server
+        if model_server is None:
+            model_server = stack.enter_context(FakeServer(create_fake_model_server(), MODEL_SERVER_PORT)).url
+
+        url = args.api
+        if url is None:
+            env = dict(setting.split("=", 1) for setting in args.env)
+            url = stack.enter_context(ApiProcess(API_PORT, f"http://127.0.0.1:{OLLAMA_PORT}", model_server, env)).url
+        wait_until_ready(url)
+
+        before = scrape(url)
+        results, elapsed = asyncio.run(replay(url, requests, args.speed, args.stream))
+        after = scrape(url)
+        report(results, elapsed, before, after)
+        if ollama.state.misses:
+            print(f"{ollama.state.misses} vision calls had no exact perceptual-hash match and used the nearest one")
+
+
+if __name__ == "__main__":
+    main()
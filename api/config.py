@@ -5,10 +5,55 @@ from dataclasses import dataclass
 class AppConfig:
     """Application configuration settings."""
     OLLAMA_HOST: str = os.getenv("OLLAMA_HOST", "http://host.docker.internal:11434")
+    OLLAMA_HOSTS: str = os.getenv("OLLAMA_HOSTS", "")  # Comma-separated "url|weight" pool; defaults to OLLAMA_HOST
+    OLLAMA_HEALTH_INTERVAL: float = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))  # Seconds; 0 disables probes
+    OLLAMA_HEDGE_PERCENTILE: float = float(os.getenv("OLLAMA_HEDGE_PERCENTILE", "0"))  # e.g. 95; 0 disables hedging
+    OLLAMA_HEDGE_MIN_SAMPLES: int = int(os.getenv("OLLAMA_HEDGE_MIN_SAMPLES", "20"))
+    OLLAMA_CONNECT_TIMEOUT: float = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))  # Seconds
+    OLLAMA_READ_TIMEOUT: float = float(os.getenv("OLLAMA_READ_TIMEOUT", "180"))  # Seconds without a byte; covers a full non-streamed generation
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "")  # How long Ollama keeps the model loaded, e.g. "30m" or -1; empty uses the server default
     MODEL_SERVER_URL: str = os.getenv("MODEL_SERVER", "http://host.docker.internal:8000")
+    MODEL_SERVER_CONNECT_TIMEOUT: float = float(os.getenv("MODEL_SERVER_CONNECT_TIMEOUT", "2"))  # Seconds
+    MODEL_SERVER_READ_TIMEOUT: float = float(os.getenv("MODEL_SERVER_READ_TIMEOUT", "10"))  # Seconds
+    MODEL_SERVER_RETRIES: int = int(os.getenv("MODEL_SERVER_RETRIES", "2"))  # Encoding is idempotent; Ollama calls fail over instead
+    OUTBOUND_RETRY_BACKOFF: float = float(os.getenv("OUTBOUND_RETRY_BACKOFF", "0.2"))  # Seconds; doubled per retry, with full jitter
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures that open a circuit; 0 disables
+    BREAKER_RESET_TIMEOUT: float = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))  # Seconds before an open circuit lets a trial call through
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "remote")  # "remote" (model server) or "onnx" (in-process)
+    ONNX_MODEL_DIR: str = os.getenv("ONNX_MODEL_DIR", "data/onnx/all-MiniLM-L6-v2")  # See export_onnx_embeddings.py
+    ONNX_THREADS: int = int(os.getenv("ONNX_THREADS", "0"))  # 0 lets onnxruntime decide
+    CATALOG_DIR: str = os.getenv("CATALOG_DIR", "data/catalog")
+    CATALOG_WATCH_INTERVAL: float = float(os.getenv("CATALOG_WATCH_INTERVAL", "10"))  # Seconds between checks for a new version; 0 disables
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     MODEL: str = "qwen2.5vl:7b"
     TEMPERATURE: float = 0.0
     REPEAT_PENALTY: float = 1.2
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    IMAGE_MAX_SIDE: int = int(os.getenv("IMAGE_MAX_SIDE", "1280"))  # Longest side in pixels; 0 disables
+    IMAGE_MAX_PIXELS: int = int(os.getenv("IMAGE_MAX_PIXELS", "1003520"))  # ~1280 vision tokens; 0 disables
+    IMAGE_JPEG_QUALITY: int = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "1000"))
+    RESULT_CACHE_TTL: float = float(os.getenv("RESULT_CACHE_TTL", "86400"))  # Seconds; 0 disables expiry
+    RESULT_CACHE_PATH: str = os.getenv("RESULT_CACHE_PATH", "")  # Set to persist results on disk
+    DB_FILE: str = os.getenv("DB_FILE", "data/api_requests.db")
+    IMAGE_STORE_DIR: str = os.getenv("IMAGE_STORE_DIR", "data/images")  # Uploaded images, keyed by SHA-256
+    LOG_ARCHIVE_DIR: str = os.getenv("LOG_ARCHIVE_DIR", "data/archive")  # One logs-YYYY-MM.db per month
+    LOG_HOT_DAYS: float = float(os.getenv("LOG_HOT_DAYS", "35"))  # Days kept in the live table; at least PHASH_LOOKBACK_DAYS
+    LOG_RETENTION_DAYS: float = float(os.getenv("LOG_RETENTION_DAYS", "365"))  # 0 keeps logs forever
+    LOG_MAINTENANCE_INTERVAL: float = float(os.getenv("LOG_MAINTENANCE_INTERVAL", "3600"))  # Seconds; 0 disables
+    PHASH_MAX_DISTANCE: int = int(os.getenv("PHASH_MAX_DISTANCE", "5"))  # Hamming bits out of 64; negative disables
+    PHASH_INDEX_SIZE: int = int(os.getenv("PHASH_INDEX_SIZE", "500000"))
+    PHASH_LOOKBACK_DAYS: float = float(os.getenv("PHASH_LOOKBACK_DAYS", "30"))
+    VISION_MAX_IN_FLIGHT: int = int(os.getenv("VISION_MAX_IN_FLIGHT", "4"))  # Concurrent vision requests across all endpoints
+    VISION_MAX_QUEUE: int = int(os.getenv("VISION_MAX_QUEUE", "32"))  # Requests waiting for a slot before rejecting with 429
+    WARMUP_RETRY_INTERVAL: float = float(os.getenv("WARMUP_RETRY_INTERVAL", "5"))  # Seconds between startup warm-up attempts
+    BATCH_MAX_IMAGES: int = int(os.getenv("BATCH_MAX_IMAGES", "32"))
+    BATCH_VISION_CONCURRENCY: int = int(os.getenv("BATCH_VISION_CONCURRENCY", "4"))  # Parallel Ollama calls per batch
+    TYPE_CACHE_SIZE: int = int(os.getenv("TYPE_CACHE_SIZE", "10000"))
+    TYPE_CACHE_TTL: float = float(os.getenv("TYPE_CACHE_TTL", "604800"))  # Seconds; 0 disables expiry
+    TYPE_CACHE_PATH: str = os.getenv("TYPE_CACHE_PATH", "data/type_cache.db")  # Empty disables the disk tier
+    LEXICAL_MIN_SIMILARITY: float = float(os.getenv("LEXICAL_MIN_SIMILARITY", "0.7"))  # Trigram Dice for misspelled aliases; above 1 disables
     
     @property
     def SYSTEM_PROMPT(self) -> str:
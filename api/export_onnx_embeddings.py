@@ -0,0 +1,126 @@
+"""
+Export the sentence embedding model to int8 ONNX for EMBEDDING_BACKEND=onnx, and check it.
+
+Exports the transformer to ONNX, applies dynamic int8 quantization to its
+weights and saves the tokenizer next to it. It then encodes every alias in
+the catalog with the quantized model and checks each against the float
+embeddings stored in the catalog bundle: the nearest other alias (and its
+product code) must match what the float embedding finds for at least
+--min-agreement of the aliases. Exits non-zero if it does not.
+
+Export needs PyTorch and transformers in addition to the runtime
+dependencies (not needed by the API itself):
+
+    pip install torch transformers onnx onnxscript
+    python export_onnx_embeddings.py --output data/onnx/all-MiniLM-L6-v2
+    python export_onnx_embeddings.py --verify-only  # Re-check an existing export against a new catalog
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from config import AppConfig
+from services.catalog import load_catalog
+from services.embedding_backend import OnnxEmbeddingBackend
+
+OPSET_VERSION = 14
+BATCH_SIZE = 256
+# Must match the "Not Listed" threshold in SemanticSearchService
+MATCH_THRESHOLD = 0.6
+
+
+def export(model_name: str, output_dir: str):
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    tokenizer = AutoTokenizer.from_pretrained(repo)
+    model = AutoModel.from_pretrained(repo).eval()
+    os.makedirs(output_dir, exist_ok=True)
+
+    float_path = os.path.join(output_dir, "model.onnx")
+    sample = tokenizer(["black leather wallet", "iPhone"], padding=True, return_tensors="pt")
+    names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(sample[name] for name in names), float_path,
+            input_names=names, output_names=["last_hidden_state"], dynamic_axes=dynamic_axes,
+            opset_version=OPSET_VERSION,
+        )
+    quantize_dynamic(float_path, os.path.join(output_dir, OnnxEmbeddingBackend.MODEL_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output_dir)  # Writes tokenizer.json for the fast tokenizer
+
+    for name in ("model.onnx", OnnxEmbeddingBackend.MODEL_FILE):
+        path = os.path.join(output_dir, name)
+        size = sum(os.path.getsize(p) for p in (path, path + ".data") if os.path.exists(p))  # Weights may be external
+        print(f"{name}: {size / 1e6:.1f} MB")
+
+
+def nearest_other(queries: np.ndarray, catalog: np.ndarray):
+    """Best catalog row and score for each query, excluding the query's own row."""
+    indices = np.empty(len(queries), dtype=np.int64)
+    scores = np.empty(len(queries), dtype=np.float32)
+    for start in range(0, len(queries), BATCH_SIZE):
+        similarities = queries[start:start + BATCH_SIZE] @ catalog.T
+        rows = np.arange(similarities.shape[0])
+        similarities[rows, rows + start] = -np.inf
+        indices[start:start + BATCH_SIZE] = similarities.argmax(axis=1)
+        scores[start:start + BATCH_SIZE] = similarities[rows, indices[start:start + BATCH_SIZE]]
+    return indices, scores
+
+
+def verify(output_dir: str, catalog_dir: str, model_name: str, min_agreement: float) -> bool:
+    data = load_catalog(catalog_dir, model_name)
+    aliases = data["ALIASES"].tolist()
+    alias_pcs = np.asarray(data["ALIAS_PCS"])
+    reference = np.asarray(data["ALIAS_EMBEDDINGS"], dtype=np.float32)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+
+    backend = OnnxEmbeddingBackend(output_dir)
+    start = time.perf_counter()
+    quantized = np.vstack([backend.encode_sync(aliases[i:i + BATCH_SIZE]) for i in range(0, len(aliases), BATCH_SIZE)])
+    elapsed = time.perf_counter() - start
+    cosines = (quantized * reference).sum(axis=1)
+
+    float_best, float_scores = nearest_other(reference, reference)
+    int8_best, int8_scores = nearest_other(quantized.astype(np.float32), reference)
+    alias_agreement = float(np.mean(float_best == int8_best))
+    pc_agreement = float(np.mean(alias_pcs[float_best] == alias_pcs[int8_best]))
+    threshold_agreement = float(np.mean((float_scores > MATCH_THRESHOLD) == (int8_scores > MATCH_THRESHOLD)))
+
+    print(f"Encoded {len(aliases)} aliases in {elapsed:.2f}s ({len(aliases) / elapsed:.0f}/s)")
+    print(f"Cosine to float embeddings: mean {cosines.mean():.4f}, min {cosines.min():.4f} "
+          f"({aliases[int(cosines.argmin())]!r})")
+    print(f"Top-1 alias agreement (excluding itself): {alias_agreement:.2%}")
+    print(f"Top-1 product code agreement: {pc_agreement:.2%}")
+    print(f"Same side of the {MATCH_THRESHOLD} match threshold: {threshold_agreement:.2%}")
+    for i in np.flatnonzero(float_best != int8_best)[:10]:
+        print(f"  {aliases[i]!r}: float -> {aliases[float_best[i]]!r}, int8 -> {aliases[int8_best[i]]!r}")
+
+    if alias_agreement < min_agreement:
+        print(f"FAIL: top-1 alias agreement is below {min_agreement:.2%}")
+        return False
+    print("OK")
+    return True
+
+
+def main():
+    config = AppConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=config.ONNX_MODEL_DIR, help="Directory for the model and tokenizer")
+    parser.add_argument("--catalog", default=config.CATALOG_DIR, help="Catalog bundle to check against")
+    parser.add_argument("--min-agreement", type=float, default=0.98, help="Required top-1 alias agreement")
+    parser.add_argument("--verify-only", action="store_true", help="Skip the export and only run the check")
+    args = parser.parse_args()
+
+    if not args.verify_only:
+        export(config.EMBEDDING_MODEL, args.output)
+    if not verify(args.output, args.catalog, config.EMBEDDING_MODEL, args.min_agreement):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,72 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from contextlib import asynccontextmanager, nullcontext
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from services.catalog import CatalogError
+from services.catalog_reloader import CatalogReloader
 from services.data_loader import DataLoader
 from services.vision_service import VisionService
 from services.semantic_search import SemanticSearchService
+from services.image_preprocessor import PreprocessedImage, preprocess_image
+from services.result_cache import ResultCache
+from services.database import DatabaseService
+from services.image_store import ImageStore
+from services.log_maintenance import LogMaintenance
+from services.perceptual_index import PerceptualHashIndex
+from services.warmup import Warmup
+from services.admission import AdmissionController, QueueFullError
+from services.outbound import OutboundError, OutboundTimeout, OutboundUnavailable
+from services.metrics import (
+    CACHE_LOOKUPS, FIRST_FIELD_LATENCY, REQUEST_LATENCY, REQUESTS_IN_FLIGHT, StatsCollector, stage,
+)
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 from config import AppConfig
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
 import base64
-import io
-from PIL import Image
+import httpx
+import json
+import time
+
+# Cold-start time is measured from here: loading the catalog and indexes below counts towards it
+STARTED_AT = time.perf_counter()
+
+# Load configuration
+config = AppConfig()
+
+# Shared HTTP client: keeps pooled keep-alive connections to Ollama and the model server.
+# Deadlines are set per backend by the services' OutboundEndpoints.
+http_client = httpx.AsyncClient(
+    timeout=None,
+    limits=httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+    ),
+)
+
+# Paths of the app's routes, the only values the endpoint metric label takes besides "other"
+ROUTE_PATHS = set()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ROUTE_PATHS.update(route.path for route in app.routes)  # Every route is registered by now
+    vision_service.backends.start()
+    log_maintenance.start()
+    catalog_reloader.start()
+    warmup.start()
+    yield
+    await warmup.stop()
+    await catalog_reloader.stop()
+    await log_maintenance.stop()
+    await vision_service.backends.stop()
+    await http_client.aclose()
+    semantic_search_service.cache.close()
+    db_service.close()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -22,14 +77,40 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-# Load configuration
-config = AppConfig()
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    """Record in-flight requests and latency per endpoint."""
+    endpoint = request.url.path if request.url.path in ROUTE_PATHS else "other"
+    with REQUESTS_IN_FLIGHT.labels(endpoint).track_inprogress(), REQUEST_LATENCY.labels(endpoint).time():
+        return await call_next(request)
 
 # Initialize services
-data_loader = DataLoader()
+data_loader = DataLoader(config)
 data = data_loader.load_all_data()
-vision_service = VisionService(config)
-semantic_search_service = SemanticSearchService(config, data)
+vision_service = VisionService(config, http_client)
+semantic_search_service = SemanticSearchService(config, data, http_client)
+catalog_reloader = CatalogReloader(data_loader, semantic_search_service, config.CATALOG_WATCH_INTERVAL)
+result_cache = ResultCache(config.RESULT_CACHE_SIZE, config.RESULT_CACHE_TTL, config.RESULT_CACHE_PATH)
+db_service = DatabaseService(config.DB_FILE)
+image_store = ImageStore(config.IMAGE_STORE_DIR)
+# Rows stay in the live table at least as long as the perceptual index looks back
+log_maintenance = LogMaintenance(
+    config.DB_FILE, config.LOG_ARCHIVE_DIR, max(config.LOG_HOT_DAYS, config.PHASH_LOOKBACK_DAYS),
+    config.LOG_RETENTION_DAYS, config.LOG_MAINTENANCE_INTERVAL, image_store,
+)
+warmup = Warmup(vision_service, semantic_search_service, config.WARMUP_RETRY_INTERVAL, STARTED_AT)
+admission = AdmissionController(config.VISION_MAX_IN_FLIGHT, config.VISION_MAX_QUEUE)
+REGISTRY.register(StatsCollector(admission.stats, vision_service.backends.stats))
+
+# Index perceptual hashes of recent analyses so re-uploaded photos skip Ollama
+phash_index = None
+if config.PHASH_MAX_DISTANCE >= 0:
+    phash_index = PerceptualHashIndex(config.PHASH_MAX_DISTANCE, config.PHASH_INDEX_SIZE)
+    for request_id, phash in db_service.get_recent_hashes(
+        vision_service.fingerprint, config.PHASH_LOOKBACK_DAYS, config.PHASH_INDEX_SIZE
+    ):
+        phash_index.add(phash, request_id)
+    print(f"Indexed {len(phash_index)} perceptual hashes", flush=True)
 
 # Cache data in memory
 PC_TO_ITEM = data["PC_TO_ITEM"]
@@ -41,7 +122,239 @@ ALIAS_EMBEDDINGS = data["ALIAS_EMBEDDINGS"]
 class ImageRequest(BaseModel):
     image_base64: str
 
-# TODO: Ensure model server is running before calling this endpoint
+class ImageBatchRequest(BaseModel):
+    images_base64: List[str]
+
+class InvalidImageError(Exception):
+    """Raised when uploaded bytes cannot be decoded as an image."""
+
+def prepare_image(image_bytes: bytes) -> PreprocessedImage:
+    """Validate, orient, downscale and re-encode an image in one decode (blocking, run in a worker thread)."""
+    try:
+        with stage("image_preprocess"):
+            prepared = preprocess_image(
+                image_bytes, config.IMAGE_MAX_SIDE, config.IMAGE_MAX_PIXELS, config.IMAGE_JPEG_QUALITY
+            )
+    except Exception as e:
+        raise InvalidImageError(str(e))
+    print(f"Image preprocessed: {prepared.summary()}", flush=True)
+    return prepared
+
+def decode_image_base64(image_base64: str) -> bytes:
+    """Decode a base64 image (blocking, run in a worker thread)."""
+    try:
+        with stage("base64_decode"):
+            return base64.b64decode(image_base64)
+    except ValueError as e:
+        raise InvalidImageError(str(e))
+
+def queue_full(error: QueueFullError) -> HTTPException:
+    """Build the 429 response for a full vision queue."""
+    return HTTPException(status_code=429, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+
+def backend_failed(error: OutboundError) -> HTTPException:
+    """Build the response for a failed backend call: 504 on a timeout, 503 while unreachable, otherwise 502."""
+    if isinstance(error, OutboundTimeout):
+        status_code = 504
+    elif isinstance(error, OutboundUnavailable):
+        status_code = 503
+    else:
+        status_code = 502
+    headers = {"Retry-After": str(error.retry_after)} if error.retry_after is not None else None
+    return HTTPException(status_code=status_code, detail=str(error), headers=headers)
+
+def capitalize_values(result: dict):
+    """Capitalize the first letter of each string value in the result dictionary."""
+    for key, value in result.items():
+        if isinstance(value, str):
+            result[key] = value.capitalize() if not value.lower().startswith('ip') else value
+
+def log_analysis(request_id: str, image_bytes: bytes, prepared: PreprocessedImage, result: dict,
+                 response_time: float, ollama_stats: Dict[str, int], first_field_time: Optional[float] = None):
+    """Store the upload and log an analysis (blocking, run in a worker thread)."""
+    with stage("log_write"):
+        image_hash, image_size = image_store.put(image_bytes)
+        db_service.log_response(
+            request_id, image_hash, image_size, result, response_time, prepared.phash, vision_service.fingerprint,
+            first_field_time, ollama_stats,
+        )
+
+async def lookup_vision(image_bytes: bytes) -> Tuple[str, Optional[PreprocessedImage], Optional[dict], Optional[str]]:
+    """
+    Look an image up before calling the vision backend. Identical uploads are
+    served from the result cache and near-duplicates from the perceptual-hash
+    index. Returns (cache_key, prepared, result, cache_source), where
+    cache_source is "exact", "perceptual" or None on a miss, and prepared is
+    None on an exact hit.
+    """
+    with stage("cache_lookup"):
+        key = await run_in_threadpool(result_cache.make_key, image_bytes, vision_service.fingerprint)
+        cached = result_cache.get(key)
+    CACHE_LOOKUPS.labels("result", "hit" if cached is not None else "miss").inc()
+    if cached is not None:
+        return key, None, cached, "exact"
+
+    prepared = await run_in_threadpool(prepare_image, image_bytes)
+
+    if phash_index is not None:
+        with stage("perceptual_lookup"):
+            match = phash_index.find(prepared.phash)
+            earlier = await run_in_threadpool(db_service.get_response, match[0]) if match else None
+        CACHE_LOOKUPS.labels("perceptual", "hit" if earlier is not None else "miss").inc()
+        if match is not None:
+            if earlier is not None:
+                print(f"Near-duplicate of request {match[0]} (distance {match[1]})", flush=True)
+                result_cache.set(key, earlier)
+                return key, prepared, earlier, "perceptual"
+
+    return key, prepared, None, None
+
+async def store_vision(key: str, image_bytes: bytes, prepared: PreprocessedImage, result: dict, response_time: float,
+                       ollama_stats: Dict[str, int], first_field_time: Optional[float] = None):
+    """Cache, log and index a fresh vision result."""
+    # Parse failures are not cached or indexed so a resubmit gets another try
+    if not isinstance(result, dict) or "error" in result:
+        return
+    request_id = db_service.generate_request_id()
+    result_cache.set(key, result)
+    await run_in_threadpool(
+        log_analysis, request_id, image_bytes, prepared, result, response_time, ollama_stats, first_field_time
+    )
+    if phash_index is not None:
+        phash_index.add(prepared.phash, request_id)
+
+async def run_vision(image_bytes: bytes, limiter=None) -> Tuple[dict, Optional[str]]:
+    """
+    Run the vision stage for one image, skipping Ollama for cached and
+    near-duplicate images. Returns (result, cache_source).
+    """
+    key, prepared, result, cache_source = await lookup_vision(image_bytes)
+    if result is not None:
+        return result, cache_source
+
+    async with limiter or nullcontext():
+        async with admission.slot():
+            start_time = time.time()
+            result, ollama_stats = await vision_service.analyze_image(prepared.data)
+            response_time = round(time.time() - start_time, 2)
+
+    await store_vision(key, image_bytes, prepared, result, response_time, ollama_stats)
+    return result, None
+
+async def stream_analysis(key: str, image_bytes: bytes, prepared: PreprocessedImage, cached: Optional[dict],
+                          cache_source: Optional[str]) -> AsyncIterator[str]:
+    """
+    Yield NDJSON events for one image: a "field" event per attribute as soon as
+    it is complete, a "match" event once the type is resolved, then a final
+    "done" event with the same data as /analyze-image, or an "error" event.
+    """
+    def event(**fields) -> str:
+        return json.dumps(fields) + "\n"
+
+    start_time = time.time()
+    first_field_time = None
+    match = None
+
+    async def resolve_match(item_type: str) -> str:
+        nonlocal match
+        match = await semantic_search_service.find_closest_match(item_type)
+        return event(event="match", cb_type=match[0], product_code=match[1], match_tier=match[2])
+
+    try:
+        if cached is not None:
+            result = cached
+            for key_name, value in result.items():
+                yield event(event="field", key=key_name, value=value)
+        else:
+            result = None
+            ollama_stats = {}
+            async with admission.slot():
+                async for kind, key_name, value in vision_service.analyze_image_stream(prepared.data):
+                    if kind == "result":
+                        result = value
+                        continue
+                    if kind == "stats":
+                        ollama_stats = value
+                        continue
+                    if first_field_time is None:
+                        first_field_time = round(time.time() - start_time, 2)
+                        FIRST_FIELD_LATENCY.observe(time.time() - start_time)
+                        print(f"First field after {first_field_time} seconds", flush=True)
+                    yield event(event=kind, key=key_name, value=value)
+                    if kind == "field" and key_name == "type" and match is None:
+                        yield await resolve_match(value)
+
+            response_time = round(time.time() - start_time, 2)
+            await store_vision(key, image_bytes, prepared, result, response_time, ollama_stats, first_field_time)
+
+        if not isinstance(result, dict):
+            yield event(event="error", detail="Vision service did not return a dictionary result")
+            return
+
+        if match is None:
+            yield await resolve_match(result.get("type", "unknown"))
+        result["cb_type"], result["product_code"], result["match_tier"] = match
+
+        yield event(
+            event="done",
+            success=True,
+            cached=cache_source is not None,
+            cache_source=cache_source,
+            first_field_time=first_field_time,
+            response_time=round(time.time() - start_time, 2),
+            data=result,
+        )
+    except (QueueFullError, OutboundError) as e:
+        yield event(event="error", detail=str(e), retry_after=e.retry_after)
+    except Exception as e:
+        yield event(event="error", detail=f"Error processing image: {str(e)}")
+
+async def analyze_batch(images: List, invalid_detail: str) -> List[Dict]:
+    """
+    Validate and downscale images in parallel, fan them out to the vision backend with bounded
+    concurrency and resolve all item types with one batched embedding lookup.
+    Failures are reported per image so one bad image does not fail the batch.
+    """
+    if not images:
+        raise HTTPException(status_code=400, detail="No images provided")
+    if len(images) > config.BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"At most {config.BATCH_MAX_IMAGES} images per batch")
+
+    semaphore = asyncio.Semaphore(config.BATCH_VISION_CONCURRENCY)
+
+    async def analyze_one(image_bytes) -> Dict:
+        try:
+            if isinstance(image_bytes, Exception):
+                raise image_bytes
+            result, cache_source = await run_vision(image_bytes, semaphore)
+        except InvalidImageError:
+            return {"success": False, "error": invalid_detail}
+        except (QueueFullError, OutboundError) as e:
+            return {"success": False, "error": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            return {"success": False, "error": f"Error processing image: {str(e)}"}
+        if not isinstance(result, dict):
+            return {"success": False, "error": "Vision service did not return a dictionary result"}
+        return {"success": True, "cached": cache_source is not None, "cache_source": cache_source, "data": result}
+
+    results = await asyncio.gather(*[analyze_one(image_bytes) for image_bytes in images])
+
+    analyzed = [r["data"] for r in results if r["success"]]
+    try:
+        matches = await semantic_search_service.find_closest_matches_batch(
+            [result.get("type", "unknown") for result in analyzed]
+        )
+    except OutboundError as e:
+        # Without type matching no image is complete; report it per image like a vision failure
+        failed = {"success": False, "error": str(e), "retry_after": e.retry_after}
+        return [{"index": i, **(failed if r["success"] else r)} for i, r in enumerate(results)]
+    for result, (cb_type, product_code, match_tier) in zip(analyzed, matches):
+        result["cb_type"] = cb_type
+        result["product_code"] = product_code
+        result["match_tier"] = match_tier
+
+    return [{"index": i, **r} for i, r in enumerate(results)]
+
 @app.post("/analyze-image", response_model=Dict)
 async def analyze_image(file: UploadFile = File(...)):
     """
@@ -49,30 +362,35 @@ async def analyze_image(file: UploadFile = File(...)):
     """
     try:
         # Read the uploaded image
-        image_bytes = await file.read()
+        with stage("upload_read"):
+            image_bytes = await file.read()
         
-        # Validate the image
+        # Analyze the image (validated and downscaled first unless the result is cached)
         try:
-            Image.open(io.BytesIO(image_bytes)).verify()
-        except Exception:
+            result, cache_source = await run_vision(image_bytes)
+        except InvalidImageError:
             raise HTTPException(status_code=400, detail="Invalid image file")
-        
-        # Analyze the image using VisionService
-        result = vision_service.analyze_image(image_bytes)
+        except QueueFullError as e:
+            raise queue_full(e)
         
         # Ensure result is a dict and not None
         if not isinstance(result, dict):
             raise HTTPException(status_code=500, detail="Vision service did not return a dictionary result")
         
         # Enrich results with semantic search
-        cb_type, product_code = semantic_search_service.find_closest_match(
+        cb_type, product_code, match_tier = await semantic_search_service.find_closest_match(
             result.get("type", "unknown")
         )
-        result["cb_type"] = cb_type
-        result["product_code"] = product_code
-
-        return {"success": True, "data": result}
+        with stage("response_build"):
+            result["cb_type"] = cb_type
+            result["product_code"] = product_code
+            result["match_tier"] = match_tier
+            return {"success": True, "cached": cache_source is not None, "cache_source": cache_source, "data": result}
     
+    except HTTPException:
+        raise
+    except OutboundError as e:
+        raise backend_failed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
 
@@ -82,40 +400,183 @@ async def analyze_image_base64(request: ImageRequest):
     Endpoint to analyze an image provided as a base64 string.
     """
     try:
-        # Decode the base64 image
+        # Decode the base64 image and analyze it (validated and downscaled first unless cached)
         try:
-            image_data = base64.b64decode(request.image_base64)
-            Image.open(io.BytesIO(image_data)).verify()
-        except Exception:
+            image_data = await run_in_threadpool(decode_image_base64, request.image_base64)
+            result, cache_source = await run_vision(image_data)
+        except InvalidImageError:
             raise HTTPException(status_code=400, detail="Invalid base64 image")
-
-        # Analyze the image using VisionService
-        result = vision_service.analyze_image(image_data)
+        except QueueFullError as e:
+            raise queue_full(e)
         
         # Ensure result is a dict and not None
         if not isinstance(result, dict):
             raise HTTPException(status_code=500, detail="Vision service did not return a dictionary result")
 
-        # Capitalize the first letter of each string value in the result dictionary
-        for key, value in result.items():
-            if isinstance(value, str):
-                result[key] = value.capitalize() if not value.lower().startswith('ip') else value
-
-        # Enrich results with semantic search
-        cb_type, product_code = semantic_search_service.find_closest_match(
+        # Enrich results with semantic search (type matching is case-insensitive)
+        cb_type, product_code, match_tier = await semantic_search_service.find_closest_match(
             result.get("type", "unknown")
         )
-               
-        newItem = {
-            "cb_type": cb_type,
-            "product_code": product_code,
-            "attributes": result
-        }
 
-        return {"success": True, "data": newItem}
+        with stage("response_build"):
+            # Capitalize the first letter of each string value in the result dictionary
+            capitalize_values(result)
+
+            newItem = {
+                "cb_type": cb_type,
+                "product_code": product_code,
+                "match_tier": match_tier,
+                "attributes": result
+            }
 
+            return {"success": True, "cached": cache_source is not None, "cache_source": cache_source, "data": newItem}
+
+    except HTTPException:
+        raise
+    except OutboundError as e:
+        raise backend_failed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+@app.post("/analyze-image-stream")
+async def analyze_image_stream(file: UploadFile = File(...)):
+    """
+    Endpoint to analyze an uploaded image, streaming attributes as NDJSON while the model generates them.
+    """
+    with stage("upload_read"):
+        image_bytes = await file.read()
+    try:
+        key, prepared, cached, cache_source = await lookup_vision(image_bytes)
+        if cached is None:
+            admission.check()  # Reject before the response starts; the slot is taken once streaming begins
+    except InvalidImageError:
+        raise HTTPException(status_code=400, detail="Invalid image file")
+    except QueueFullError as e:
+        raise queue_full(e)
+
+    return StreamingResponse(
+        stream_analysis(key, image_bytes, prepared, cached, cache_source),
+        media_type="application/x-ndjson",
+    )
+
+@app.post("/analyze-images", response_model=Dict)
+async def analyze_images(files: List[UploadFile] = File(...)):
+    """
+    Endpoint to analyze several uploaded images in one call, with per-image results.
+    """
+    with stage("upload_read"):
+        images = [await file.read() for file in files]
+    results = await analyze_batch(images, "Invalid image file")
+    return {"success": True, "results": results}
+
+@app.post("/analyze-images-base64", response_model=Dict)
+async def analyze_images_base64(request: ImageBatchRequest):
+    """
+    Endpoint to analyze several base64 images in one call, with per-image results.
+    """
+    images = await asyncio.gather(
+        *[run_in_threadpool(decode_image_base64, image) for image in request.images_base64],
+        return_exceptions=True,
+    )
+    results = await analyze_batch(images, "Invalid base64 image")
+
+    # Match the /analyze-image-base64 response shape for each successful image
+    for r in results:
+        if r["success"]:
+            attributes = r.pop("data")
+            cb_type = attributes.pop("cb_type")
+            product_code = attributes.pop("product_code")
+            match_tier = attributes.pop("match_tier")
+            capitalize_values(attributes)
+            r["data"] = {"cb_type": cb_type, "product_code": product_code, "match_tier": match_tier,
+                         "attributes": attributes}
+
+    return {"success": True, "results": results}
+
+@app.get("/cache-stats", response_model=Dict)
+async def cache_stats():
+    """
+    Endpoint to report hit/miss counters for the type and result caches, and how item types were resolved.
+    """
+    return {
+        "types": semantic_search_service.cache.stats(),
+        "type_matching": semantic_search_service.stats(),
+        "results": result_cache.stats(),
+    }
+
+@app.post("/admin/reload-catalog", response_model=Dict)
+async def reload_catalog():
+    """
+    Endpoint to load a newly published catalog version now instead of at the next poll.
+    Only the worker process that receives the request reloads; the others pick it up when they poll.
+    """
+    try:
+        result = await catalog_reloader.reload()
+    except CatalogError as e:
+        raise HTTPException(status_code=500, detail=f"Catalog reload failed: {str(e)}")
+    return {"success": True, **result}
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Endpoint to expose pipeline metrics in Prometheus text format.
+    """
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/healthz", response_model=Dict)
+async def healthz():
+    """
+    Liveness endpoint: the process is up and its event loop is responding.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz", response_model=Dict)
+async def readyz(response: Response):
+    """
+    Readiness endpoint: 200 once the models are warm and a vision backend is healthy, 503 until then.
+    """
+    healthy_backends = sum(1 for backend in vision_service.backends.backends if backend.healthy)
+    ready = warmup.ready and healthy_backends > 0
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, "healthy_backends": healthy_backends, **warmup.stats()}
+
+@app.get("/queue-stats", response_model=Dict)
+async def queue_stats():
+    """
+    Endpoint to report vision queue depth, wait and service times, and rejections.
+    """
+    return admission.stats()
+
+@app.get("/backend-stats", response_model=Dict)
+async def backend_stats():
+    """
+    Endpoint to report health, load and hedging counters for the vision backends.
+    """
+    return vision_service.backends.stats()
+
+@app.get("/outbound-stats", response_model=Dict)
+async def outbound_stats():
+    """
+    Endpoint to report deadlines, retries and circuit breaker state for calls to Ollama and the model server.
+    """
+    endpoints = [vision_service.outbound, getattr(semantic_search_service.embedder, "outbound", None)]
+    return {endpoint.name: endpoint.stats() for endpoint in endpoints if endpoint is not None}
+
+@app.get("/log-stats", response_model=Dict)
+async def log_stats(hours: int = 24):
+    """
+    Endpoint to report request volume, latency percentiles and feedback per hour, from the hourly rollups.
+    """
+    rollups = await run_in_threadpool(db_service.get_hourly_stats, hours)
+    for rollup in rollups:
+        rated = rollup["feedback_count"]
+        rollup["positive_ratio"] = round(rollup["positive_feedback"] / rated, 3) if rated else None
+    return {
+        "hours": rollups,
+        "requests": sum(rollup["requests"] for rollup in rollups),
+        "last_maintenance": log_maintenance.last_run,
+    }
     
     
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+"""
+Move base64 images out of a logs database into the content-addressed image store.
+
+Each row's image is decoded, written to the store (identical uploads are
+stored once) and replaced by its image_hash and image_size. Rows are
+migrated in batches, one transaction each, so the tool can be stopped and
+rerun safely. Works on the API, refactored and Streamlit logs databases.
+
+    python migrate_image_store.py --db data/api_requests.db --store data/images --vacuum
+"""
+import argparse
+import base64
+import binascii
+import sqlite3
+import time
+from services.image_store import ImageStore
+
+BATCH_SIZE = 200
+
+
+def ensure_columns(conn: sqlite3.Connection):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(logs)")}
+    for column, column_type in (("image_hash", "TEXT"), ("image_size", "INTEGER")):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE logs ADD COLUMN {column} {column_type}")
+    conn.commit()
+
+
+def decode_image(value) -> bytes:
+    """Logged images are base64 text; very old rows may hold raw bytes."""
+    if isinstance(value, bytes):
+        try:
+            return base64.b64decode(value, validate=True)
+        except (binascii.Error, ValueError):
+            return value
+    return base64.b64decode(value)
+
+
+def migrate(db_path: str, store: ImageStore, vacuum: bool):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA busy_timeout=30000")
+    ensure_columns(conn)
+
+    total = conn.execute("SELECT COUNT(*) FROM logs WHERE image IS NOT NULL").fetchone()[0]
+    print(f"{total} rows to migrate in {db_path}")
+
+    migrated, failed, stored_bytes, logged_bytes = 0, 0, 0, 0
+    last_rowid = 0
+    start = time.time()
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, image FROM logs WHERE image IS NOT NULL AND rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for rowid, image in rows:
+            last_rowid = rowid
+            try:
+                image_bytes = decode_image(image)
+            except (binascii.Error, ValueError) as e:
+                failed += 1
+                print(f"Row {rowid}: could not decode image ({e}); left in place")
+                continue
+            image_hash, image_size = store.put(image_bytes)
+            logged_bytes += len(image)
+            stored_bytes += image_size
+            updates.append((image_hash, image_size, rowid))
+
+        with conn:
+            conn.executemany("UPDATE logs SET image_hash = ?, image_size = ?, image = NULL WHERE rowid = ?", updates)
+        migrated += len(updates)
+        print(f"Migrated {migrated}/{total} rows ({time.time() - start:.1f}s)")
+
+    print(f"Done: {migrated} rows migrated, {failed} failed; "
+          f"{logged_bytes / 1e6:.1f} MB of base64 replaced by {stored_bytes / 1e6:.1f} MB of images before dedup")
+
+    if vacuum:
+        print("Vacuuming to return the freed pages to the filesystem...")
+        conn.execute("VACUUM")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="Path to the logs database")
+    parser.add_argument("--store", required=True, help="Image store directory")
+    parser.add_argument("--vacuum", action="store_true", help="Compact the database afterwards")
+    args = parser.parse_args()
+    migrate(args.db, ImageStore(args.store), args.vacuum)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import asyncio
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+class QueueFullError(Exception):
+    """Raised when the vision queue is full; retry_after is a suggested wait in seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Vision queue is full, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded FIFO work queue in front of the vision stage.
+
+    At most max_in_flight requests run at once and at most max_queue wait for a
+    slot; anything beyond that is rejected immediately with an estimate of when
+    a slot will free up, based on a moving average of observed service time.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, smoothing: float = 0.2):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.avg_service_time = 0.0
+        self.avg_wait_time = 0.0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._waiting: Dict[int, float] = {}  # Ticket -> enqueue time
+        self._tickets = itertools.count()
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely get a slot."""
+        expected = (len(self._waiting) + 1) * self.avg_service_time / self.max_in_flight
+        return max(1, math.ceil(expected))
+
+    def check(self):
+        """Raise QueueFullError if a new request would be rejected right now."""
+        if self._semaphore.locked() and len(self._waiting) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait for a vision slot, or raise QueueFullError if the queue is full."""
+        self.check()
+        ticket = next(self._tickets)
+        enqueued = time.monotonic()
+        self._waiting[ticket] = enqueued
+        try:
+            await self._semaphore.acquire()
+        finally:
+            del self._waiting[ticket]
+
+        started = time.monotonic()
+        self.avg_wait_time = self._average(self.avg_wait_time, started - enqueued)
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self.avg_service_time = self._average(self.avg_service_time, time.monotonic() - started)
+
+    def _average(self, current: float, sample: float) -> float:
+        if current == 0.0:
+            return sample
+        return current + self.smoothing * (sample - current)
+
+    def stats(self) -> Dict:
+        """Return current queue depth and wait times plus admission counters."""
+        now = time.monotonic()
+        oldest = min(self._waiting.values(), default=now)
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": len(self._waiting),
+            "max_queue": self.max_queue,
+            "oldest_wait": round(now - oldest, 3),
+            "avg_wait_time": round(self.avg_wait_time, 3),
+            "avg_service_time": round(self.avg_service_time, 3),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
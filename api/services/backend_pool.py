@@ -0,0 +1,238 @@
+import asyncio
+import random
+import time
+import httpx
+from collections import deque
+from contextlib import asynccontextmanager
+from services.outbound import OutboundEndpoint, OutboundUnavailable
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Backend:
+    """One vision backend and its routing state."""
+
+    def __init__(self, url: str, weight: float = 1.0):
+        self.url = url.rstrip("/")
+        self.weight = weight
+        self.in_flight = 0
+        self.healthy = True
+        self.requests = 0
+        self.failures = 0
+
+    def load(self) -> float:
+        """Weighted load if one more request were routed here."""
+        return (self.in_flight + 1) / self.weight
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+def parse_backends(spec: str) -> List[Backend]:
+    """Parse "url|weight,url|weight,..." into backends; the weight is optional and defaults to 1."""
+    backends = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, weight = entry.partition("|")
+        backends.append(Backend(url.strip(), float(weight) if weight else 1.0))
+    return backends
+
+
+class BackendPool:
+    """Routes requests across vision backends by least outstanding requests, relative to weight.
+
+    A background task probes every backend's /api/tags and takes dead ones out
+    of rotation until they answer again; a backend that cannot be reached (the
+    connection is refused, or its circuit breaker is open) is taken out
+    immediately and the request fails over to the next one. A backend whose
+    circuit breaker in outbound is open is skipped even if its probe passes,
+    until the breaker lets a trial call through. When
+    hedging is enabled, a request that has not finished by the configured
+    percentile of recent latencies is duplicated to a second backend and
+    whichever answers first wins.
+    """
+
+    def __init__(self, backends: List[Backend], http_client: httpx.AsyncClient,
+                 health_interval: float = 10.0, hedge_percentile: float = 0.0,
+                 hedge_min_samples: int = 20, outbound: Optional[OutboundEndpoint] = None):
+        if not backends:
+            raise ValueError("At least one vision backend is required")
+        self.backends = backends
+        self.http_client = http_client
+        self.health_interval = health_interval
+        self.hedge_percentile = hedge_percentile  # 0 disables hedging
+        self.hedge_min_samples = hedge_min_samples
+        self.outbound = outbound  # Its per-host circuit breakers decide which backends can take calls
+        self.latencies = deque(maxlen=1000)  # Recent successful request latencies in seconds
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._health_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background health probes (call from a running event loop)."""
+        if self._health_task is None and self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    def pick(self, exclude: tuple = ()) -> Optional[Backend]:
+        """Return the healthy backend with the lowest weighted load, or None if none is left."""
+        candidates = [b for b in self.backends if self.available(b) and b not in exclude]
+        if not candidates and not exclude:
+            candidates = self.backends  # Everything looks down; keep trying rather than failing outright
+        if not candidates:
+            return None
+        return min(candidates, key=lambda b: (b.load(), random.random()))
+
+    def available(self, backend: Backend) -> bool:
+        """Whether a backend passed its last probe and its circuit breaker would let a call through."""
+        if not backend.healthy:
+            return False
+        return self.outbound is None or self.outbound.breaker(backend.url).allows_call()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[str]:
+        """Reserve the least-loaded backend for one request and yield its URL."""
+        backend = self.pick()
+        backend.in_flight += 1
+        backend.requests += 1
+        try:
+            yield backend.url
+        except OutboundUnavailable:
+            backend.failures += 1
+            backend.healthy = False
+            raise
+        except Exception:
+            backend.failures += 1
+            raise
+        finally:
+            backend.in_flight -= 1
+
+    async def request(self, send: Callable[[str], Awaitable[T]]) -> T:
+        """Run send(base_url) on the pool, failing over while backends are unreachable and hedging slow requests."""
+        tasks = []
+
+        def launch(backend: Backend) -> asyncio.Task:
+            # Counted from the pick, not from when the task first runs, so a burst spreads across backends
+            backend.in_flight += 1
+            backend.requests += 1
+            tasks.append(asyncio.create_task(self._send(backend, send)))
+            tasks[-1].add_done_callback(lambda task: self._release(backend))  # Also when cancelled before it ran
+            return tasks[-1]
+
+        try:
+            primary = self.pick()
+            first = launch(primary)
+            delay = self.hedge_delay()
+            if delay is None:
+                return await self._failover(first, primary, launch)
+
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            secondary = None if done else self.pick(exclude=(primary,))
+            if secondary is None:
+                return await self._failover(first, primary, launch)
+
+            self.hedges += 1
+            second = launch(secondary)
+            pending = {first, second}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            # Cancel the losing hedge, or everything if the caller went away
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _failover(self, task: asyncio.Task, backend: Backend,
+                        launch: Callable[[Backend], asyncio.Task]) -> T:
+        """Await a request, retrying on the remaining backends while they cannot be reached."""
+        tried = (backend,)
+        while True:
+            try:
+                return await task
+            except OutboundUnavailable:
+                backend = self.pick(exclude=tried)
+                if backend is None:
+                    raise
+                tried += (backend,)
+                task = launch(backend)
+
+    async def _send(self, backend: Backend, send: Callable[[str], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        try:
+            result = await send(backend.url)
+        except OutboundUnavailable as e:
+            backend.failures += 1
+            backend.healthy = False
+            print(f"Vision backend {backend.url} is unreachable ({e}); removed until the next health probe", flush=True)
+            raise
+        except Exception:
+            backend.failures += 1
+            raise
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+    @staticmethod
+    def _release(backend: Backend):
+        backend.in_flight -= 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while hedging is off or there are too few samples."""
+        if self.hedge_percentile <= 0 or len(self.backends) < 2 or len(self.latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[index]
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.gather(*[self._probe(b) for b in self.backends])
+            await asyncio.sleep(self.health_interval)
+
+    async def _probe(self, backend: Backend):
+        try:
+            response = await self.http_client.get(f"{backend.url}/api/tags", timeout=5.0)
+            healthy = response.status_code == 200
+        except httpx.HTTPError:
+            healthy = False
+        if healthy != backend.healthy:
+            print(f"Vision backend {backend.url} is {'healthy' if healthy else 'unhealthy'}", flush=True)
+        backend.healthy = healthy
+
+    def stats(self) -> Dict:
+        """Return per-backend routing state and hedging counters."""
+        delay = self.hedge_delay()
+        backends = [b.stats() for b in self.backends]
+        if self.outbound is not None:
+            for backend, stats in zip(self.backends, backends):
+                stats["circuit"] = self.outbound.breaker(backend.url).state
+        return {
+            "backends": backends,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay": round(delay, 3) if delay is not None else None,
+        }
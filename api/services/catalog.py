@@ -0,0 +1,97 @@
+import json
+import os
+import numpy as np
+from typing import Dict, Optional
+
+# Bump when the bundle layout changes; readers refuse bundles they don't understand.
+CATALOG_SCHEMA_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+# A catalog directory holds versions/<version>/ bundles and a CURRENT file naming the live one
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+# Manifest fields load_catalog relies on
+MANIFEST_KEYS = ("version", "alias_count", "embedding_dim")
+
+
+class CatalogError(Exception):
+    """Raised when a catalog bundle is missing, malformed or built for another model."""
+
+
+def resolve_catalog_dir(catalog_dir: str) -> str:
+    """Return the bundle directory CURRENT points at, or catalog_dir itself for an unversioned bundle."""
+    try:
+        with open(os.path.join(catalog_dir, CURRENT_FILE)) as f:
+            return os.path.join(catalog_dir, VERSIONS_DIR, f.read().strip())
+    except FileNotFoundError:
+        return catalog_dir
+
+
+def catalog_version(catalog_dir: str) -> Optional[str]:
+    """Return the published catalog version without loading it (cheap enough to poll), or None if there is none."""
+    try:
+        with open(os.path.join(catalog_dir, CURRENT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        raise CatalogError(f"Cannot read {CURRENT_FILE} in {catalog_dir}: {e}")
+    try:
+        with open(os.path.join(catalog_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return manifest.get("version") if isinstance(manifest, dict) else None
+
+
+def read_manifest(bundle_dir: str) -> dict:
+    try:
+        with open(os.path.join(bundle_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise CatalogError(f"Cannot read catalog manifest in {bundle_dir}: {e}")
+    if not isinstance(manifest, dict):
+        raise CatalogError(f"Catalog manifest in {bundle_dir} is not a JSON object")
+    return manifest
+
+
+def load_catalog(catalog_dir: str, embedding_model: str) -> Dict:
+    """Load the current catalog version, memory-mapping the arrays so the OS page cache shares them across processes."""
+    catalog_dir = resolve_catalog_dir(catalog_dir)
+    manifest = read_manifest(catalog_dir)
+
+    if manifest.get("schema_version") != CATALOG_SCHEMA_VERSION:
+        raise CatalogError(
+            f"Catalog schema {manifest.get('schema_version')} is not supported (expected {CATALOG_SCHEMA_VERSION})"
+        )
+    if manifest.get("embedding_model") != embedding_model:
+        raise CatalogError(
+            f"Catalog was built with {manifest.get('embedding_model')}, but {embedding_model} is configured"
+        )
+
+    missing = [key for key in MANIFEST_KEYS if key not in manifest]
+    if missing:
+        raise CatalogError(f"Catalog manifest in {catalog_dir} lacks {', '.join(missing)}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(catalog_dir, f"{name}.npy"), mmap_mode="r")
+
+    try:
+        embeddings = load("alias_embeddings")
+        aliases = load("aliases")
+        alias_pcs = load("alias_pcs")
+        pc_codes = load("pc_codes")
+        pc_items = load("pc_items")
+    except (OSError, ValueError) as e:
+        raise CatalogError(f"Cannot read catalog arrays in {catalog_dir}: {e}")
+
+    if embeddings.shape != (manifest["alias_count"], manifest["embedding_dim"]) or len(aliases) != len(alias_pcs):
+        raise CatalogError(f"Catalog arrays in {catalog_dir} do not match the manifest")
+
+    return {
+        "PC_TO_ITEM": dict(zip(pc_codes.tolist(), pc_items.tolist())),
+        "ALIAS_TO_PC": dict(zip(aliases.tolist(), alias_pcs.tolist())),
+        "ALIASES": aliases,
+        "ALIAS_PCS": alias_pcs,
+        "ALIAS_EMBEDDINGS": embeddings,
+        "CATALOG_VERSION": manifest["version"],
+    }
@@ -0,0 +1,75 @@
+import asyncio
+from services.catalog import CatalogError, catalog_version
+from services.data_loader import DataLoader
+from services.semantic_search import SemanticSearchService
+from typing import Dict, Optional
+
+
+class CatalogReloader:
+    """Loads newly published catalog versions into a running SemanticSearchService.
+
+    Polls the catalog's CURRENT pointer every interval seconds, and reload()
+    can also be called directly (the admin endpoint does). The new version is
+    loaded and indexed in a worker thread while requests keep using the old
+    one, then swapped in with a single assignment. A version that fails to
+    load or index (for any reason) is reported as a CatalogError and the old
+    one stays in service.
+    """
+
+    def __init__(self, data_loader: DataLoader, semantic_search: SemanticSearchService, interval: float):
+        self.data_loader = data_loader
+        self.semantic_search = semantic_search
+        self.interval = interval
+        self.last_error: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Watch for new versions every interval seconds (call from a running event loop)."""
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass  # The loop reports its own errors; shutdown must not fail on them
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reload()
+            except Exception:
+                pass  # Already reported by reload(); retried on the next poll
+
+    async def reload(self) -> Dict:
+        """Load the published version if it differs from the one in service."""
+        async with self._lock:
+            previous = self.semantic_search.catalog.version
+            try:
+                published = await asyncio.to_thread(catalog_version, self.data_loader.config.CATALOG_DIR)
+                if published == previous:
+                    return {"changed": False, "version": previous}
+                data = await asyncio.to_thread(self.data_loader.load_all_data)
+                catalog = await asyncio.to_thread(self.semantic_search.build_catalog, data)
+            except CatalogError as e:
+                self._report(previous, e)
+                raise
+            except Exception as e:  # An unreadable directory, or a bundle that breaks indexing
+                error = CatalogError(f"{type(e).__name__}: {e}")
+                self._report(previous, error)
+                raise error from e
+
+            self.last_error = None
+            if catalog.version != previous:
+                self.semantic_search.swap_catalog(catalog)
+            return {"changed": catalog.version != previous, "version": catalog.version, "previous_version": previous}
+
+    def _report(self, previous: str, error: CatalogError):
+        if str(error) != self.last_error:
+            print(f"Catalog reload failed, keeping {previous}: {error}", flush=True)
+        self.last_error = str(error)
@@ -1,29 +1,21 @@
-import pickle
 import time
+from config import AppConfig
+from services.catalog import load_catalog
 
 class DataLoader:
-    """Handles loading and caching of pickle data files."""
+    """Handles loading of the versioned catalog bundle."""
+
+    def __init__(self, config: AppConfig):
+        self.config = config
 
     def load_all_data(self):
-        """Load all necessary pickle files for the application."""
+        """Load the catalog bundle (embeddings are memory-mapped, not copied)."""
         start_time = time.time()
-        print("Loading pickle file data...", flush=True)
-        
-        data = {}
-        
-        with open("data/pc_to_item.pkl", "rb") as f:
-            data["PC_TO_ITEM"] = pickle.load(f)
-        
-        with open("data/alias_to_pc.pkl", "rb") as f:
-            data["ALIAS_TO_PC"] = pickle.load(f)
-        
-        with open("data/aliases.pkl", "rb") as f:
-            data["ALIASES"] = pickle.load(f)
+        print(f"Loading catalog from {self.config.CATALOG_DIR}...", flush=True)
         
-        with open("data/alias_embeddings.pkl", "rb") as f:
-            data["ALIAS_EMBEDDINGS"] = pickle.load(f)
+        data = load_catalog(self.config.CATALOG_DIR, self.config.EMBEDDING_MODEL)
         
         end_time = time.time()
-        print(f"Data loaded in {end_time - start_time:.2f} seconds", flush=True)
+        print(f"Catalog {data['CATALOG_VERSION']} loaded in {end_time - start_time:.2f} seconds", flush=True)
         
         return data
@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+import uuid
+from services.sqlite_writer import SQLiteWriter, connect
+from typing import Dict, List, Optional, Tuple
+
+class DatabaseService:
+    """Handles the API request log.
+
+    Writes go through a background SQLiteWriter, so logging never blocks a
+    request on disk. Reads share one long-lived connection; in WAL mode they
+    do not wait for the writer.
+    """
+
+    # Columns added after the original logs schema, created on existing databases at startup
+    ADDED_COLUMNS = {
+        "phash": "TEXT",
+        "fingerprint": "TEXT",
+        "first_field_time": "REAL",
+        "total_duration": "INTEGER",
+        "load_duration": "INTEGER",
+        "prompt_eval_count": "INTEGER",
+        "prompt_eval_duration": "INTEGER",
+        "eval_count": "INTEGER",
+        "eval_duration": "INTEGER",
+        "image_hash": "TEXT",
+        "image_size": "INTEGER",
+    }
+
+    INDEXES = (
+        "CREATE INDEX IF NOT EXISTS idx_logs_created_at ON logs (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_response_time ON logs (response_time)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_feedback ON logs (feedback, created_at) WHERE feedback IS NOT NULL",
+        # Serves get_recent_hashes without touching rows that have no perceptual hash
+        "CREATE INDEX IF NOT EXISTS idx_logs_fingerprint ON logs (fingerprint, created_at) WHERE phash IS NOT NULL",
+    )
+
+    # Ollama timing (nanoseconds) and token counts stored with each analysis
+    OLLAMA_STATS_COLUMNS = (
+        "total_duration", "load_duration", "prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration",
+    )
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._initialize_database()
+        self.writer = SQLiteWriter(db_path)
+        self._conn = connect(db_path)
+        self._lock = threading.Lock()
+        # Responses queued but not yet committed, so reads see them immediately
+        self._unwritten: Dict[str, str] = {}
+
+    def _initialize_database(self):
+        """Create database tables if they don't exist."""
+        with connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS logs (
+                    request_id TEXT PRIMARY KEY,
+                    image BLOB,  -- Legacy base64 uploads; new rows use image_hash (see migrate_image_store.py)
+                    response TEXT,
+                    response_time REAL,
+                    feedback TEXT,
+                    types TEXT,
+                    phash TEXT,
+                    fingerprint TEXT,
+                    first_field_time REAL,
+                    total_duration INTEGER,
+                    load_duration INTEGER,
+                    prompt_eval_count INTEGER,
+                    prompt_eval_duration INTEGER,
+                    eval_count INTEGER,
+                    eval_duration INTEGER,
+                    image_hash TEXT,
+                    image_size INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            existing = {row[1] for row in cursor.execute("PRAGMA table_info(logs)")}
+            for column, column_type in self.ADDED_COLUMNS.items():
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE logs ADD COLUMN {column} {column_type}")
+            for index in self.INDEXES:
+                cursor.execute(index)
+            # One row per hour, maintained by LogMaintenance; reports read this instead of logs
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS logs_hourly (
+                    hour TEXT PRIMARY KEY,
+                    requests INTEGER,
+                    avg_response_time REAL,
+                    p50_response_time REAL,
+                    p95_response_time REAL,
+                    p99_response_time REAL,
+                    p50_first_field_time REAL,
+                    p95_first_field_time REAL,
+                    feedback_count INTEGER,
+                    positive_feedback INTEGER,
+                    negative_feedback INTEGER,
+                    prompt_tokens INTEGER,
+                    eval_tokens INTEGER
+                )
+            ''')
+            conn.commit()
+
+    def close(self):
+        """Flush queued writes and close the database."""
+        self.writer.close()
+        self._conn.close()
+
+    def generate_request_id(self) -> str:
+        """Generate a unique request ID."""
+        return str(uuid.uuid4())
+
+    def log_response(self, request_id: str, image_hash: str, image_size: int, response: dict, response_time: float,
+                     phash: Optional[int] = None, fingerprint: Optional[str] = None,
+                     first_field_time: Optional[float] = None, ollama_stats: Optional[Dict[str, int]] = None):
+        """Queue an analysis response for the log; a request that is already logged keeps its first response."""
+        ollama_stats = ollama_stats or {}
+        columns = ("image_hash", "image_size", "response", "response_time", "phash", "fingerprint", "first_field_time",
+                   *self.OLLAMA_STATS_COLUMNS)
+        response_json = json.dumps(response)
+        self._unwritten[request_id] = response_json
+        self.writer.execute(f'''
+            INSERT INTO logs (request_id, {", ".join(columns)})
+            VALUES (?, {", ".join("?" for _ in columns)})
+            ON CONFLICT(request_id) DO UPDATE SET {", ".join(f"{c} = excluded.{c}" for c in columns)}
+            WHERE logs.response IS NULL
+        ''', (
+            request_id, image_hash, image_size, response_json, response_time,
+            f"{phash:016x}" if phash is not None else None, fingerprint, first_field_time,
+            *(ollama_stats.get(column) for column in self.OLLAMA_STATS_COLUMNS),
+        ), on_done=lambda: self._unwritten.pop(request_id, None))
+
+    def get_response(self, request_id: str) -> Optional[dict]:
+        """Return the logged response for a request."""
+        response_json = self._unwritten.get(request_id)
+        if response_json is None:
+            with self._lock:
+                row = self._conn.execute("SELECT response FROM logs WHERE request_id = ?", (request_id,)).fetchone()
+            response_json = row[0] if row else None
+        return json.loads(response_json) if response_json else None
+
+    def get_recent_hashes(self, fingerprint: str, max_age_days: float, limit: int) -> List[Tuple[str, int]]:
+        """Return (request_id, phash) for recent analyses made with the given request fingerprint, oldest first."""
+        since = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - max_age_days * 86400))
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT request_id, phash FROM logs
+                WHERE phash IS NOT NULL AND fingerprint = ? AND created_at >= ?
+                ORDER BY created_at DESC LIMIT ?
+            ''', (fingerprint, since, limit)).fetchall()
+        return [(request_id, int(phash, 16)) for request_id, phash in reversed(rows)]
+
+    def get_hourly_stats(self, hours: int) -> List[Dict]:
+        """Return the rollups for the last few hours, newest first."""
+        since = time.strftime("%Y-%m-%d %H:00:00", time.gmtime(time.time() - hours * 3600))
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT * FROM logs_hourly WHERE hour >= ? ORDER BY hour DESC", (since,)
+            )
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import httpx
+import numpy as np
+from config import AppConfig
+from services.outbound import OutboundEndpoint, OutboundError
+from typing import List
+
+# all-MiniLM-L6-v2 truncates input at 256 word pieces
+MAX_SEQUENCE_LENGTH = 256
+
+
+class RemoteEmbeddingBackend:
+    """Encodes texts through the model server's /encode-batch endpoint."""
+
+    def __init__(self, config: AppConfig, http_client: httpx.AsyncClient):
+        self.url = f"{config.MODEL_SERVER_URL}/encode-batch"
+        self.outbound = OutboundEndpoint(
+            "model_server", http_client,
+            connect_timeout=config.MODEL_SERVER_CONNECT_TIMEOUT,
+            read_timeout=config.MODEL_SERVER_READ_TIMEOUT,
+            retries=config.MODEL_SERVER_RETRIES,
+            backoff=config.OUTBOUND_RETRY_BACKOFF,
+            failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=config.BREAKER_RESET_TIMEOUT,
+        )
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        """Return one embedding row per text; raises an OutboundError if the model server does not answer."""
+        response = await self.outbound.request("POST", self.url, idempotent=True, json={"texts": texts})
+        embeddings = np.array(response.json().get("embeddings", []))
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(texts):
+            raise OutboundError("model_server", f"expected {len(texts)} embeddings, got shape {embeddings.shape}")
+        return embeddings
+
+
+class OnnxEmbeddingBackend:
+    """Runs an int8-quantized ONNX export of the sentence embedding model in-process.
+
+    Reproduces the SentenceTransformer pipeline (word-piece tokenization, mean
+    pooling over the attention mask, L2 normalization) with one tokenizer and
+    one inference session reused for every call. Inference runs in a worker
+    thread, so the event loop keeps serving while a batch is encoded.
+    Build the model directory with export_onnx_embeddings.py.
+    """
+
+    MODEL_FILE = "model_int8.onnx"
+    TOKENIZER_FILE = "tokenizer.json"
+
+    def __init__(self, model_dir: str, threads: int = 0):
+        # Optional dependencies, only needed when this backend is selected
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, self.TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(MAX_SEQUENCE_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, self.MODEL_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def encode_sync(self, texts: List[str]) -> np.ndarray:
+        """Encode a batch of texts in one forward pass (blocking)."""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self.encode_sync, texts)
+
+
+def create_embedding_backend(config: AppConfig, http_client: httpx.AsyncClient):
+    """Return the embedding backend selected by EMBEDDING_BACKEND ("remote" or "onnx")."""
+    if config.EMBEDDING_BACKEND == "onnx":
+        backend = OnnxEmbeddingBackend(config.ONNX_MODEL_DIR, config.ONNX_THREADS)
+        print(f"Encoding types in-process with {config.ONNX_MODEL_DIR}", flush=True)
+        return backend
+    if config.EMBEDDING_BACKEND != "remote":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {config.EMBEDDING_BACKEND!r}; use 'remote' or 'onnx'")
+    return RemoteEmbeddingBackend(config, http_client)
@@ -0,0 +1,95 @@
+import hashlib
+import io
+import os
+import tempfile
+from PIL import Image, ImageOps
+from typing import Iterator, Optional, Tuple
+
+class ImageStore:
+    """Content-addressed file store for uploaded images.
+
+    Each image is written once under its SHA-256, sharded two levels deep
+    (ab/cd/abcd...), so identical uploads share one file and no directory
+    grows too large. A small JPEG thumbnail is kept next to it for review
+    tooling.
+    """
+
+    THUMBNAIL_SIZE = 256
+    THUMBNAIL_QUALITY = 70
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, image_hash: str) -> str:
+        return os.path.join(self.root, image_hash[:2], image_hash[2:4], image_hash)
+
+    def thumbnail_path(self, image_hash: str) -> str:
+        return self.path(image_hash) + ".thumb.jpg"
+
+    def put(self, image_bytes: bytes) -> Tuple[str, int]:
+        """Store an image if it is new and return (sha256 hex digest, size in bytes)."""
+        image_hash = hashlib.sha256(image_bytes).hexdigest()
+        path = self.path(image_hash)
+        if os.path.exists(path):
+            os.utime(path)  # Marks the entry as in use, so a retention sweep running now keeps it
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            thumbnail = self._make_thumbnail(image_bytes)
+            if thumbnail is not None:
+                self._write_atomic(self.thumbnail_path(image_hash), thumbnail)
+            # The image goes last: its presence marks the entry as complete
+            self._write_atomic(path, image_bytes)
+        return image_hash, len(image_bytes)
+
+    def get(self, image_hash: str) -> Optional[bytes]:
+        """Return the stored image bytes, or None if the hash is unknown."""
+        try:
+            with open(self.path(image_hash), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def entries(self) -> Iterator[Tuple[str, float]]:
+        """Yield (image hash, modification time) for every stored image."""
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if len(name) == 64 and "." not in name:
+                    try:
+                        yield name, os.path.getmtime(os.path.join(directory, name))
+                    except FileNotFoundError:
+                        pass  # Removed while walking
+
+    def remove(self, image_hash: str) -> int:
+        """Delete an image and its thumbnail; returns the bytes freed."""
+        freed = 0
+        for path in (self.path(image_hash), self.thumbnail_path(image_hash)):
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                freed += size
+            except FileNotFoundError:
+                pass
+        return freed
+
+    def _make_thumbnail(self, image_bytes: bytes) -> Optional[bytes]:
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+            image.draft("RGB", (self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            image.thumbnail((self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE))
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=self.THUMBNAIL_QUALITY)
+            return buffer.getvalue()
+        except Exception:
+            return None  # Keep the original even if it cannot be decoded
+
+    def _write_atomic(self, path: str, data: bytes):
+        """Write via a temporary file so readers never see a partial file."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,131 @@
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_NON_ALPHANUMERIC = re.compile(r"[^\w]+|_")
+# Words whose trailing "s" is not a plural ("glass", "bus", "iris", "canvas")
+_SINGULAR_ENDINGS = ("ss", "us", "is", "as")
+
+
+def singularize(word: str) -> str:
+    """Strip a regular English plural ending; both catalog aliases and queries go through this."""
+    if len(word) <= 3 or not word.endswith("s") or word.endswith(_SINGULAR_ENDINGS):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "zes", "sses")):
+        return word[:-2]
+    return word[:-1]
+
+
+def lexical_key(text: str) -> str:
+    """Case-folded, punctuation- and space-free key with each word singularized ("T-Shirts" -> "tshirt")."""
+    return "".join(singularize(word) for word in _NON_ALPHANUMERIC.sub(" ", text.casefold()).split())
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Insertions, deletions, substitutions and adjacent transpositions needed to turn a into b."""
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+
+def trigrams(key: str) -> Counter:
+    padded = f"  {key} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class LexicalIndex:
+    """Resolves item types to catalog aliases without embeddings.
+
+    Three tiers, tried in order: the case-folded alias ("exact"), the
+    punctuation-, spacing- and plural-insensitive key ("normalized"), and
+    character-trigram similarity on that key for near-exact spellings
+    ("trigram"). Keys shared by aliases of different product codes are
+    ambiguous and left to the embedding search, as are trigram matches that
+    are not clearly ahead of every other product code or that take more
+    edits than a spelling slip would.
+    """
+
+    # A trigram match must also beat the best alias of any other product code by this much
+    TRIGRAM_MARGIN = 0.1
+    # Shorter keys have too few trigrams to tell a typo from a different word
+    TRIGRAM_MIN_LENGTH = 5
+    # A spelling slip changes about one character in five; more edits make a different item ("currency" vs "US currency")
+    TRIGRAM_CHARACTERS_PER_EDIT = 5
+
+    def __init__(self, aliases: Sequence[str], alias_to_pc: Dict[str, str], min_similarity: float = 0.8):
+        self.alias_pcs = [alias_to_pc.get(alias, "") for alias in aliases]
+        self.min_similarity = min_similarity
+        self.exact = self._unambiguous(" ".join(alias.casefold().split()) for alias in aliases)
+        self.normalized = self._unambiguous(lexical_key(alias) for alias in aliases)
+
+        # Inverted index from trigram to (alias, count) over the normalized keys
+        self.keys = [lexical_key(alias) for alias in aliases]
+        self.trigram_sizes = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for index, key in enumerate(self.keys):
+            grams = trigrams(key)
+            self.trigram_sizes.append(sum(grams.values()))
+            for gram, count in grams.items():
+                self.postings[gram].append((index, count))
+
+    def _unambiguous(self, keys) -> Dict[str, int]:
+        """Map each key to its first alias, dropping keys whose aliases disagree on the product code."""
+        lookup, ambiguous = {}, set()
+        for index, key in enumerate(keys):
+            if not key:
+                continue  # Aliases made only of punctuation ("€") match exactly or not at all
+            if key in lookup and self.alias_pcs[lookup[key]] != self.alias_pcs[index]:
+                ambiguous.add(key)
+            lookup.setdefault(key, index)
+        for key in ambiguous:
+            del lookup[key]
+        return lookup
+
+    def lookup(self, item_type: str) -> Optional[Tuple[int, str]]:
+        """Return (alias index, tier) when the type resolves lexically, or None to fall back to embeddings."""
+        index = self.exact.get(" ".join(item_type.casefold().split()))
+        if index is not None:
+            return index, "exact"
+
+        key = lexical_key(item_type)
+        index = self.normalized.get(key) if key else None
+        if index is not None:
+            return index, "normalized"
+
+        index = self._closest_spelling(key)
+        if index is not None:
+            return index, "trigram"
+        return None
+
+    def _closest_spelling(self, key: str) -> Optional[int]:
+        if len(key) < self.TRIGRAM_MIN_LENGTH or self.min_similarity > 1:
+            return None
+
+        grams = trigrams(key)
+        size = sum(grams.values())
+        shared = Counter()
+        for gram, count in grams.items():
+            for index, alias_count in self.postings.get(gram, ()):
+                shared[index] += min(count, alias_count)
+        if not shared:
+            return None
+
+        # Dice coefficient over trigram multisets; every candidate competes, whatever its length
+        similarities = {index: 2 * common / (size + self.trigram_sizes[index]) for index, common in shared.items()}
+        best = max(similarities, key=similarities.get)
+        if similarities[best] < self.min_similarity:
+            return None
+        runner_up = max((similarity for index, similarity in similarities.items()
+                         if self.alias_pcs[index] != self.alias_pcs[best]), default=0.0)
+        if similarities[best] - runner_up < self.TRIGRAM_MARGIN:
+            return None
+        if edit_distance(key, self.keys[best]) > max(1, len(key) // self.TRIGRAM_CHARACTERS_PER_EDIT):
+            return None
+        return best
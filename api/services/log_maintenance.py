@@ -0,0 +1,241 @@
+import asyncio
+import calendar
+import glob
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from services.image_store import ImageStore
+from services.sqlite_writer import connect
+from typing import Dict, List, Optional, Set
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _timestamp(seconds: float) -> str:
+    """Format like SQLite's CURRENT_TIMESTAMP (UTC), so values compare as strings."""
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(seconds))
+
+
+def _next_month(month: str) -> str:
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, round(q * len(values)) - 1))]
+
+
+class LogMaintenance:
+    """Periodic upkeep of the request log: hourly rollups, archiving, retention and compaction.
+
+    Rows older than hot_days move to one archive database per month
+    (logs-YYYY-MM.db in archive_dir), so the live table stays small and
+    expiring a month is a file delete rather than a large DELETE. Before rows
+    leave, their hour is summarized in logs_hourly, which reports read instead
+    of raw rows. Runs on its own connection; the request writer just waits out
+    its short transactions. With an image store, uploads no longer referenced
+    by any live or archived row are deleted after rows expire.
+    """
+
+    # Hours before the last rollup that are recomputed, so late feedback is counted
+    REFRESH_HOURS = 24
+    # VACUUM the live database once this share of its pages is free
+    VACUUM_FREE_RATIO = 0.5
+    # Stored images touched more recently are kept: their log row may still be queued in the writer
+    SWEEP_MIN_AGE = 86400
+
+    def __init__(self, db_path: str, archive_dir: str, hot_days: float, retention_days: float, interval: float,
+                 image_store: Optional[ImageStore] = None):
+        self.db_path = db_path
+        self.archive_dir = archive_dir
+        self.image_store = image_store
+        self.hot_days = max(hot_days, 1.0)  # Rows must outlive the rollup refresh window
+        self.retention_days = retention_days
+        self.interval = interval
+        self.last_run: Dict = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Run maintenance every interval seconds in a worker thread (call from a running event loop)."""
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run)
+            except Exception as e:  # A failed run (database or file system) must not end the loop
+                print(f"Log maintenance failed: {type(e).__name__}: {e}", flush=True)
+            await asyncio.sleep(self.interval)
+
+    def run(self, now: Optional[float] = None) -> Dict:
+        """Roll up, expire, archive and compact once; returns what was done."""
+        now = time.time() if now is None else now
+        start = time.time()
+        first_run = not self.last_run
+        conn = connect(self.db_path)
+        try:
+            summary = {
+                "rolled_up_hours": self.roll_up(conn, now),
+                **self.expire(conn, now),
+                "archived_rows": self.archive(conn, now),
+                "vacuumed": self.compact(conn),
+            }
+            # The first run also catches images left behind before a restart
+            expired = summary["expired_rows"] or summary["expired_archives"]
+            if self.image_store is not None and self.retention_days > 0 and (first_run or expired):
+                summary.update(self.sweep_images(conn, now))
+        finally:
+            conn.close()
+        summary["seconds"] = round(time.time() - start, 3)
+        self.last_run = summary
+        print(f"Log maintenance: {summary}", flush=True)
+        return summary
+
+    def roll_up(self, conn: sqlite3.Connection, now: float) -> int:
+        """Summarize every complete hour since the last rollup (minus the refresh window) into logs_hourly."""
+        end = _timestamp(now - now % 3600)
+        last_hour = conn.execute("SELECT MAX(hour) FROM logs_hourly").fetchone()[0]
+        if last_hour is None:
+            begin = conn.execute("SELECT MIN(created_at) FROM logs").fetchone()[0]
+            if begin is None:
+                return 0
+        else:
+            last = calendar.timegm(time.strptime(last_hour, TIMESTAMP_FORMAT))
+            begin = _timestamp(last - self.REFRESH_HOURS * 3600)
+
+        hours = defaultdict(list)
+        for row in conn.execute('''
+            SELECT created_at, response_time, first_field_time, feedback, prompt_eval_count, eval_count
+            FROM logs WHERE created_at >= ? AND created_at < ?
+        ''', (begin, end)):
+            hours[row[0][:13] + ":00:00"].append(row)
+
+        summaries = []
+        for hour, rows in hours.items():
+            response_times = sorted(r[1] for r in rows if r[1] is not None)
+            first_field_times = sorted(r[2] for r in rows if r[2] is not None)
+            feedback = [r[3] for r in rows if r[3] is not None]
+            summaries.append((
+                hour, len(rows),
+                sum(response_times) / len(response_times) if response_times else None,
+                _percentile(response_times, 0.5), _percentile(response_times, 0.95), _percentile(response_times, 0.99),
+                _percentile(first_field_times, 0.5), _percentile(first_field_times, 0.95),
+                len(feedback), feedback.count("positive"), feedback.count("negative"),
+                sum(r[4] or 0 for r in rows), sum(r[5] or 0 for r in rows),
+            ))
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO logs_hourly (
+                    hour, requests, avg_response_time, p50_response_time, p95_response_time, p99_response_time,
+                    p50_first_field_time, p95_first_field_time, feedback_count, positive_feedback, negative_feedback,
+                    prompt_tokens, eval_tokens
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', summaries)
+        return len(summaries)
+
+    def archive_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"logs-{month}.db")
+
+    def archive(self, conn: sqlite3.Connection, now: float) -> int:
+        """Move rows older than hot_days into their month's archive database."""
+        cutoff = _timestamp(now - self.hot_days * 86400)
+        months = [row[0] for row in conn.execute(
+            "SELECT DISTINCT substr(created_at, 1, 7) FROM logs WHERE created_at < ?", (cutoff,)
+        )]
+        if not months:
+            return 0
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        column_types = {row[1]: row[2] for row in conn.execute("PRAGMA main.table_info(logs)")}
+        columns = list(column_types)
+        moved = 0
+        for month in months:
+            conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path(month),))
+            try:
+                # Same columns as the live table; a unique index stands in for the primary key
+                conn.execute("CREATE TABLE IF NOT EXISTS archive.logs AS SELECT * FROM main.logs WHERE 0")
+                conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS archive.idx_logs_request_id ON logs (request_id)")
+                conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_logs_created_at ON logs (created_at)")
+                archived = {row[1] for row in conn.execute("PRAGMA archive.table_info(logs)")}
+                for column in columns:
+                    if column not in archived:
+                        conn.execute(f"ALTER TABLE archive.logs ADD COLUMN {column} {column_types[column]}")
+
+                selected = ", ".join(columns)
+                bounds = (f"{month}-01 00:00:00", f"{_next_month(month)}-01 00:00:00", cutoff)
+                where = "created_at >= ? AND created_at < ? AND created_at < ?"
+                with conn:
+                    conn.execute(f"INSERT OR IGNORE INTO archive.logs ({selected}) "
+                                 f"SELECT {selected} FROM main.logs WHERE {where}", bounds)
+                    moved += conn.execute(f"DELETE FROM main.logs WHERE {where}", bounds).rowcount
+            finally:
+                conn.execute("DETACH DATABASE archive")
+        return moved
+
+    def expire(self, conn: sqlite3.Connection, now: float) -> Dict:
+        """Delete archives (and live rows) older than retention_days; 0 keeps everything."""
+        if self.retention_days <= 0:
+            return {"expired_rows": 0, "expired_archives": 0}
+        cutoff = _timestamp(now - self.retention_days * 86400)
+        with conn:
+            expired_rows = conn.execute("DELETE FROM logs WHERE created_at < ?", (cutoff,)).rowcount
+
+        expired_archives = 0
+        for path in glob.glob(os.path.join(self.archive_dir, "logs-????-??.db")):
+            month = os.path.basename(path)[5:12]
+            if f"{_next_month(month)}-01 00:00:00" <= cutoff:
+                for suffix in ("", "-wal", "-shm", "-journal"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                expired_archives += 1
+        return {"expired_rows": expired_rows, "expired_archives": expired_archives}
+
+    def referenced_images(self, conn: sqlite3.Connection) -> Set[str]:
+        """Image hashes referenced by the live table or any archive."""
+        hashes = {row[0] for row in conn.execute("SELECT DISTINCT image_hash FROM logs WHERE image_hash IS NOT NULL")}
+        for path in glob.glob(os.path.join(self.archive_dir, "logs-????-??.db")):
+            archive = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                columns = {row[1] for row in archive.execute("PRAGMA table_info(logs)")}
+                if "image_hash" in columns:
+                    hashes.update(row[0] for row in archive.execute(
+                        "SELECT DISTINCT image_hash FROM logs WHERE image_hash IS NOT NULL"
+                    ))
+            finally:
+                archive.close()
+        return hashes
+
+    def sweep_images(self, conn: sqlite3.Connection, now: float) -> Dict:
+        """Delete stored images (and thumbnails) that no remaining row references."""
+        referenced = self.referenced_images(conn)
+        removed = freed = 0
+        for image_hash, modified in self.image_store.entries():
+            if image_hash not in referenced and now - modified > self.SWEEP_MIN_AGE:
+                freed += self.image_store.remove(image_hash)
+                removed += 1
+        return {"removed_images": removed, "freed_image_bytes": freed}
+
+    def compact(self, conn: sqlite3.Connection) -> bool:
+        """Refresh planner statistics, truncate the WAL and VACUUM once most pages are free."""
+        conn.execute("PRAGMA optimize")
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        vacuum = page_count > 0 and free_pages / page_count >= self.VACUUM_FREE_RATIO
+        if vacuum:
+            conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return vacuum
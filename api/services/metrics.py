@@ -0,0 +1,110 @@
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from typing import Callable, Dict
+
+# Sub-millisecond CPU stages up to multi-minute cold model loads
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+STAGE_LATENCY = Histogram(
+    "recognition_stage_seconds", "Latency of each recognition pipeline stage", ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_LATENCY = Histogram(
+    "recognition_request_seconds", "Latency until response headers are sent, by endpoint", ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+FIRST_FIELD_LATENCY = Histogram(
+    "recognition_first_field_seconds", "Time from the start of a streamed analysis to its first attribute",
+    buckets=LATENCY_BUCKETS,
+)
+STARTUP_SECONDS = Gauge(
+    "recognition_startup_seconds", "Duration of each startup phase; \"ready\" is the time from process start to ready",
+    ["phase"],
+)
+REQUESTS_IN_FLIGHT = Gauge("recognition_requests_in_flight", "Requests currently being handled, by endpoint", ["endpoint"])
+CACHE_LOOKUPS = Counter("recognition_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+OUTBOUND_REQUESTS = Counter(
+    "outbound_requests_total", "Calls to backends by endpoint and outcome (retries count separately)", ["endpoint", "outcome"],
+)
+OUTBOUND_RETRIES = Counter("outbound_retries_total", "Retried calls to backends", ["endpoint"])
+CIRCUIT_STATE = Gauge(
+    "outbound_circuit_state", "Circuit breaker per backend: 0 closed, 1 open, 2 half-open", ["endpoint", "target"],
+)
+PARSE_FAILURES = Counter("recognition_parse_failures_total", "Vision outputs that could not be parsed as JSON")
+TYPE_RESOLUTIONS = Counter("recognition_type_resolutions_total", "Item types resolved, by tier", ["tier"])
+NOT_LISTED = Counter("recognition_not_listed_total", "Item types that fell back to Not Listed")
+OLLAMA_PHASE_SECONDS = Histogram(
+    "ollama_phase_seconds", "Ollama-reported duration of each generation phase", ["phase"],
+    buckets=LATENCY_BUCKETS,
+)
+OLLAMA_TOKENS = Histogram(
+    "ollama_tokens", "Tokens per generation; prompt includes image tokens", ["kind"],
+    buckets=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
+)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "ollama_tokens_per_second", "Prompt evaluation and generation throughput per request", ["kind"],
+    buckets=(5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000),
+)
+OLLAMA_COLD_LOADS = Counter("ollama_cold_loads_total", "Generations that had to load the model into memory")
+MATCH_SCORE = Histogram(
+    "recognition_match_score", "Cosine similarity of the best alias match",
+    buckets=(0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+
+
+def stage(name: str):
+    """Time a pipeline stage: `with stage("ollama_generate"): ...`."""
+    return STAGE_LATENCY.labels(name).time()
+
+
+# A warm model reports a load_duration of a few milliseconds
+COLD_LOAD_SECONDS = 1.0
+
+
+def record_ollama_stats(stats: Dict):
+    """Record the timing and token counts from one Ollama generation (durations in nanoseconds)."""
+    for phase in ("total", "load", "prompt_eval", "eval"):
+        if f"{phase}_duration" in stats:
+            OLLAMA_PHASE_SECONDS.labels(phase).observe(stats[f"{phase}_duration"] / 1e9)
+    for kind, phase in (("prompt", "prompt_eval"), ("eval", "eval")):
+        count = stats.get(f"{phase}_count")
+        duration = stats.get(f"{phase}_duration")
+        if count is None:
+            continue
+        OLLAMA_TOKENS.labels(kind).observe(count)
+        if duration:
+            OLLAMA_TOKENS_PER_SECOND.labels(kind).observe(count / (duration / 1e9))
+    if stats.get("load_duration", 0) / 1e9 > COLD_LOAD_SECONDS:
+        OLLAMA_COLD_LOADS.inc()
+
+
+class StatsCollector:
+    """Exposes the stats() of long-lived services (queue, backend pool) at scrape time."""
+
+    def __init__(self, queue_stats: Callable[[], Dict], backend_stats: Callable[[], Dict]):
+        self.queue_stats = queue_stats
+        self.backend_stats = backend_stats
+
+    def collect(self):
+        queue = self.queue_stats()
+        yield GaugeMetricFamily("vision_queue_in_flight", "Vision requests holding a slot", value=queue["in_flight"])
+        yield GaugeMetricFamily("vision_queue_depth", "Vision requests waiting for a slot", value=queue["queued"])
+        yield GaugeMetricFamily("vision_queue_oldest_wait_seconds", "Wait so far of the oldest queued request",
+                                value=queue["oldest_wait"])
+        yield GaugeMetricFamily("vision_queue_service_seconds", "Moving average of vision service time",
+                                value=queue["avg_service_time"])
+        yield CounterMetricFamily("vision_queue_rejected", "Requests rejected with 429", value=queue["rejected"])
+
+        pool = self.backend_stats()
+        in_flight = GaugeMetricFamily("vision_backend_in_flight", "In-flight requests per vision backend", labels=["backend"])
+        healthy = GaugeMetricFamily("vision_backend_healthy", "1 if the vision backend passed its last probe", labels=["backend"])
+        failures = CounterMetricFamily("vision_backend_failures", "Failed requests per vision backend", labels=["backend"])
+        for backend in pool["backends"]:
+            in_flight.add_metric([backend["url"]], backend["in_flight"])
+            healthy.add_metric([backend["url"]], 1 if backend["healthy"] else 0)
+            failures.add_metric([backend["url"]], backend["failures"])
+        yield in_flight
+        yield healthy
+        yield failures
+        yield CounterMetricFamily("vision_hedged_requests", "Requests duplicated to a second backend", value=pool["hedges"])
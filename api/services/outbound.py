@@ -0,0 +1,261 @@
+import asyncio
+import math
+import random
+import time
+import httpx
+from contextlib import asynccontextmanager
+from services.metrics import CIRCUIT_STATE, OUTBOUND_REQUESTS, OUTBOUND_RETRIES
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+# Responses worth retrying on an idempotent call: the server is overloaded or restarting
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class OutboundError(Exception):
+    """Raised when a call to a backend (Ollama, the model server) fails; endpoint names which one."""
+
+    retry_after: Optional[int] = None  # Seconds, when it is known that retrying sooner is pointless
+
+    def __init__(self, endpoint: str, message: str):
+        super().__init__(f"{endpoint}: {message}")
+        self.endpoint = endpoint
+
+
+class OutboundTimeout(OutboundError):
+    """Raised when a backend accepted the connection but missed its read deadline."""
+
+
+class OutboundStatusError(OutboundError):
+    """Raised when a backend answers with an error status."""
+
+    def __init__(self, endpoint: str, status_code: int):
+        super().__init__(endpoint, f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class OutboundUnavailable(OutboundError):
+    """Raised when a backend cannot be reached; the request was not sent, so it is safe to send elsewhere."""
+
+
+class CircuitOpenError(OutboundUnavailable):
+    """Raised without calling the backend while its circuit breaker is open; retry_after is in seconds."""
+
+    def __init__(self, endpoint: str, retry_after: int):
+        super().__init__(endpoint, f"circuit open after repeated failures, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fails fast while a backend is down.
+
+    Opens after failure_threshold consecutive failures. While open, calls fail
+    immediately; after reset_timeout seconds one trial call is let through
+    (half-open), and its outcome closes the breaker or opens it again. Calls
+    that started before the breaker opened finish without changing its state.
+    """
+
+    STATES = ("closed", "open", "half_open")
+
+    def __init__(self, endpoint: str, target: str, failure_threshold: int, reset_timeout: float):
+        self.endpoint = endpoint
+        self.target = target
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0  # Consecutive
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial_in_flight = False
+        CIRCUIT_STATE.labels(endpoint, target).set(0)
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError unless a call may go through now; return True if the call is the half-open trial."""
+        if self.state == "closed" or self.failure_threshold <= 0:
+            return False
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self._set_state("half_open")
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        raise CircuitOpenError(self.endpoint, max(1, math.ceil(remaining)))
+
+    def allows_call(self) -> bool:
+        """Whether before_call would let a call through now, without taking the half-open trial."""
+        if self.state == "closed" or self.failure_threshold <= 0:
+            return True
+        if self.state == "open":
+            return time.monotonic() >= self.opened_at + self.reset_timeout
+        return not self._trial_in_flight
+
+    def record_success(self, trial: bool = False):
+        """Record a call that reached the backend; trial is what before_call returned for it."""
+        if self.state != "closed" and not trial:
+            return  # Started before the circuit opened; only the trial decides whether it closes
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != "closed":
+            self._set_state("closed")
+
+    def record_failure(self, trial: bool = False):
+        """Record a failed call; trial is what before_call returned for it."""
+        if self.state != "closed" and not trial:
+            return
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.failure_threshold <= 0:
+            return
+        if trial or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            self._set_state("open")
+
+    def release(self):
+        """Let another trial through after the trial ended without an outcome (cancelled, or abandoned by the caller)."""
+        self._trial_in_flight = False
+
+    def _set_state(self, state: str):
+        print(f"Circuit for {self.endpoint} at {self.target} is {state}", flush=True)
+        self.state = state
+        CIRCUIT_STATE.labels(self.endpoint, self.target).set(self.STATES.index(state))
+
+    def stats(self) -> Dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips}
+
+
+class OutboundEndpoint:
+    """Calls to one kind of backend with deadlines, retries and a circuit breaker per target host.
+
+    Every call gets connect_timeout to connect and read_timeout between
+    received bytes. Idempotent calls are retried up to retries times on
+    timeouts, connection errors and overload statuses, after a full-jitter
+    exponential backoff (a random wait up to backoff * 2**attempt). Failures
+    are raised as typed OutboundErrors rather than swallowed, so callers
+    decide what a missing answer means.
+    """
+
+    def __init__(self, name: str, http_client: httpx.AsyncClient, connect_timeout: float, read_timeout: float,
+                 retries: int = 0, backoff: float = 0.2, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.http_client = http_client
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retry_count = 0
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """The breaker for the host a URL points at."""
+        parts = urlsplit(url)
+        target = f"{parts.scheme}://{parts.netloc}"
+        if target not in self.breakers:
+            self.breakers[target] = CircuitBreaker(self.name, target, self.failure_threshold, self.reset_timeout)
+        return self.breakers[target]
+
+    async def request(self, method: str, url: str, idempotent: bool = False, **kwargs) -> httpx.Response:
+        """Send a request and return the successful response, or raise an OutboundError."""
+        breaker = self.breaker(url)
+        attempt = 0
+        while True:
+            try:
+                trial = breaker.before_call()
+                response = await self._send(breaker, trial, method, url, **kwargs)
+                OUTBOUND_REQUESTS.labels(self.name, "success").inc()
+                return response
+            except OutboundError as e:
+                OUTBOUND_REQUESTS.labels(self.name, self._outcome(e)).inc()
+                if attempt >= self.retries or not self._retryable(e, idempotent):
+                    raise
+            attempt += 1
+            self.retry_count += 1
+            OUTBOUND_RETRIES.labels(self.name).inc()
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+
+    async def _send(self, breaker: CircuitBreaker, trial: bool, method: str, url: str, **kwargs) -> httpx.Response:
+        try:
+            response = await self.http_client.request(method, url, timeout=self.timeout, **kwargs)
+        except httpx.HTTPError as e:
+            breaker.record_failure(trial)
+            raise self._error(e) from e
+        finally:
+            if trial:
+                breaker.release()  # A cancelled trial (a hedge that lost) must not hold the half-open slot
+        if response.status_code >= 500:
+            breaker.record_failure(trial)
+        else:
+            breaker.record_success(trial)  # A client error still shows the backend is up
+        if response.is_error:
+            raise OutboundStatusError(self.name, response.status_code)
+        return response
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Open a streamed response; the read deadline applies to each chunk. Streams are never retried."""
+        breaker = self.breaker(url)
+        try:
+            trial = breaker.before_call()
+        except CircuitOpenError:
+            OUTBOUND_REQUESTS.labels(self.name, "circuit_open").inc()
+            raise
+        try:
+            async with self.http_client.stream(method, url, timeout=self.timeout, **kwargs) as response:
+                if response.status_code >= 500:
+                    breaker.record_failure(trial)
+                if response.is_error:
+                    OUTBOUND_REQUESTS.labels(self.name, "status").inc()
+                    raise OutboundStatusError(self.name, response.status_code)
+                yield response
+        except httpx.HTTPError as e:
+            breaker.record_failure(trial)
+            error = self._error(e)
+            OUTBOUND_REQUESTS.labels(self.name, self._outcome(error)).inc()
+            raise error from e
+        finally:
+            if trial:
+                breaker.release()
+        breaker.record_success(trial)
+        OUTBOUND_REQUESTS.labels(self.name, "success").inc()
+
+    def _error(self, error: httpx.HTTPError) -> OutboundError:
+        # A connect timeout is a TimeoutException too, but like a refused connection nothing was sent
+        if isinstance(error, httpx.ConnectTimeout):
+            return OutboundUnavailable(self.name, f"no connection within {self.timeout.connect:g} seconds")
+        if isinstance(error, httpx.TimeoutException):
+            return OutboundTimeout(self.name, f"{type(error).__name__} after {self.timeout.read:g} seconds")
+        if isinstance(error, httpx.ConnectError):
+            return OutboundUnavailable(self.name, f"cannot connect: {error}")
+        return OutboundError(self.name, f"{type(error).__name__}: {error}")
+
+    @staticmethod
+    def _retryable(error: OutboundError, idempotent: bool) -> bool:
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, OutboundUnavailable):
+            return True  # Nothing was sent
+        if isinstance(error, OutboundStatusError):
+            return idempotent and error.status_code in RETRY_STATUSES
+        return idempotent
+
+    @staticmethod
+    def _outcome(error: OutboundError) -> str:
+        if isinstance(error, CircuitOpenError):
+            return "circuit_open"
+        if isinstance(error, OutboundTimeout):
+            return "timeout"
+        if isinstance(error, OutboundStatusError):
+            return "status"
+        if isinstance(error, OutboundUnavailable):
+            return "unavailable"
+        return "error"
+
+    def stats(self) -> Dict:
+        return {
+            "connect_timeout": self.timeout.connect,
+            "read_timeout": self.timeout.read,
+            "max_retries": self.retries,
+            "retries": self.retry_count,
+            "circuits": {target: breaker.stats() for target, breaker in self.breakers.items()},
+        }
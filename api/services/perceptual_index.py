@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+HASH_BITS = 64
+
+
+class PerceptualHashIndex:
+    """Hamming-radius lookup over 64-bit perceptual hashes using multi-index hashing.
+
+    The hash is split into max_distance + 1 bands. Two hashes within
+    max_distance bits of each other must agree exactly on at least one band
+    (pigeonhole principle), so a lookup only compares the few hashes that
+    share a band with the query instead of scanning every stored hash.
+    """
+
+    def __init__(self, max_distance: int, max_entries: int):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._bands = self._split_bands(max_distance + 1)
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in self._bands]
+        self._entries: "OrderedDict[int, str]" = OrderedDict()  # phash -> latest item id, oldest first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _split_bands(num_bands: int) -> List[Tuple[int, int]]:
+        """Return (shift, mask) pairs covering all 64 bits in nearly equal bands."""
+        bands = []
+        start = 0
+        for i in range(num_bands):
+            width = HASH_BITS // num_bands + (1 if i < HASH_BITS % num_bands else 0)
+            bands.append((start, (1 << width) - 1))
+            start += width
+        return bands
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, phash: int, item_id: str):
+        """Index an item under its hash, replacing any older item with the same hash."""
+        with self._lock:
+            if phash in self._entries:
+                self._entries[phash] = item_id
+                self._entries.move_to_end(phash)
+                return
+
+            self._entries[phash] = item_id
+            for (shift, mask), table in zip(self._bands, self._tables):
+                table.setdefault((phash >> shift) & mask, set()).add(phash)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, phash: int):
+        del self._entries[phash]
+        for (shift, mask), table in zip(self._bands, self._tables):
+            key = (phash >> shift) & mask
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.discard(phash)
+                if not bucket:
+                    del table[key]
+
+    def find(self, phash: int) -> Optional[Tuple[str, int]]:
+        """Return (item_id, distance) of the closest hash within max_distance, or None."""
+        with self._lock:
+            candidates = set()
+            for (shift, mask), table in zip(self._bands, self._tables):
+                bucket = table.get((phash >> shift) & mask)
+                if bucket:
+                    candidates |= bucket
+
+            best = None
+            for candidate in candidates:
+                distance = (phash ^ candidate).bit_count()
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (self._entries[candidate], distance)
+            return best
@@ -1,65 +1,146 @@
-import requests
+import httpx
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from config import AppConfig
-from typing import Tuple, Dict
+from services.embedding_backend import create_embedding_backend
+from services.lexical_index import LexicalIndex
+from services.type_cache import TypeCache, normalize_type
+from services.vector_index import VectorIndex
+from services.metrics import CACHE_LOOKUPS, MATCH_SCORE, NOT_LISTED, TYPE_RESOLUTIONS, stage
+from collections import Counter
+from typing import Tuple, Dict, List
 
-class SemanticSearchService:
-    """Handles semantic search for item type matching."""
-    
-    def __init__(self, config: AppConfig, data: Dict):
-        self.config = config
-        self.saved_types = {}  # Cache for saved types
+class CatalogSnapshot:
+    """One catalog version and the indexes built from it; never modified once built."""
+
+    def __init__(self, data: Dict, lexical_min_similarity: float):
+        self.version = data["CATALOG_VERSION"]
         self.aliases = data["ALIASES"]
-        self.alias_embeddings = data["ALIAS_EMBEDDINGS"]
+        self.alias_index = VectorIndex(data["ALIAS_EMBEDDINGS"])
         self.alias_to_pc = data["ALIAS_TO_PC"]
         self.pc_to_item = data["PC_TO_ITEM"]
+        self.lexical_index = LexicalIndex(self.aliases, self.alias_to_pc, lexical_min_similarity)
+
+    def alias_match(self, alias_index: int) -> Tuple[str, str]:
+        """Return (cb_type, product_code) for an alias."""
+        closest_pc = self.alias_to_pc.get(self.aliases[alias_index], "")
+        return self.pc_to_item.get(closest_pc, ""), closest_pc
+
+
+class SemanticSearchService:
+    """Handles semantic search for item type matching.
+
+    The catalog is swapped as a whole (copy-on-write): each lookup reads
+    self.catalog once and uses that snapshot throughout, so a reload never
+    shows a request a mix of two versions.
+    """
     
-    def get_type_embedding(self, item_type: str) -> np.ndarray:
-        """Get embedding for an item type using the model server."""
-        payload = {"type": item_type}
-        try:
-            response = requests.post(f"{self.config.MODEL_SERVER_URL}/encode", json=payload)
-            response.raise_for_status()
-            embeddings = response.json().get("embeddings", [])
-            return np.array(embeddings)
-        except requests.exceptions.RequestException as e:
-            return np.array([])
+    def __init__(self, config: AppConfig, data: Dict, http_client: httpx.AsyncClient):
+        self.config = config
+        self.http_client = http_client
+        self.embedder = create_embedding_backend(config, http_client)
+        self.cache = TypeCache(config)
+        # Cached embeddings and matches from another backend or model must not be reused
+        self.embedding_namespace = f"{config.EMBEDDING_BACKEND}:{config.EMBEDDING_MODEL}"
+        self.catalog = self.build_catalog(data)
+        self.tiers = Counter()  # Resolved types by tier, for stats()
+
+    def build_catalog(self, data: Dict) -> CatalogSnapshot:
+        """Build the search indexes for a loaded catalog (blocking; run off the event loop on reload)."""
+        return CatalogSnapshot(data, self.config.LEXICAL_MIN_SIMILARITY)
+
+    def swap_catalog(self, catalog: CatalogSnapshot):
+        """Serve new lookups from catalog; lookups already running finish on the old one."""
+        previous, self.catalog = self.catalog, catalog
+        print(f"Catalog {previous.version} replaced by {catalog.version} ({len(catalog.aliases)} aliases)", flush=True)
     
-    def find_closest_match(self, item_type: str) -> Tuple[str, str]:
-        """Find the closest matching item type in the database."""
-        
-        # Return cached result if available
-        if item_type in self.saved_types: 
-            cached = self.saved_types[item_type]
-            return cached["cb_type"], cached["product_code"]
-        
-        # Get embedding and find closest match
-        item_embedding = self.get_type_embedding(item_type)
-        if item_embedding.size == 0:
-            return "", ""
-        
-        similarities = cosine_similarity(
-            item_embedding, 
-            self.alias_embeddings
-        )[0]
-
-        closest_index = np.argmax(similarities)
-        closest_score = similarities[closest_index]
-        print(closest_score, flush=True)
+    async def get_type_embeddings(self, item_types: List[str]) -> np.ndarray:
+        """Get embeddings for several item types in one call to the embedding backend."""
+        with stage("embedding_fetch"):
+            return await self.embedder.encode(item_types)
+    
+    async def find_closest_match(self, item_type: str) -> Tuple[str, str, str]:
+        """Find the closest matching item type in the database, and the tier that resolved it."""
+        matches = await self.find_closest_matches_batch([item_type])
+        return matches[0]
+    
+    async def find_closest_matches_batch(self, item_types: List[str]) -> List[Tuple[str, str, str]]:
+        """Find the closest matches for several item types with at most one embedding request.
+
+        Types are deduplicated by normalized key and resolved by the cheapest
+        tier that can: the lexical index ("exact", "normalized", "trigram"), the
+        type cache ("cache"), then embeddings scored in one matrix product
+        ("embedding"). Each match is (cb_type, product_code, tier). Raises an
+        OutboundError when types need embeddings and the model server fails.
+        """
+        catalog = self.catalog
+        keys = [normalize_type(item_type) for item_type in item_types]
+        matches = {}
+        embeddings = {}
+        missing = []
+
+        for key in dict.fromkeys(keys):
+            lexical = catalog.lexical_index.lookup(key)
+            if lexical is not None:
+                matches[key] = (*catalog.alias_match(lexical[0]), lexical[1])
+                continue
+
+            # Return cached result if available; matches are also keyed by catalog version
+            cached = await self.cache.get_match(f"{catalog.version}:{self.embedding_namespace}:{key}")
+            CACHE_LOOKUPS.labels("type_match", "hit" if cached is not None else "miss").inc()
+            if cached is not None:
+                matches[key] = (*cached, "cache")
+                continue
+
+            embedding = await self.cache.get_embedding(f"{self.embedding_namespace}:{key}")
+            CACHE_LOOKUPS.labels("type_embedding", "hit" if embedding is not None else "miss").inc()
+            if embedding is None:
+                missing.append(key)
+            else:
+                embeddings[key] = embedding
+
+        # The embedding model is uncased, so encoding the normalized keys is equivalent
+        if missing:
+            self.cache.encode_calls += len(missing)
+            fetched = await self.get_type_embeddings(missing)
+            for key, embedding in zip(missing, fetched):
+                embeddings[key] = embedding[None, :]
+                self.cache.set_embedding(f"{self.embedding_namespace}:{key}", embedding)
+
+        if embeddings:
+            scored_keys = list(embeddings)
+            with stage("similarity_search"):
+                indices, scores = catalog.alias_index.best(np.vstack([embeddings[key] for key in scored_keys]))
+            for key, closest_index, closest_score in zip(scored_keys, indices, scores):
+                match = self._resolve_match(catalog, closest_index, closest_score)
+                matches[key] = (*match, "embedding")
+
+                # Cache the result, including "Not Listed" fallbacks
+                self.cache.set_match(f"{catalog.version}:{self.embedding_namespace}:{key}", match)
+
+        for cb_type, product_code, tier in matches.values():
+            TYPE_RESOLUTIONS.labels(tier).inc()
+            self.tiers[tier] += 1
+
+        return [matches[key] for key in keys]
+
+    def stats(self) -> Dict:
+        """Resolved types per tier, and the share that did not need the embedding backend."""
+        resolved = sum(self.tiers.values())
+        return {
+            "catalog_version": self.catalog.version,
+            "tiers": dict(self.tiers),
+            "embedding_skip_ratio": round(1 - self.tiers["embedding"] / resolved, 4) if resolved else None,
+        }
+    
+    def _resolve_match(self, catalog: CatalogSnapshot, closest_index: int, closest_score: float) -> Tuple[str, str]:
+        """Map the best alias hit to (cb_type, product_code), or "Not Listed" below the threshold."""
+        MATCH_SCORE.observe(closest_score)
         
         if closest_score > 0.6:  # Adjust threshold as needed
-            closest_alias = self.aliases[closest_index]
-            closest_pc = self.alias_to_pc.get(closest_alias, "")
-            closest_cb_item = self.pc_to_item.get(closest_pc, "")
-
-            # Cache the result
-            self.saved_types[item_type] = {
-                "cb_type": closest_cb_item,
-                "product_code": closest_pc
-            }
+            closest_cb_item, closest_pc = catalog.alias_match(closest_index)
         else:
             closest_cb_item = "Not Listed"
             closest_pc = "217"
+            NOT_LISTED.inc()
 
         return closest_cb_item, closest_pc
@@ -0,0 +1,89 @@
+import queue
+import sqlite3
+import threading
+from typing import Callable, Optional, Sequence
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open a connection in WAL mode so readers never block the writer (or each other)."""
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # Durable across app crashes; only an OS crash can lose the last commits
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+class SQLiteWriter:
+    """Applies queued writes to one SQLite database from a single background thread.
+
+    Writes are grouped into one transaction per batch, so callers only pay for
+    a queue put and never wait on the disk. Having one writer per process also
+    means concurrent request handlers cannot run into "database is locked".
+    If a batch fails, its writes are retried one at a time so a single bad
+    statement does not drop the others.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500):
+        self.path = path
+        self.batch_size = batch_size
+        self.written = 0
+        self.failed = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"sqlite-writer:{path}", daemon=True)
+        self._thread.start()
+
+    def execute(self, sql: str, params: Sequence = (), on_done: Optional[Callable[[], None]] = None):
+        """Queue a write; on_done runs on the writer thread once it has been committed or dropped."""
+        self._queue.put((sql, params, on_done))
+
+    def flush(self):
+        """Block until every write queued so far has been applied."""
+        self._queue.join()
+
+    def close(self):
+        """Apply the remaining writes and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        conn = connect(self.path)
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = None in batch
+            writes = [write for write in batch if write is not None]
+            try:
+                self._apply(conn, writes)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, writes: list):
+        try:
+            with conn:
+                for sql, params, _ in writes:
+                    conn.execute(sql, params)
+            self.written += len(writes)
+        except sqlite3.Error:
+            for sql, params, _ in writes:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                    self.written += 1
+                except sqlite3.Error as e:
+                    self.failed += 1
+                    print(f"Dropped database write: {e}", flush=True)
+
+        for _, _, on_done in writes:
+            if on_done is not None:
+                on_done()
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import sqlite3
+import numpy as np
+from config import AppConfig
+from services.cache import LRUCache, DiskStore
+from services.sqlite_writer import SQLiteWriter
+from typing import Dict, Optional, Tuple
+
+def normalize_type(item_type: str) -> str:
+    """Normalize a VLM type string into a cache key (case-folded, single-spaced)."""
+    return " ".join(item_type.casefold().split())
+
+
+class TypeCache:
+    """Tiered cache for type->embedding and type->(cb_type, product_code) lookups.
+
+    Each lookup checks an in-memory LRU first, then an optional on-disk store
+    shared by all worker processes. Disk hits are promoted into memory. Disk
+    reads run in a worker thread and disk writes are queued to a background
+    writer, so the event loop never waits on SQLite; disk errors count as
+    misses or skipped writes.
+    """
+
+    def __init__(self, config: AppConfig):
+        self.embeddings = LRUCache(config.TYPE_CACHE_SIZE, config.TYPE_CACHE_TTL)
+        self.matches = LRUCache(config.TYPE_CACHE_SIZE, config.TYPE_CACHE_TTL)
+        self.disk_embeddings = None
+        self.disk_matches = None
+        self.writer = None
+        self.encode_calls = 0  # Lookups that had to go to the model server
+
+        if config.TYPE_CACHE_PATH:
+            try:
+                self.writer = SQLiteWriter(config.TYPE_CACHE_PATH)
+                self.disk_embeddings = DiskStore(
+                    config.TYPE_CACHE_PATH, "type_embeddings", config.TYPE_CACHE_TTL, self.writer
+                )
+                self.disk_matches = DiskStore(config.TYPE_CACHE_PATH, "type_matches", config.TYPE_CACHE_TTL, self.writer)
+            except sqlite3.Error as e:
+                print(f"Type cache disk tier disabled, cannot open {config.TYPE_CACHE_PATH}: {e}", flush=True)
+                self.close()
+                self.writer = self.disk_embeddings = self.disk_matches = None
+
+    async def get_embedding(self, key: str) -> Optional[np.ndarray]:
+        """Return a cached (1, dim) embedding for a normalized type."""
+        embedding = self.embeddings.get(key)
+        if embedding is not None or self.disk_embeddings is None:
+            return embedding
+
+        row = await asyncio.to_thread(self.disk_embeddings.get, key)
+        if row is None:
+            return None
+
+        embedding = np.frombuffer(row[0], dtype=np.float32).reshape(1, -1)
+        self.embeddings.set(key, embedding, stored_at=row[1])
+        return embedding
+
+    def set_embedding(self, key: str, embedding: np.ndarray):
+        """Cache an embedding for a normalized type."""
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        self.embeddings.set(key, embedding)
+        if self.disk_embeddings is not None:
+            self.disk_embeddings.set(key, embedding.tobytes())
+
+    async def get_match(self, key: str) -> Optional[Tuple[str, str]]:
+        """Return a cached (cb_type, product_code) for a normalized type."""
+        match = self.matches.get(key)
+        if match is not None or self.disk_matches is None:
+            return match
+
+        row = await asyncio.to_thread(self.disk_matches.get, key)
+        if row is None:
+            return None
+
+        match = tuple(json.loads(row[0]))
+        self.matches.set(key, match, stored_at=row[1])
+        return match
+
+    def set_match(self, key: str, match: Tuple[str, str]):
+        """Cache a (cb_type, product_code) match, including "Not Listed" results."""
+        self.matches.set(key, match)
+        if self.disk_matches is not None:
+            self.disk_matches.set(key, json.dumps(list(match)))
+
+    def close(self):
+        """Apply the queued disk writes and stop the writer."""
+        if self.writer is not None:
+            self.writer.close()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return hit/miss counters for every tier."""
+        stats = {
+            "memory_embeddings": self.embeddings.stats(),
+            "memory_matches": self.matches.stats(),
+            "encode_calls": self.encode_calls,
+        }
+        if self.disk_embeddings is not None:
+            stats["disk_embeddings"] = self.disk_embeddings.stats()
+            stats["disk_matches"] = self.disk_matches.stats()
+            stats["disk_writes"] = {
+                "pending": self.writer.pending(), "written": self.writer.written, "failed": self.writer.failed
+            }
+        return stats
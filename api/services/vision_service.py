@@ -1,21 +1,124 @@
-import requests
+import httpx
 import json
 import base64
+import hashlib
+import time
 from config import AppConfig
+from services.json_stream import IncrementalJsonParser
+from services.backend_pool import BackendPool, parse_backends
+from services.outbound import OutboundEndpoint
+from services.metrics import PARSE_FAILURES, STAGE_LATENCY, record_ollama_stats, stage
+from typing import Any, AsyncIterator, Dict, Tuple
+
+# Timing and token counts Ollama reports with the final response of a generation
+OLLAMA_STATS_FIELDS = (
+    "total_duration", "load_duration", "prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration",
+)
 
 class VisionService:
     """Handles vision analysis requests."""
     
-    def __init__(self, config: AppConfig):
+    def __init__(self, config: AppConfig, http_client: httpx.AsyncClient):
         self.config = config
+        self.fingerprint = self._request_fingerprint()  # Changes whenever MODEL, SYSTEM_PROMPT or options change
+        self.http_client = http_client
+        # Generations are not retried: a retry repeats the whole inference, and refused connections fail over instead
+        self.outbound = OutboundEndpoint(
+            "ollama", http_client,
+            connect_timeout=config.OLLAMA_CONNECT_TIMEOUT,
+            read_timeout=config.OLLAMA_READ_TIMEOUT,
+            failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=config.BREAKER_RESET_TIMEOUT,
+        )
+        self.backends = BackendPool(
+            parse_backends(config.OLLAMA_HOSTS or config.OLLAMA_HOST),
+            http_client,
+            health_interval=config.OLLAMA_HEALTH_INTERVAL,
+            hedge_percentile=config.OLLAMA_HEDGE_PERCENTILE,
+            hedge_min_samples=config.OLLAMA_HEDGE_MIN_SAMPLES,
+            outbound=self.outbound,
+        )
+    
+    async def analyze_image(self, image_bytes: bytes) -> Tuple[dict, Dict[str, int]]:
+        """Analyze an image using the vision model. Returns (parsed_output, ollama_stats)."""
+        with stage("base64_encode"):
+            image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+        
+        payload = self._build_payload(image_b64)
+        
+        async def generate(base_url: str) -> dict:
+            response = await self.outbound.request("POST", f"{base_url}/api/generate", json=payload)
+            return response.json()
+        
+        with stage("ollama_generate"):
+            response = await self.backends.request(generate)
+        stats = self._record_stats(response)
+        
+        raw_output = response.get("response", "").strip()
+        with stage("output_parse"):
+            return self._parse_json_output(raw_output), stats
     
-    def analyze_image(self, image_bytes: bytes) -> dict:
-        """Analyze an image using the vision model."""
-        image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+    async def analyze_image_stream(self, image_bytes: bytes) -> AsyncIterator[Tuple[str, str, Any]]:
+        """
+        Analyze an image with a streamed generation. Yields ("field", key, value)
+        and ("item", key, element) events as attributes complete, skipping empty
+        or unknown values, then ("stats", "", ollama_stats) and
+        ("result", "", parsed_output) once generation ends.
+        """
+        with stage("base64_encode"):
+            image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+        payload = self._build_payload(image_b64, stream=True)
+        parser = IncrementalJsonParser()
+        chunks = []
+        stats = {}
         
+        # Streams are not hedged; a duplicate would double the tokens generated for every slow request
+        started = time.perf_counter()
+        async with self.backends.lease() as base_url:
+            async with self.outbound.stream("POST", f"{base_url}/api/generate", json=payload) as response:
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    text = chunk.get("response", "")
+                    chunks.append(text)
+                    for kind, key, value in parser.feed(text):
+                        if value not in ("", None, "unknown", [], {}):
+                            yield kind, key, value
+                    if chunk.get("done"):
+                        stats = self._record_stats(chunk)
+                        break
+        # Includes time the consumer spends between chunks, so it is kept apart from ollama_generate
+        STAGE_LATENCY.labels("ollama_stream").observe(time.perf_counter() - started)
+        
+        yield "stats", "", stats
+        yield "result", "", self._parse_json_output("".join(chunks).strip())
+    
+    async def warm_up(self, base_url: str, image_b64: str) -> Dict[str, int]:
+        """Load the model on one backend with a one-token inference; OLLAMA_KEEP_ALIVE sets how long it stays loaded.
+
+        Returns Ollama's stats for the call without recording them, so warm-up
+        does not show up in the production token and latency metrics.
+        """
+        payload = self._build_payload(image_b64)
+        payload["options"]["num_predict"] = 1
+        response = await self.outbound.request("POST", f"{base_url}/api/generate", json=payload)
+        return self._stats(response.json())
+    
+    def _record_stats(self, response: dict) -> Dict[str, int]:
+        """Pick Ollama's timing and token counts out of a final response and record them as metrics."""
+        stats = self._stats(response)
+        record_ollama_stats(stats)
+        return stats
+    
+    @staticmethod
+    def _stats(response: dict) -> Dict[str, int]:
+        return {field: response[field] for field in OLLAMA_STATS_FIELDS if field in response}
+    
+    def _build_payload(self, image_b64: str, stream: bool = False) -> dict:
+        """Build the Ollama /api/generate payload for one image."""
         payload = {
             "model": self.config.MODEL,
-            "keep_alive": -1,
             "prompt": self.config.SYSTEM_PROMPT,
             "images": [image_b64],
             "options": {
@@ -24,14 +127,23 @@ class VisionService:
                 "num_predict": 1024,
             },
             "format": "json",
-            "stream": False
+            "stream": stream
         }
-        
-        response = requests.post(f"{self.config.OLLAMA_HOST}/api/generate", json=payload)
-        response.raise_for_status()
-        
-        raw_output = response.json().get("response", "").strip()
-        return self._parse_json_output(raw_output)
+        keep_alive = self.config.OLLAMA_KEEP_ALIVE.strip()
+        if keep_alive:
+            # Ollama reads a bare number as seconds and anything else as a duration like "30m"
+            payload["keep_alive"] = int(keep_alive) if keep_alive.lstrip("-").isdigit() else keep_alive
+        return payload
+    
+    def _request_fingerprint(self) -> str:
+        """Hash everything besides the image that determines the model output."""
+        payload = self._build_payload("")
+        del payload["images"]
+        payload.pop("keep_alive", None)  # How long the model stays loaded does not change its output
+        payload["preprocessing"] = [
+            self.config.IMAGE_MAX_SIDE, self.config.IMAGE_MAX_PIXELS, self.config.IMAGE_JPEG_QUALITY
+        ]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
     
     def _parse_json_output(self, text: str) -> dict:
         """Parse JSON output from the model."""
@@ -46,6 +158,7 @@ class VisionService:
             
             parsed_output = json.loads(text)
         except json.JSONDecodeError as e:
+            PARSE_FAILURES.inc()
             return {"error": "Failed to parse JSON"}
         
         # Clean empty/unknown attributes
@@ -0,0 +1,124 @@
+import asyncio
+import base64
+import io
+import time
+from PIL import Image
+from services.metrics import STARTUP_SECONDS
+from services.semantic_search import SemanticSearchService
+from services.vision_service import VisionService
+from typing import Dict, Optional
+
+WARMUP_TYPE = "wallet"
+
+
+def _warmup_image() -> str:
+    """A small plain JPEG, base64-encoded: enough to run the vision encoder without many image tokens."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (128, 128, 128)).save(buffer, format="JPEG")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+class Warmup:
+    """Brings a new API process to full speed before it is reported ready.
+
+    Loads the vision model on every backend with a one-token inference on a
+    small image (it then stays loaded for OLLAMA_KEEP_ALIVE), encodes a
+    type through the embedding backend, and runs one similarity search so the
+    memory-mapped catalog is paged in. Each step is retried every
+    retry_interval seconds until it succeeds, so an Ollama or model server that
+    is still starting delays readiness instead of failing user requests. Step
+    durations and the time from process start to ready are recorded in
+    recognition_startup_seconds.
+    """
+
+    def __init__(self, vision_service: VisionService, semantic_search: SemanticSearchService,
+                 retry_interval: float, started_at: float):
+        self.vision_service = vision_service
+        self.semantic_search = semantic_search
+        self.retry_interval = retry_interval
+        self.started_at = started_at  # time.perf_counter() when the process began loading the app
+        self.ready = False
+        self.phases: Dict[str, float] = {}
+        self.backends: Dict[str, Dict] = {}  # Per vision backend: warm-up seconds and Ollama's load_duration
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Warm up in the background (call from a running event loop); /healthz answers meanwhile."""
+        self._record("init", time.perf_counter() - self.started_at)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        image_b64 = _warmup_image()
+        await self._until_done("vision", lambda: self._warm_vision(image_b64))
+        embedding = await self._until_done("embedding", self._warm_embedding)
+        await self._until_done("catalog", lambda: asyncio.to_thread(self.semantic_search.catalog.alias_index.best, embedding))
+
+        self._record("ready", time.perf_counter() - self.started_at)
+        self.ready = True
+        print(f"Ready {self.phases['ready']:.1f} seconds after start: {self.phases}", flush=True)
+
+    async def _until_done(self, phase: str, step):
+        """Run step until it succeeds, retrying after errors; records how long the phase took overall."""
+        start = time.perf_counter()
+        while True:
+            try:
+                result = await step()
+                break
+            except Exception as e:
+                message = f"{phase} warm-up failed: {str(e) or type(e).__name__}"
+                if message != self.last_error:
+                    print(f"{message}; retrying every {self.retry_interval:g} seconds", flush=True)
+                self.last_error = message
+                await asyncio.sleep(self.retry_interval)
+        self.last_error = None
+        self._record(phase, time.perf_counter() - start)
+        return result
+
+    async def _warm_vision(self, image_b64: str):
+        """Warm every backend not warmed yet; succeeds once all of them are (unhealthy ones are skipped)."""
+        pending = [backend for backend in self.vision_service.backends.backends if backend.url not in self.backends]
+        results = await asyncio.gather(
+            *[self._warm_backend(backend.url, image_b64) for backend in pending], return_exceptions=True
+        )
+        failed = [(backend, result) for backend, result in zip(pending, results) if isinstance(result, Exception)]
+        # Backends the health probe has taken out of rotation do not hold up readiness once one is warm
+        if failed and (not self.backends or any(backend.healthy for backend, _ in failed)):
+            raise RuntimeError("; ".join(f"{backend.url}: {error or type(error).__name__}" for backend, error in failed))
+
+    async def _warm_backend(self, url: str, image_b64: str):
+        start = time.perf_counter()
+        stats = await self.vision_service.warm_up(url, image_b64)
+        self.backends[url] = {
+            "seconds": round(time.perf_counter() - start, 3),
+            "load_duration": round(stats.get("load_duration", 0) / 1e9, 3),
+        }
+        print(f"Vision model warm on {url}: {self.backends[url]}", flush=True)
+
+    async def _warm_embedding(self):
+        embeddings = await self.semantic_search.get_type_embeddings([WARMUP_TYPE])
+        if embeddings.ndim != 2 or embeddings.shape[0] != 1:
+            raise RuntimeError("embedding backend returned no embedding")
+        return embeddings
+
+    def _record(self, phase: str, seconds: float):
+        self.phases[phase] = round(seconds, 3)
+        STARTUP_SECONDS.labels(phase).set(seconds)
+
+    def stats(self) -> Dict:
+        return {
+            "warm": self.ready,
+            "startup_seconds": self.phases,
+            "vision_backends": self.backends,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Tests import the API modules the way the app does ("from services.x import Y")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# api_test.py is a manual smoke test against a running API, not a pytest module
+collect_ignore = ["api_test.py"]
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from services.admission import AdmissionController, QueueFullError
+
+
+async def hold(admission: AdmissionController, release: asyncio.Event, entered: list = None):
+    async with admission.slot():
+        if entered is not None:
+            entered.append(True)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_rejects_once_slots_and_queue_are_full():
+    admission = AdmissionController(max_in_flight=1, max_queue=1)
+    admission.avg_service_time = 3.0
+
+    async def main():
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(admission, release))
+        queued = asyncio.create_task(hold(admission, release))
+        await settle()
+        assert admission.stats()["in_flight"] == 1 and admission.stats()["queued"] == 1
+
+        with pytest.raises(QueueFullError) as raised:
+            async with admission.slot():
+                pass
+        # One request ahead in the queue plus this one, at 3 seconds each on one slot
+        assert raised.value.retry_after == 6
+        with pytest.raises(QueueFullError):
+            admission.check()
+        assert admission.rejected == 2
+
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(main())
+    assert admission.admitted == 2
+    assert admission.stats()["in_flight"] == 0
+
+
+def test_retry_after_is_at_least_one_second():
+    admission = AdmissionController(max_in_flight=4, max_queue=0)
+    assert admission.retry_after() == 1
+    admission.avg_service_time = 10.0
+    assert admission.retry_after() == 3  # ceil(10 / 4)
+
+
+def test_completed_requests_free_their_slot_for_the_queue():
+    admission = AdmissionController(max_in_flight=1, max_queue=1)
+
+    async def main():
+        first, second = asyncio.Event(), asyncio.Event()
+        entered = []
+        running = asyncio.create_task(hold(admission, first, entered))
+        queued = asyncio.create_task(hold(admission, second, entered))
+        await settle()
+        assert len(entered) == 1
+
+        first.set()
+        await settle()
+        assert len(entered) == 2
+        assert admission.stats()["queued"] == 0
+        admission.check()  # The queue has room again
+
+        second.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(main())
+    assert admission.avg_service_time > 0
+
+
+def test_cancelled_requests_give_back_their_place():
+    admission = AdmissionController(max_in_flight=1, max_queue=1)
+
+    async def main():
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(admission, release))
+        queued = asyncio.create_task(hold(admission, release))
+        await settle()
+
+        queued.cancel()  # The client went away while waiting
+        await settle()
+        assert admission.stats()["queued"] == 0
+        admission.check()
+
+        running.cancel()  # ...or while its request was running
+        await settle()
+        assert admission.stats()["in_flight"] == 0
+
+        entered, done = [], asyncio.Event()
+        done.set()
+        await asyncio.wait_for(hold(admission, done, entered), 1)
+        assert entered == [True]
+
+    asyncio.run(main())
+
+
+def test_failed_requests_release_their_slot():
+    admission = AdmissionController(max_in_flight=1, max_queue=0)
+
+    async def fail():
+        async with admission.slot():
+            raise ValueError("vision call failed")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await fail()
+        async with admission.slot():
+            pass
+
+    asyncio.run(main())
+    assert admission.admitted == 2 and admission.rejected == 0
@@ -0,0 +1,230 @@
+import asyncio
+import httpx
+import pytest
+from services.backend_pool import Backend, BackendPool, parse_backends
+from services.outbound import OutboundEndpoint, OutboundUnavailable
+
+
+def make_pool(*backends: Backend, handler=None, **kwargs) -> BackendPool:
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler or (lambda request: httpx.Response(200))))
+    return BackendPool(list(backends), http_client, **kwargs)
+
+
+def test_parse_backends_with_optional_weights():
+    backends = parse_backends("http://a:11434|2, http://b:11434/ ,")
+    assert [(b.url, b.weight) for b in backends] == [("http://a:11434", 2.0), ("http://b:11434", 1.0)]
+
+
+# --- Least outstanding requests ---
+
+def test_pick_prefers_the_lowest_load_relative_to_weight():
+    small, large = Backend("http://small"), Backend("http://large", weight=3)
+    pool = make_pool(small, large)
+    small.in_flight, large.in_flight = 1, 3  # Loads 2 and 4/3
+    assert pool.pick() is large
+    large.in_flight = 6  # Loads 2 and 7/3
+    assert pool.pick() is small
+
+
+def test_concurrent_requests_spread_across_backends():
+    a, b = Backend("http://a"), Backend("http://b")
+    pool = make_pool(a, b)
+    seen = []
+
+    async def send(url):
+        seen.append(url)
+        await asyncio.sleep(0.01)
+        return url
+
+    async def main():
+        return await asyncio.gather(*[pool.request(send) for _ in range(4)])
+
+    asyncio.run(main())
+    assert sorted(seen) == ["http://a", "http://a", "http://b", "http://b"]
+    assert a.in_flight == b.in_flight == 0
+
+
+def test_lease_holds_a_slot_until_released():
+    a, b = Backend("http://a"), Backend("http://b", weight=2)
+    pool = make_pool(a, b)
+
+    async def main():
+        async with pool.lease() as url:
+            assert url == "http://b"
+            assert b.in_flight == 1
+        assert b.in_flight == 0
+
+    asyncio.run(main())
+
+
+# --- Failover ---
+
+def test_unreachable_backend_fails_over_and_leaves_rotation():
+    down, up = Backend("http://down", weight=2), Backend("http://up")
+    pool = make_pool(down, up)
+
+    async def send(url):
+        if url == "http://down":
+            raise OutboundUnavailable("ollama", "cannot connect")
+        return url
+
+    assert asyncio.run(pool.request(send)) == "http://up"
+    assert not down.healthy
+    assert down.failures == 1
+    assert pool.pick() is up
+
+
+def test_failover_gives_up_once_every_backend_was_tried():
+    a, b = Backend("http://a"), Backend("http://b")
+    pool = make_pool(a, b)
+    tried = []
+
+    async def send(url):
+        tried.append(url)
+        raise OutboundUnavailable("ollama", "cannot connect")
+
+    with pytest.raises(OutboundUnavailable):
+        asyncio.run(pool.request(send))
+    assert sorted(tried) == ["http://a", "http://b"]
+
+
+def test_other_errors_are_not_failed_over():
+    a, b = Backend("http://a", weight=2), Backend("http://b")
+    pool = make_pool(a, b)
+    tried = []
+
+    async def send(url):
+        tried.append(url)
+        raise ValueError("bad response")
+
+    with pytest.raises(ValueError):
+        asyncio.run(pool.request(send))
+    assert tried == ["http://a"]
+    assert a.healthy
+
+
+# --- Health probes ---
+
+def test_probe_takes_failing_backends_out_and_back_in():
+    a, b = Backend("http://a"), Backend("http://b")
+    status = {"a": 200, "b": 500}
+
+    def handler(request):
+        if request.url.host == "b" and status["b"] is None:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(status[request.url.host])
+
+    pool = make_pool(a, b, handler=handler, health_interval=0.01)
+
+    async def probe_for_a_while():
+        pool.start()
+        await asyncio.sleep(0.05)
+        await pool.stop()
+
+    asyncio.run(probe_for_a_while())
+    assert a.healthy and not b.healthy
+    assert all(pool.pick() is a for _ in range(10))
+
+    status["b"] = None
+    asyncio.run(probe_for_a_while())
+    assert not b.healthy
+
+    status["b"] = 200
+    asyncio.run(probe_for_a_while())
+    assert b.healthy
+
+
+def test_open_circuit_is_skipped_even_when_the_probe_passes():
+    a, b = Backend("http://a", weight=2), Backend("http://b")
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+    outbound = OutboundEndpoint("ollama", http_client, 1, 1, failure_threshold=1, reset_timeout=30)
+    pool = BackendPool([a, b], http_client, outbound=outbound)
+
+    breaker = outbound.breaker(a.url)
+    breaker.record_failure()
+    asyncio.run(pool._probe(a))
+    assert a.healthy
+    assert pool.pick() is b
+    assert pool.stats()["backends"][0]["circuit"] == "open"
+
+    breaker.opened_at -= 30  # The reset timeout has passed; a trial call may go through
+    assert pool.pick() is a
+    breaker.before_call()
+    assert pool.pick() is b  # The trial is in flight
+
+
+def test_everything_down_still_routes_somewhere():
+    a, b = Backend("http://a"), Backend("http://b")
+    pool = make_pool(a, b)
+    a.healthy = b.healthy = False
+    assert pool.pick() in (a, b)
+    assert pool.pick(exclude=(a, b)) is None
+
+
+# --- Hedging ---
+
+def hedging_pool(*backends: Backend) -> BackendPool:
+    pool = make_pool(*backends, hedge_percentile=50, hedge_min_samples=4)
+    pool.latencies.extend([0.01] * 4)
+    return pool
+
+
+def test_no_hedging_without_enough_samples():
+    pool = make_pool(Backend("http://a"), Backend("http://b"), hedge_percentile=90, hedge_min_samples=4)
+    pool.latencies.extend([0.01] * 3)
+    assert pool.hedge_delay() is None
+    pool.latencies.append(0.02)
+    assert pool.hedge_delay() == 0.02
+
+
+def test_slow_request_is_hedged_and_the_loser_cancelled():
+    slow, fast = Backend("http://slow", weight=2), Backend("http://fast")
+    pool = hedging_pool(slow, fast)
+    cancelled = []
+
+    async def send(url):
+        if url == "http://slow":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+        return url
+
+    async def main():
+        result = await pool.request(send)
+        await asyncio.sleep(0)  # Let the cancelled hedge unwind
+        return result
+
+    assert asyncio.run(main()) == "http://fast"
+    assert pool.hedges == 1 and pool.hedge_wins == 1
+    assert cancelled == ["http://slow"]
+    assert slow.in_flight == fast.in_flight == 0
+
+
+def test_fast_request_is_not_hedged():
+    a, b = Backend("http://a", weight=2), Backend("http://b")
+    pool = hedging_pool(a, b)
+    tried = []
+
+    async def send(url):
+        tried.append(url)
+        return url
+
+    assert asyncio.run(pool.request(send)) == "http://a"
+    assert tried == ["http://a"]
+    assert pool.hedges == 0
+
+
+def test_hedge_survives_one_failed_copy():
+    slow, fast = Backend("http://slow", weight=2), Backend("http://fast")
+    pool = hedging_pool(slow, fast)
+
+    async def send(url):
+        if url == "http://slow":
+            await asyncio.sleep(0.05)
+            return url
+        raise ValueError("bad response")
+
+    assert asyncio.run(pool.request(send)) == "http://slow"
+    assert pool.hedges == 1 and pool.hedge_wins == 0
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import os
+import pytest
+from types import SimpleNamespace
+from services.catalog import CURRENT_FILE, VERSIONS_DIR, CatalogError, load_catalog
+from services.catalog_reloader import CatalogReloader
+
+MODEL = "all-MiniLM-L6-v2"
+
+
+def publish(catalog_dir, version: str, manifest: dict):
+    bundle_dir = os.path.join(catalog_dir, VERSIONS_DIR, version)
+    os.makedirs(bundle_dir)
+    with open(os.path.join(bundle_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    with open(os.path.join(catalog_dir, CURRENT_FILE), "w") as f:
+        f.write(version)
+
+
+def test_manifest_without_required_fields_is_a_catalog_error(tmp_path):
+    publish(str(tmp_path), "v2", {"schema_version": 1, "embedding_model": MODEL, "version": "v2"})
+    with pytest.raises(CatalogError, match="alias_count"):
+        load_catalog(str(tmp_path), MODEL)
+
+
+def make_reloader(catalog_dir: str, load_all_data, build_catalog=lambda data: None, interval: float = 0.01):
+    semantic_search = SimpleNamespace(catalog=SimpleNamespace(version="v1"), build_catalog=build_catalog)
+    data_loader = SimpleNamespace(config=SimpleNamespace(CATALOG_DIR=catalog_dir), load_all_data=load_all_data)
+    return CatalogReloader(data_loader, semantic_search, interval), semantic_search
+
+
+@pytest.mark.parametrize("error", [KeyError("alias_count"), PermissionError("denied"), ValueError("bad index")])
+def test_any_reload_failure_keeps_the_old_version(tmp_path, error):
+    publish(str(tmp_path), "v2", {})
+
+    def fail(*args):
+        raise error
+
+    reloader, semantic_search = make_reloader(str(tmp_path), fail)
+    with pytest.raises(CatalogError):
+        asyncio.run(reloader.reload())
+    assert semantic_search.catalog.version == "v1"
+    assert type(error).__name__ in reloader.last_error
+
+
+def test_watcher_survives_failures_and_stops_cleanly(tmp_path):
+    publish(str(tmp_path), "v2", {})
+    attempts = []
+
+    def fail():
+        attempts.append(1)
+        raise KeyError("alias_count")
+
+    reloader, _ = make_reloader(str(tmp_path), fail)
+
+    async def main():
+        reloader.start()
+        await asyncio.sleep(0.1)
+        await reloader.stop()
+
+    asyncio.run(main())
+    assert len(attempts) > 1
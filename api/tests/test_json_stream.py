@@ -0,0 +1,98 @@
+import json
+import random
+import pytest
+from services.json_stream import IncrementalJsonParser
+
+# Characters that exercise the tokenizer: quotes, escapes, brackets and separators inside strings
+TRICKY_TEXT = ['"', "\\", "{", "}", "[", "]", ",", ":", "\n", "\t", " ", "é", "😀", " ", "a", "Z", "0"]
+
+
+def random_string(rng: random.Random) -> str:
+    return "".join(rng.choice(TRICKY_TEXT) for _ in range(rng.randint(0, 8)))
+
+
+def random_value(rng: random.Random, depth: int = 0):
+    kinds = ["string", "int", "float", "bool", "null"] + (["list", "object"] if depth < 3 else [])
+    kind = rng.choice(kinds)
+    if kind == "string":
+        return random_string(rng)
+    if kind == "int":
+        return rng.randint(-10**6, 10**6)
+    if kind == "float":
+        return rng.uniform(-1e3, 1e3)
+    if kind == "bool":
+        return rng.random() < 0.5
+    if kind == "null":
+        return None
+    if kind == "list":
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {random_string(rng): random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+
+
+def random_document(rng: random.Random) -> dict:
+    return {random_string(rng): random_value(rng) for _ in range(rng.randint(0, 6))}
+
+
+def serialize(document: dict, rng: random.Random) -> str:
+    text = json.dumps(
+        document,
+        indent=rng.choice([None, 2]),
+        separators=rng.choice([None, (",", ":"), (" , ", " : ")]),
+        ensure_ascii=rng.random() < 0.5,
+    )
+    if rng.random() < 0.5:
+        text = f"```json\n{text}\n```"  # Fenced the way models often answer
+    return text
+
+
+def split_randomly(text: str, rng: random.Random) -> list:
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 20))))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def expected_events(document: dict) -> list:
+    """Every element of a top-level array as an item, then each top-level field once it closes."""
+    events = []
+    for key, value in document.items():
+        if isinstance(value, list):
+            events.extend(("item", key, element) for element in value)
+        events.append(("field", key, value))
+    return events
+
+
+def parse(chunks: list) -> tuple:
+    parser = IncrementalJsonParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events, parser.done
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunking_matches_json_loads(seed):
+    rng = random.Random(seed)
+    for _ in range(150):
+        text = serialize(random_document(rng), rng)
+        document = json.loads(text.removeprefix("```json\n").removesuffix("\n```"))
+        events, done = parse(split_randomly(text, rng))
+        assert events == expected_events(document), text
+        assert done
+
+
+def test_single_characters():
+    text = json.dumps({"type": "wallet \"x\" {y}", "items": [{"a": [1, {"b": "]"}]}, "\\"], "n": -1.5e3, "z": None})
+    events, done = parse(list(text))
+    assert events == expected_events(json.loads(text))
+    assert done
+
+
+def test_text_after_the_object_is_ignored():
+    events, done = parse(['{"type": "bag"}', ' and then {"type": "other"}'])
+    assert events == [("field", "type", "bag")]
+    assert done
+
+
+def test_incomplete_values_are_not_reported():
+    events, done = parse(['{"type": "wal', 'let", "items": [{"color": "re'])
+    assert events == [("field", "type", "wallet")]
+    assert not done
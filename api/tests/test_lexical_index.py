@@ -0,0 +1,104 @@
+import pytest
+from services.lexical_index import LexicalIndex, edit_distance, lexical_key, singularize
+
+ALIASES = [
+    "Wallet", "T-Shirt", "Car Keys", "Backpack", "Umbrella", "Sunglasses",
+    "U.S. Currency", "Foreign Currency", "Bike Lock", "Bike Sock",
+]
+
+
+@pytest.fixture
+def index():
+    alias_to_pc = {alias: str(100 + i) for i, alias in enumerate(ALIASES)}
+    return LexicalIndex(ALIASES, alias_to_pc, min_similarity=0.7)
+
+
+def resolve(index: LexicalIndex, item_type: str):
+    match = index.lookup(item_type)
+    return (ALIASES[match[0]], match[1]) if match else None
+
+
+@pytest.mark.parametrize("word, singular", [
+    ("wallets", "wallet"),
+    ("keys", "key"),
+    ("batteries", "battery"),
+    ("watches", "watch"),
+    ("brushes", "brush"),
+    ("boxes", "box"),
+    ("glasses", "glass"),
+    ("shoes", "shoe"),
+    ("glass", "glass"),
+    ("bus", "bus"),
+    ("iris", "iris"),
+    ("canvas", "canvas"),
+    ("ids", "ids"),  # Too short to tell
+])
+def test_singularize(word, singular):
+    assert singularize(word) == singular
+
+
+@pytest.mark.parametrize("text, key", [
+    ("T-Shirts", "tshirt"),
+    ("  Car   KEYS ", "carkey"),
+    ("iPhone_Charger", "iphonecharger"),
+    ("U.S. Currencies", "uscurrency"),
+    ("€", ""),
+])
+def test_lexical_key(text, key):
+    assert lexical_key(text) == key
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("umbrela", "umbrella", 1),
+    ("bakcpack", "backpack", 1),  # Transposition
+    ("kitten", "sitting", 3),
+    ("currency", "uscurrency", 2),
+    ("", "abc", 3),
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b) == distance == edit_distance(b, a)
+
+
+def test_exact_tier_ignores_case_and_spacing(index):
+    assert resolve(index, " wallet ") == ("Wallet", "exact")
+    assert resolve(index, "car  keys") == ("Car Keys", "exact")
+
+
+def test_normalized_tier_ignores_punctuation_and_plurals(index):
+    assert resolve(index, "T shirts") == ("T-Shirt", "normalized")
+    assert resolve(index, "car key") == ("Car Keys", "normalized")
+    assert resolve(index, "US currencies") == ("U.S. Currency", "normalized")
+
+
+@pytest.mark.parametrize("item_type, alias", [
+    ("umbrela", "Umbrella"),
+    ("backpak", "Backpack"),
+    ("sunglases", "Sunglasses"),
+])
+def test_trigram_tier_accepts_misspellings(index, item_type, alias):
+    assert resolve(index, item_type) == (alias, "trigram")
+
+
+@pytest.mark.parametrize("item_type", [
+    "currency",  # A different word close to two aliases; which one is for the embeddings to decide
+    "bike rock",  # One edit from aliases of two product codes
+    "wallet chain",  # A longer key is a different item
+    "walt",  # Too short for trigrams
+    "laptop",
+])
+def test_ambiguous_or_distant_types_fall_through_to_embeddings(index, item_type):
+    assert index.lookup(item_type) is None
+
+
+def test_keys_shared_across_product_codes_are_ambiguous():
+    aliases = ["Keys", "key", "Phone Case", "phone cases"]
+    index = LexicalIndex(aliases, {"Keys": "1", "key": "2", "Phone Case": "3", "phone cases": "3"})
+    assert index.lookup("keys") == (0, "exact")
+    assert index.lookup("KEY") == (1, "exact")
+    assert index.lookup("Keys!") is None  # The normalized key "key" names two product codes
+    assert index.lookup("phone-case") == (2, "normalized")  # Same product code, so not ambiguous
+
+
+def test_trigrams_can_be_switched_off():
+    index = LexicalIndex(ALIASES, {}, min_similarity=1.1)
+    assert index.lookup("umbrela") is None
@@ -0,0 +1,64 @@
+import asyncio
+import os
+import sqlite3
+import time
+from services.database import DatabaseService
+from services.image_store import ImageStore
+from services.log_maintenance import LogMaintenance
+
+DAY = 86400
+
+
+def _log(db_path: str, store: ImageStore, image: bytes, days_ago: float) -> str:
+    """Store an image and log a request for it, dated days_ago."""
+    image_hash, size = store.put(image)
+    old = time.time() - 2 * DAY  # Past the sweep's grace period
+    os.utime(store.path(image_hash), (old, old))
+    db = DatabaseService(db_path)
+    request_id = db.generate_request_id()
+    db.log_response(request_id, image_hash, size, {"type": "wallet"}, 1.0)
+    db.close()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE logs SET created_at = datetime('now', ?) WHERE request_id = ?",
+                     (f"-{days_ago} days", request_id))
+    return image_hash
+
+
+def test_retention_sweeps_unreferenced_images(tmp_path):
+    db_path = str(tmp_path / "logs.db")
+    store = ImageStore(str(tmp_path / "images"))
+    expired = _log(db_path, store, b"expired image", days_ago=100)
+    archived = _log(db_path, store, b"archived image", days_ago=40)
+    live = _log(db_path, store, b"live image", days_ago=1)
+    fresh, _ = store.put(b"just stored, row still queued")
+
+    maintenance = LogMaintenance(db_path, str(tmp_path / "archive"), hot_days=30, retention_days=60, interval=0,
+                                 image_store=store)
+    summary = maintenance.run()
+
+    assert summary["expired_rows"] == 1
+    assert summary["archived_rows"] == 1
+    assert summary["removed_images"] == 1
+    assert store.get(expired) is None and not os.path.exists(store.thumbnail_path(expired))
+    assert store.get(archived) is not None
+    assert store.get(live) is not None
+    assert store.get(fresh) is not None
+
+
+def test_loop_survives_errors(tmp_path):
+    maintenance = LogMaintenance(str(tmp_path / "logs.db"), str(tmp_path / "archive"), 30, 60, interval=0.01)
+    runs = []
+
+    def failing_run():
+        runs.append(1)
+        raise OSError("read-only file system")
+
+    maintenance.run = failing_run
+
+    async def main():
+        maintenance.start()
+        await asyncio.sleep(0.1)
+        await maintenance.stop()
+
+    asyncio.run(main())
+    assert len(runs) > 1
@@ -0,0 +1,330 @@
+import asyncio
+import httpx
+import pytest
+from types import SimpleNamespace
+from services import outbound
+from services.outbound import (
+    CircuitBreaker, CircuitOpenError, OutboundEndpoint, OutboundError, OutboundStatusError, OutboundTimeout,
+    OutboundUnavailable,
+)
+
+URL = "http://backend:8000/encode-batch"
+
+
+class Clock:
+    """Stands in for time.monotonic so breaker timeouts pass without waiting."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbound, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff waits instead of sleeping; random.uniform returns its upper bound."""
+    waits = []
+
+    async def sleep(seconds):
+        waits.append(seconds)
+
+    monkeypatch.setattr(outbound, "asyncio", SimpleNamespace(sleep=sleep))
+    monkeypatch.setattr(outbound, "random", SimpleNamespace(uniform=lambda low, high: high))
+    return waits
+
+
+def make_endpoint(handler, **kwargs) -> OutboundEndpoint:
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return OutboundEndpoint("test", http_client, connect_timeout=1, read_timeout=1, **kwargs)
+
+
+def responses(*outcomes):
+    """A transport handler that answers with each status (or raises each exception) in turn."""
+    calls = []
+
+    def handler(request):
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(request)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={})
+
+    return handler, calls
+
+
+# --- Circuit breaker state machine ---
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", "http://backend", failure_threshold=3, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # Resets the count; only consecutive failures trip the breaker
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.stats() == {"state": "open", "consecutive_failures": 3, "trips": 1}
+    clock.now += 2.5
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 8
+
+
+def test_half_open_lets_one_trial_through_and_closes_on_success(clock):
+    breaker = CircuitBreaker("test", "http://backend", failure_threshold=1, reset_timeout=10)
+    assert breaker.before_call() is False  # Closed: no trial involved
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.before_call() is True
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()  # The trial is still in flight
+    assert raised.value.retry_after == 1
+
+    breaker.record_success(trial=True)
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_for_a_full_reset_timeout(clock):
+    breaker = CircuitBreaker("test", "http://backend", failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 10
+    trial = breaker.before_call()
+    breaker.record_failure(trial)  # One failure is enough while half-open
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 10
+
+
+def test_released_trial_lets_the_next_one_through(clock):
+    breaker = CircuitBreaker("test", "http://backend", failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_calls_from_before_the_circuit_opened_do_not_decide_it(clock):
+    breaker = CircuitBreaker("test", "http://backend", failure_threshold=1, reset_timeout=10)
+    stale = breaker.before_call()  # Started while closed
+    breaker.record_failure()
+    breaker.record_success(stale)  # Finished after the circuit opened
+    assert breaker.state == "open"
+
+    clock.now += 10
+    trial = breaker.before_call()
+    breaker.record_failure(stale)  # Must not reopen, or free the slot, while the trial is in flight
+    breaker.record_success(stale)
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success(trial)
+    assert breaker.state == "closed"
+
+
+def test_zero_threshold_disables_the_breaker(clock):
+    breaker = CircuitBreaker("test", "http://backend", failure_threshold=0, reset_timeout=10)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+# --- Retry policy ---
+
+def test_idempotent_call_retries_overload_statuses_with_jittered_backoff(sleeps):
+    handler, calls = responses(503, 429, 200)
+    endpoint = make_endpoint(handler, retries=2, backoff=0.2)
+    response = asyncio.run(endpoint.request("POST", URL, idempotent=True))
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert sleeps == [0.2, 0.4]  # Upper bounds of the full-jitter waits, doubling per attempt
+    assert endpoint.stats()["retries"] == 2
+
+
+def test_backoff_is_drawn_from_zero_to_the_exponential_bound(monkeypatch, sleeps):
+    bounds = []
+    monkeypatch.setattr(outbound, "random", SimpleNamespace(uniform=lambda low, high: bounds.append((low, high)) or 0))
+    handler, _ = responses(503)
+    endpoint = make_endpoint(handler, retries=3, backoff=0.5)
+    with pytest.raises(OutboundStatusError):
+        asyncio.run(endpoint.request("POST", URL, idempotent=True))
+    assert bounds == [(0, 0.5), (0, 1.0), (0, 2.0)]
+
+
+def test_retries_stop_at_the_limit(sleeps):
+    handler, calls = responses(503)
+    endpoint = make_endpoint(handler, retries=2)
+    with pytest.raises(OutboundStatusError) as raised:
+        asyncio.run(endpoint.request("POST", URL, idempotent=True))
+    assert raised.value.status_code == 503
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("status", [400, 404, 500])
+def test_other_statuses_are_not_retried(sleeps, status):
+    handler, calls = responses(status)
+    endpoint = make_endpoint(handler, retries=2)
+    with pytest.raises(OutboundStatusError):
+        asyncio.run(endpoint.request("POST", URL, idempotent=True))
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_client_errors_do_not_count_against_the_breaker(sleeps):
+    handler, _ = responses(400)
+    endpoint = make_endpoint(handler, failure_threshold=1)
+    for _ in range(3):
+        with pytest.raises(OutboundStatusError):
+            asyncio.run(endpoint.request("POST", URL))
+    assert endpoint.breaker(URL).stats() == {"state": "closed", "consecutive_failures": 0, "trips": 0}
+
+
+def test_non_idempotent_call_is_not_retried(sleeps):
+    handler, calls = responses(503, 200)
+    endpoint = make_endpoint(handler, retries=2)
+    with pytest.raises(OutboundStatusError):
+        asyncio.run(endpoint.request("POST", URL))
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("idempotent, attempts", [(True, 2), (False, 1)])
+def test_timeouts_are_retried_only_when_idempotent(sleeps, idempotent, attempts):
+    handler, calls = responses(httpx.ReadTimeout("slow"))
+    endpoint = make_endpoint(handler, retries=1)
+    with pytest.raises(OutboundTimeout):
+        asyncio.run(endpoint.request("POST", URL, idempotent=idempotent))
+    assert len(calls) == attempts
+
+
+def test_refused_connections_are_retried_even_when_not_idempotent(sleeps):
+    handler, calls = responses(httpx.ConnectError("refused"), 200)
+    endpoint = make_endpoint(handler, retries=1)
+    response = asyncio.run(endpoint.request("POST", URL))
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("error", [httpx.ConnectError("refused"), httpx.ConnectTimeout("blackholed")])
+def test_unreachable_hosts_are_unavailable_and_retried_even_when_not_idempotent(sleeps, error):
+    handler, calls = responses(error)
+    endpoint = make_endpoint(handler, retries=1)
+    with pytest.raises(OutboundUnavailable) as raised:
+        asyncio.run(endpoint.request("POST", URL))
+    assert not isinstance(raised.value, OutboundTimeout)
+    assert len(calls) == 2
+
+
+def test_other_transport_errors_are_typed():
+    handler, _ = responses(httpx.RemoteProtocolError("closed mid-response"))
+    endpoint = make_endpoint(handler)
+    with pytest.raises(OutboundError, match="RemoteProtocolError") as raised:
+        asyncio.run(endpoint.request("POST", URL))
+    assert not isinstance(raised.value, (OutboundTimeout, OutboundUnavailable))
+
+
+# --- Retries and the breaker together ---
+
+def test_open_circuit_fails_fast_without_retrying(clock, sleeps):
+    handler, calls = responses(httpx.ConnectError("refused"))
+    endpoint = make_endpoint(handler, retries=5, failure_threshold=2, reset_timeout=30)
+    with pytest.raises(CircuitOpenError) as raised:
+        asyncio.run(endpoint.request("POST", URL, idempotent=True))
+    assert len(calls) == 2  # The second failure opened the circuit; the third attempt never reached the backend
+    assert raised.value.retry_after == 30
+    assert endpoint.stats()["circuits"]["http://backend:8000"]["state"] == "open"
+
+
+def test_breakers_are_kept_per_host(clock):
+    handler, _ = responses(503)
+    endpoint = make_endpoint(handler, failure_threshold=1)
+    with pytest.raises(OutboundStatusError):
+        asyncio.run(endpoint.request("POST", URL))
+    assert endpoint.breaker("http://backend:8000/other").state == "open"
+    assert endpoint.breaker("http://other:8000/encode-batch").state == "closed"
+
+
+def test_cancelled_trial_releases_the_half_open_slot(clock):
+    sent = []
+
+    async def handler(request):
+        sent.append(request)
+        await asyncio.sleep(60)
+
+    endpoint = make_endpoint(handler, failure_threshold=1, reset_timeout=10)
+    breaker = endpoint.breaker(URL)
+    breaker.record_failure()
+    clock.now += 10
+
+    async def main():
+        call = asyncio.create_task(endpoint.request("POST", URL))
+        while not sent:
+            await asyncio.sleep(0)
+        call.cancel()  # As when a hedged request loses the race
+        with pytest.raises(asyncio.CancelledError):
+            await call
+
+    asyncio.run(main())
+    assert breaker.state == "half_open"
+    breaker.before_call()  # Not blocked by the abandoned trial
+
+
+def test_stale_call_neither_frees_nor_decides_the_trial(clock):
+    sent, gate = [], asyncio.Event()
+
+    async def handler(request):
+        if request.url.path == "/slow":
+            sent.append(request)
+            await gate.wait()
+            return httpx.Response(200)
+        raise httpx.ConnectError("refused")
+
+    endpoint = make_endpoint(handler, failure_threshold=1, reset_timeout=10)
+    breaker = endpoint.breaker(URL)
+
+    async def main():
+        slow = asyncio.create_task(endpoint.request("POST", "http://backend:8000/slow"))
+        while not sent:
+            await asyncio.sleep(0)
+        with pytest.raises(OutboundUnavailable):
+            await endpoint.request("POST", URL)  # Opens the circuit while the slow call is in flight
+        clock.now += 10
+        assert breaker.before_call()  # Another request holds the half-open trial
+        gate.set()
+        assert (await slow).status_code == 200
+
+    asyncio.run(main())
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # The trial is still held
+
+
+def test_stream_failure_counts_against_the_breaker(clock):
+    handler, _ = responses(502)
+    endpoint = make_endpoint(handler, failure_threshold=1)
+
+    async def main():
+        async with endpoint.stream("POST", URL):
+            pass
+
+    with pytest.raises(OutboundStatusError):
+        asyncio.run(main())
+    assert endpoint.breaker(URL).state == "open"
@@ -0,0 +1,18 @@
+import filecmp
+import os
+import pytest
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+SHARED_DIR = os.path.join(REPO_ROOT, "shared")
+TARGETS = ["api/services", "refactored/services", "streamlit_ui"]
+
+# The API's build context contains only api/; the check needs the whole repository
+pytestmark = pytest.mark.skipif(not os.path.isdir(SHARED_DIR), reason="shared/ is not in this checkout")
+
+
+@pytest.mark.parametrize("target", TARGETS)
+def test_copies_match_shared(target):
+    modules = sorted(name for name in os.listdir(SHARED_DIR) if name.endswith(".py"))
+    assert modules
+    _, mismatch, errors = filecmp.cmpfiles(SHARED_DIR, os.path.join(REPO_ROOT, target), modules, shallow=False)
+    assert not mismatch and not errors, f"run `make sync-shared`: {mismatch + errors} differ in {target}"
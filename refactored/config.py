@@ -6,11 +6,28 @@ class AppConfig:
     """Application configuration settings."""
     OLLAMA_HOST: str = os.getenv("OLLAMA_HOST", "http://host.docker.internal:11434")
     MODEL_SERVER_URL: str = os.getenv("MODEL_SERVER", "http://host.docker.internal:8000")
+    OLLAMA_CONNECT_TIMEOUT: float = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))  # Seconds
+    OLLAMA_READ_TIMEOUT: float = float(os.getenv("OLLAMA_READ_TIMEOUT", "180"))  # Seconds without a byte from Ollama
+    MODEL_SERVER_CONNECT_TIMEOUT: float = float(os.getenv("MODEL_SERVER_CONNECT_TIMEOUT", "2"))  # Seconds
+    MODEL_SERVER_READ_TIMEOUT: float = float(os.getenv("MODEL_SERVER_READ_TIMEOUT", "10"))  # Seconds
+    MODEL_SERVER_RETRIES: int = int(os.getenv("MODEL_SERVER_RETRIES", "2"))  # Encoding is idempotent; generations are not retried
+    OUTBOUND_RETRY_BACKOFF: float = float(os.getenv("OUTBOUND_RETRY_BACKOFF", "0.2"))  # Seconds; doubled per retry, with full jitter
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures that open a circuit; 0 disables
+    BREAKER_RESET_TIMEOUT: float = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))  # Seconds before an open circuit lets a trial call through
     LOG_FILE: str = os.path.join("/app/logs", "streamlit_log.log")
     DB_FILE: str = os.path.join("/app/logs", "streamlit_db.db")
+    IMAGE_STORE_DIR: str = os.getenv("IMAGE_STORE_DIR", "/app/logs/images")  # Uploaded images, content-addressed
+    CATALOG_DIR: str = os.getenv("CATALOG_DIR", "data/catalog")
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     MODEL: str = "qwen2.5vl:7b"
     TEMPERATURE: float = 0.0
     REPEAT_PENALTY: float = 1.2
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "1000"))
+    RESULT_CACHE_TTL: float = float(os.getenv("RESULT_CACHE_TTL", "86400"))  # Seconds; 0 disables expiry
+    RESULT_CACHE_PATH: str = os.getenv("RESULT_CACHE_PATH", "")  # Set to persist results on disk
+    IMAGE_MAX_SIDE: int = int(os.getenv("IMAGE_MAX_SIDE", "1280"))  # Longest side in pixels; 0 disables
+    IMAGE_MAX_PIXELS: int = int(os.getenv("IMAGE_MAX_PIXELS", "1003520"))  # ~1280 vision tokens; 0 disables
+    IMAGE_JPEG_QUALITY: int = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
     
     @property
     def SYSTEM_PROMPT(self) -> str:
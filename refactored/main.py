@@ -1,12 +1,16 @@
 import streamlit as st
 from config import AppConfig
+from services.catalog import CatalogError
 from services.data_loader import DataLoader
 from services.database import DatabaseService
+from services.image_store import ImageStore
+from services.outbound import OutboundError
 from services.vision_service import VisionService
 from services.semantic_search import SemanticSearchService
 from ui.components import UIComponents
 from ui.image_handler import ImageHandler
 from utils.logger import setup_logging
+from typing import Callable, Optional
 import time
 
 # Setup logging
@@ -16,6 +20,7 @@ class StreamlitApp:
     def __init__(self):
         self.config = AppConfig()
         self.db_service = DatabaseService()
+        self.image_store = ImageStore(self.config.IMAGE_STORE_DIR)
         self.vision_service = VisionService(self.config)
         self.semantic_search = SemanticSearchService(self.config)
         self.ui_components = UIComponents()
@@ -25,22 +30,32 @@ class StreamlitApp:
         self._initialize_data()
     
     def _initialize_data(self):
-        """Initialize application data and cache it in session state."""
-        if "data_loaded" not in st.session_state:
-            with st.spinner("Loading application data..."):
-                data_loader = DataLoader()
-                data = data_loader.load_all_data()
-                
-                # Store in session state
-                for key, value in data.items():
-                    st.session_state[key] = value
-                
-                st.session_state.data_loaded = True
-                st.session_state.semantic_search = self.semantic_search
+        """Initialize application data and cache it in session state, switching to newly published catalogs."""
+        data_loader = DataLoader(self.config)
+        version = data_loader.published_version()
+        if st.session_state.get("catalog_version") == version:
+            return
+
+        with st.spinner("Loading application data..."):
+            try:
+                data = data_loader.load_all_data(version)
+            except CatalogError as e:
+                if "data_loaded" not in st.session_state:
+                    raise
+                print(f"Catalog reload failed, keeping {st.session_state.catalog_version}: {e}", flush=True)
+                return
+
+            # Store in session state; the whole version is in place before this run uses it
+            for key, value in data.items():
+                st.session_state[key] = value
+
+            st.session_state.catalog_version = version
+            st.session_state.data_loaded = True
+            st.session_state.semantic_search = self.semantic_search
     
     def _reset_analysis_state(self):
         """Reset analysis-related session state for new images."""
-        analysis_keys = ['response', 'response_time', 'feedback', 'saved_types']
+        analysis_keys = ['response', 'response_time', 'cached', 'feedback', 'saved_types']
         for key in analysis_keys:
             if key in st.session_state:
                 del st.session_state[key]
@@ -52,29 +67,57 @@ class StreamlitApp:
             st.session_state.last_image_id = image_id
             st.session_state.request_id = self.db_service.generate_request_id()
     
-    def _analyze_image(self, image_bytes: bytes) -> dict:
-        """Analyze the uploaded image and return results."""
+    def _enrich_items(self, items: list):
+        """Add the closest Chargerback type and product code to every item, with one embedding request."""
+        matches = self.semantic_search.find_closest_matches_batch([item.get("type", "unknown") for item in items])
+        for item, (cb_type, product_code) in zip(items, matches):
+            item["cb_type"] = cb_type
+            item["product_code"] = product_code
+    
+    def _analyze_image(self, image_bytes: bytes, on_item: Optional[Callable[[dict], None]] = None) -> dict:
+        """Analyze the uploaded image and return results, passing each item to on_item as soon as it is generated.
+
+        Streamed items are shown before type matching, which runs once for all items when generation ends.
+        """
         try:
             start_time = time.time()
-            result = self.vision_service.analyze_image(image_bytes)
-            end_time = time.time()
+            first_field_time = None
+            ollama_stats = {}
+            result = self.vision_service.get_cached(image_bytes)
+            cached = result is not None
+            
+            if not cached:
+                for kind, key, value in self.vision_service.analyze_image_stream(image_bytes):
+                    if kind == "result":
+                        result = value
+                        continue
+                    if kind == "stats":
+                        ollama_stats = value
+                        continue
+                    if first_field_time is None:
+                        first_field_time = round(time.time() - start_time, 2)
+                    if kind == "item" and key == "items" and isinstance(value, dict) and on_item:
+                        on_item(value)
             
+            end_time = time.time()
             response_time = round(end_time - start_time, 2)
             
             # Enrich results with semantic search
             if result and "items" in result:
-                for item in result["items"]:
-                    cb_type, product_code = self.semantic_search.find_closest_match(
-                        item.get("type", "unknown")
-                    )
-                    item["cb_type"] = cb_type
-                    item["product_code"] = product_code
+                self._enrich_items(result["items"])
             
             return {
                 "result": result,
                 "response_time": response_time,
+                "first_field_time": first_field_time,
+                "ollama_stats": ollama_stats,
+                "cached": cached,
                 "success": True
             }
+        except OutboundError as e:
+            retry = f" Try again in {e.retry_after} seconds." if e.retry_after else ""
+            st.error(f"Analysis failed, a backend did not answer: {e}.{retry}")
+            return {"success": False, "error": str(e)}
         except Exception as e:
             st.error(f"Analysis failed: {e}")
             return {"success": False, "error": str(e)}
@@ -94,9 +137,6 @@ class StreamlitApp:
             image_id = f"{image_source}_{image_name}"
             self._handle_new_image(image_id)
             
-            # Store image in session state
-            st.session_state.image = self.image_handler.encode_image(image_bytes)
-            
             # Display image
             st.image(image_bytes, caption=f"Image from {image_source}", use_container_width=True)
             
@@ -110,27 +150,37 @@ class StreamlitApp:
             
             # Analysis button
             if st.button("🔍 Analyze"):
-                with st.spinner("⏳ Analyzing image..."):
-                    analysis_result = self._analyze_image(image_bytes)
+                # Show items while the model is still generating; replaced by the full results below
+                progress = st.empty()
+                with progress.container():
+                    with st.spinner("⏳ Analyzing image..."):
+                        analysis_result = self._analyze_image(image_bytes, self.ui_components.display_item_result)
+                progress.empty()
                 
                 if analysis_result["success"]:
                     st.session_state.response = analysis_result["result"]
                     st.session_state.response_time = analysis_result["response_time"]
+                    st.session_state.cached = analysis_result["cached"]
                     st.session_state.feedback = None
                     
-                    # Log the response
+                    # Log the response; the image itself is kept once in the image store
+                    image_hash, image_size = self.image_store.put(image_bytes)
                     self.db_service.log_response(
                         st.session_state.request_id,
-                        st.session_state.image,
+                        image_hash,
+                        image_size,
                         st.session_state.response,
-                        st.session_state.response_time
+                        st.session_state.response_time,
+                        analysis_result["first_field_time"],
+                        analysis_result["ollama_stats"]
                     )
             
             # Display results
             if st.session_state.response:
                 self.ui_components.display_results(
                     st.session_state.response,
-                    st.session_state.response_time if st.session_state.response_time is not None else 0.0
+                    st.session_state.response_time if st.session_state.response_time is not None else 0.0,
+                    st.session_state.get("cached", False)
                 )
                 
                 # Handle feedback
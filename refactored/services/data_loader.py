@@ -1,31 +1,29 @@
-import pickle
 import streamlit as st
 import time
+from config import AppConfig
+from services.catalog import catalog_version, load_catalog
+from services.vector_index import VectorIndex
 
 class DataLoader:
-    """Handles loading and caching of pickle data files."""
+    """Handles loading and caching of the versioned catalog bundle."""
+
+    def __init__(self, config: AppConfig):
+        self.config = config
     
-    @st.cache_resource
-    def load_all_data(_self):
-        """Load all necessary pickle files for the application."""
+    def published_version(self):
+        """Return the catalog version currently published in CATALOG_DIR (a small file read)."""
+        return catalog_version(self.config.CATALOG_DIR)
+
+    @st.cache_resource(max_entries=2)
+    def load_all_data(_self, version=None):
+        """Load the catalog bundle (embeddings are memory-mapped, not copied), cached per published version."""
         start_time = time.time()
-        print("Loading pickle file data...", flush=True)
-        
-        data = {}
-        
-        with open("data/pc_to_item.pkl", "rb") as f:
-            data["PC_TO_ITEM"] = pickle.load(f)
-        
-        with open("data/alias_to_pc.pkl", "rb") as f:
-            data["ALIAS_TO_PC"] = pickle.load(f)
-        
-        with open("data/aliases.pkl", "rb") as f:
-            data["ALIASES"] = pickle.load(f)
+        print(f"Loading catalog from {_self.config.CATALOG_DIR}...", flush=True)
         
-        with open("data/alias_embeddings.pkl", "rb") as f:
-            data["ALIAS_EMBEDDINGS"] = pickle.load(f)
+        data = load_catalog(_self.config.CATALOG_DIR, _self.config.EMBEDDING_MODEL)
+        data["ALIAS_INDEX"] = VectorIndex(data["ALIAS_EMBEDDINGS"])
         
         end_time = time.time()
-        print(f"Data loaded in {end_time - start_time:.2f} seconds", flush=True)
+        print(f"Catalog {data['CATALOG_VERSION']} loaded in {end_time - start_time:.2f} seconds", flush=True)
         
         return data
@@ -1,72 +1,105 @@
-import sqlite3
 import json
 import uuid
 import streamlit as st
-from typing import Optional
+from services.sqlite_writer import SQLiteWriter, connect
+from typing import Dict, Optional
+
+@st.cache_resource
+def get_log_writer(db_path: str) -> SQLiteWriter:
+    """Share one background writer per database across sessions and reruns."""
+    return SQLiteWriter(db_path)
 
 class DatabaseService:
-    """Handles all database operations."""
+    """Handles all database operations.
+    
+    Writes are queued to a shared background writer, so the UI never waits on
+    a commit and concurrent sessions cannot lock each other out.
+    """
+    
+    # Columns added after the original logs schema, created on existing databases at startup
+    ADDED_COLUMNS = {
+        "image_hash": "TEXT",
+        "image_size": "INTEGER",
+        "first_field_time": "REAL",
+        "total_duration": "INTEGER",
+        "load_duration": "INTEGER",
+        "prompt_eval_count": "INTEGER",
+        "prompt_eval_duration": "INTEGER",
+        "eval_count": "INTEGER",
+        "eval_duration": "INTEGER",
+    }
+    
+    INDEXES = (
+        "CREATE INDEX IF NOT EXISTS idx_logs_created_at ON logs (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_response_time ON logs (response_time)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_feedback ON logs (feedback, created_at) WHERE feedback IS NOT NULL",
+    )
+    
+    # Ollama timing (nanoseconds) and token counts stored with each analysis
+    OLLAMA_STATS_COLUMNS = (
+        "total_duration", "load_duration", "prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration",
+    )
     
     def __init__(self, db_path: str = "/app/logs/streamlit_db.db"):
         self.db_path = db_path
         self._initialize_database()
+        self.writer = get_log_writer(db_path)
     
     def _initialize_database(self):
         """Create database tables if they don't exist."""
-        with self.get_connection() as conn:
+        with connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS logs (
                     request_id TEXT PRIMARY KEY,
-                    image BLOB,
+                    image BLOB,  -- Legacy base64 uploads; new rows use image_hash (see api/migrate_image_store.py)
+                    image_hash TEXT,
+                    image_size INTEGER,
                     response TEXT,
                     response_time REAL,
                     feedback TEXT,
                     types TEXT,
+                    first_field_time REAL,
+                    total_duration INTEGER,
+                    load_duration INTEGER,
+                    prompt_eval_count INTEGER,
+                    prompt_eval_duration INTEGER,
+                    eval_count INTEGER,
+                    eval_duration INTEGER,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+            existing = {row[1] for row in cursor.execute("PRAGMA table_info(logs)")}
+            for column, column_type in self.ADDED_COLUMNS.items():
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE logs ADD COLUMN {column} {column_type}")
+            for index in self.INDEXES:
+                cursor.execute(index)
             conn.commit()
     
-    def get_connection(self):
-        """Get database connection."""
-        return sqlite3.connect(self.db_path)
-    
     def generate_request_id(self) -> str:
         """Generate a unique request ID."""
         return str(uuid.uuid4())
     
-    def log_response(self, request_id: str, image: str, response: dict, response_time: float):
-        """Log analysis response to database."""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM logs WHERE request_id = ?", (request_id,))
-            
-            if cursor.fetchone() is not None:
-                return  # Skip if already logged
-            
-            cursor.execute('''
-                INSERT INTO logs (request_id, image, response, response_time)
-                VALUES (?, ?, ?, ?)
-            ''', (request_id, image, json.dumps(response), response_time))
-            conn.commit()
+    def log_response(self, request_id: str, image_hash: str, image_size: int, response: dict, response_time: float,
+                     first_field_time: Optional[float] = None, ollama_stats: Optional[Dict[str, int]] = None):
+        """Queue an analysis response for the log; a request that is already logged keeps its first response."""
+        ollama_stats = ollama_stats or {}
+        columns = ("image_hash", "image_size", "response", "response_time", "first_field_time", *self.OLLAMA_STATS_COLUMNS)
+        self.writer.execute(f'''
+            INSERT INTO logs (request_id, {", ".join(columns)})
+            VALUES (?, {", ".join("?" for _ in columns)})
+            ON CONFLICT(request_id) DO UPDATE SET {", ".join(f"{c} = excluded.{c}" for c in columns)}
+            WHERE logs.response IS NULL
+        ''', (
+            request_id, image_hash, image_size, json.dumps(response), response_time, first_field_time,
+            *(ollama_stats.get(column) for column in self.OLLAMA_STATS_COLUMNS),
+        ))
     
     def log_feedback(self, request_id: str, feedback: Optional[str]):
-        """Log user feedback to database."""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE logs SET feedback = ? WHERE request_id = ?",
-                (feedback, request_id)
-            )
-            conn.commit()
+        """Queue user feedback for the log (applied after the response, since the writer keeps queue order)."""
+        self.writer.execute("UPDATE logs SET feedback = ? WHERE request_id = ?", (feedback, request_id))
     
     def log_types(self, request_id: str, types: dict):
-        """Log saved types to database."""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE logs SET types = ? WHERE request_id = ?",
-                (json.dumps(types), request_id)
-            )
-            conn.commit()
+        """Queue saved types for the log."""
+        self.writer.execute("UPDATE logs SET types = ? WHERE request_id = ?", (json.dumps(types), request_id))
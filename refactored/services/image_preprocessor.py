@@ -0,0 +1,102 @@
+import io
+import math
+from dataclasses import dataclass, asdict
+from typing import Tuple
+from PIL import Image, ImageOps
+
+# qwen2.5-vl turns each 28x28 pixel block into one vision token (14px patches merged 2x2)
+VISION_TOKEN_PIXELS = 28
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash; stable under recompression, rescaling and light edits."""
+    pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] < pixels[row * 9 + col + 1])
+    return value
+
+
+def estimate_vision_tokens(width: int, height: int) -> int:
+    """Estimate how many vision tokens the VLM spends on an image of this size."""
+    return math.ceil(width / VISION_TOKEN_PIXELS) * math.ceil(height / VISION_TOKEN_PIXELS)
+
+
+@dataclass
+class PreprocessedImage:
+    """Image bytes ready for the VLM, plus what preprocessing saved."""
+    data: bytes
+    original_size: Tuple[int, int]
+    size: Tuple[int, int]
+    original_file_size: int
+    file_size: int
+    original_tokens: int
+    tokens: int
+    phash: int
+
+    def summary(self) -> dict:
+        """Return the size and token savings without the image bytes."""
+        summary = asdict(self)
+        del summary["data"], summary["phash"]
+        summary["bytes_saved"] = self.original_file_size - self.file_size
+        summary["tokens_saved"] = self.original_tokens - self.tokens
+        return summary
+
+
+def _target_size(width: int, height: int, max_side: int, max_pixels: int) -> Tuple[int, int]:
+    scale = 1.0
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+    if max_pixels and width * height * scale * scale > max_pixels:
+        scale = math.sqrt(max_pixels / (width * height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def preprocess_image(image_bytes: bytes, max_side: int, max_pixels: int, quality: int) -> PreprocessedImage:
+    """
+    Decode an image once, fix its EXIF orientation, cap its longest side and
+    pixel count, and re-encode it as JPEG. Raises if the bytes are not an image.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    original_size = image.size
+
+    # Orientation swaps width/height for 90-degree rotations
+    orientation = image.getexif().get(0x0112, 1)
+    upright = original_size[::-1] if orientation in (5, 6, 7, 8) else original_size
+    target = _target_size(*upright, max_side, max_pixels)
+
+    # Let the JPEG decoder downscale by DCT scaling instead of decoding full resolution
+    image.draft("RGB", target[::-1] if orientation in (5, 6, 7, 8) else target)
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode != "RGB":
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+    if image.size != target:
+        image = image.resize(target, Image.LANCZOS, reducing_gap=3.0)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    data = buffer.getvalue()
+
+    # An upright JPEG that is already within limits is cheaper to send as-is
+    if orientation == 1 and target == original_size and len(data) >= len(image_bytes) and image_bytes[:2] == b"\xff\xd8":
+        data = image_bytes
+
+    return PreprocessedImage(
+        data=data,
+        original_size=original_size,
+        size=image.size,
+        original_file_size=len(image_bytes),
+        file_size=len(data),
+        original_tokens=estimate_vision_tokens(*upright),
+        tokens=estimate_vision_tokens(*image.size),
+        phash=dhash(image),
+    )
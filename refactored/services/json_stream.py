@@ -0,0 +1,114 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+class IncrementalJsonParser:
+    """Parses a JSON object as it streams in, reporting each top-level field once it is complete.
+
+    Elements of top-level array fields are also reported one at a time, so a
+    response like {"items": [...]} can be shown item by item. Text before the
+    opening brace (e.g. a markdown fence) and after the closing brace is ignored.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []  # Open containers, "{" or "["
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._awaiting_value = False
+        self._value_start: Optional[int] = None  # Start of the current top-level field value
+        self._awaiting_element = False
+        self._element_start: Optional[int] = None  # Start of the current element of a top-level array
+
+    def feed(self, text: str) -> List[Tuple[str, str, Any]]:
+        """
+        Consume the next chunk of text and return the newly completed events:
+        ("field", key, value) for top-level fields and ("item", key, element)
+        for each element of a top-level array field.
+        """
+        events = []
+        self._buffer += text
+
+        while self._pos < len(self._buffer) and not self.done:
+            i = self._pos
+            c = self._buffer[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._expect_key:
+                        self._key = json.loads(self._buffer[self._string_start:i + 1])
+                        self._expect_key = False
+                    else:
+                        self._complete(i + 1, events)
+                continue
+
+            if not self._stack:
+                if c == "{":
+                    self._stack.append(c)
+                    self._expect_key = True
+                continue
+
+            if c.isspace():
+                continue
+
+            self._mark_start(i, c)
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._stack.append(c)
+                if len(self._stack) == 2 and c == "[":
+                    self._awaiting_element = True
+            elif c in "}]":
+                self._complete(i, events)  # A number, boolean or null ends at the bracket
+                self._stack.pop()
+                self._complete(i + 1, events)
+                if not self._stack:
+                    self.done = True
+            elif c == ",":
+                self._complete(i, events)
+                if len(self._stack) == 1:
+                    self._expect_key = True
+                elif len(self._stack) == 2 and self._stack[1] == "[":
+                    self._awaiting_element = True
+            elif c == ":" and len(self._stack) == 1:
+                self._awaiting_value = True
+
+        return events
+
+    def _mark_start(self, i: int, c: str):
+        """Record where a tracked value starts at its first non-whitespace character."""
+        if c in ",:]}":
+            return
+        if len(self._stack) == 1 and self._awaiting_value:
+            self._value_start = i
+            self._awaiting_value = False
+        elif len(self._stack) == 2 and self._stack[1] == "[" and self._awaiting_element:
+            self._element_start = i
+            self._awaiting_element = False
+
+    def _complete(self, end: int, events: list):
+        """Emit the tracked value at the current depth if one is in progress."""
+        if len(self._stack) == 1 and self._value_start is not None:
+            events.append(("field", self._key, self._decode(self._value_start, end)))
+            self._value_start = None
+        elif len(self._stack) == 2 and self._stack[1] == "[" and self._element_start is not None:
+            events.append(("item", self._key, self._decode(self._element_start, end)))
+            self._element_start = None
+
+    def _decode(self, start: int, end: int) -> Any:
+        try:
+            return json.loads(self._buffer[start:end])
+        except json.JSONDecodeError:
+            return self._buffer[start:end].strip()
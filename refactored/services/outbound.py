@@ -0,0 +1,225 @@
+import math
+import random
+import threading
+import time
+import requests
+import streamlit as st
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+# Responses worth retrying on an idempotent call: the server is overloaded or restarting
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class OutboundError(Exception):
+    """Raised when a call to a backend (Ollama, the model server) fails; endpoint names which one."""
+
+    retry_after: Optional[int] = None  # Seconds, when it is known that retrying sooner is pointless
+
+    def __init__(self, endpoint: str, message: str):
+        super().__init__(f"{endpoint}: {message}")
+        self.endpoint = endpoint
+
+
+class OutboundTimeout(OutboundError):
+    """Raised when a backend accepted the connection but missed its read deadline."""
+
+
+class OutboundStatusError(OutboundError):
+    """Raised when a backend answers with an error status."""
+
+    def __init__(self, endpoint: str, status_code: int):
+        super().__init__(endpoint, f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class OutboundUnavailable(OutboundError):
+    """Raised when a backend cannot be reached."""
+
+
+class CircuitOpenError(OutboundUnavailable):
+    """Raised without calling the backend while its circuit breaker is open; retry_after is in seconds."""
+
+    def __init__(self, endpoint: str, retry_after: int):
+        super().__init__(endpoint, f"circuit open after repeated failures, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Fails fast while a backend is down; shared by every session, so it is thread-safe.
+
+    Opens after failure_threshold consecutive failures. While open, calls fail
+    immediately; after reset_timeout seconds one trial call is let through
+    (half-open), and its outcome closes the breaker or opens it again. Calls
+    that started before the breaker opened finish without changing its state.
+    """
+
+    def __init__(self, endpoint: str, failure_threshold: int, reset_timeout: float):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0  # Consecutive
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError unless a call may go through now; return True if the call is the half-open trial."""
+        with self._lock:
+            if self.state == "closed" or self.failure_threshold <= 0:
+                return False
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        raise CircuitOpenError(self.endpoint, max(1, math.ceil(remaining)))
+
+    def record_success(self, trial: bool = False):
+        """Record a call that reached the backend; trial is what before_call returned for it."""
+        with self._lock:
+            if self.state != "closed" and not trial:
+                return  # Started before the circuit opened; only the trial decides whether it closes
+            self.failures = 0
+            self._trial_in_flight = False
+            self.state = "closed"
+
+    def record_failure(self, trial: bool = False):
+        """Record a failed call; trial is what before_call returned for it."""
+        with self._lock:
+            if self.state != "closed" and not trial:
+                return
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failure_threshold <= 0:
+                return
+            if trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.trips += 1
+                self.state = "open"
+
+    def release(self):
+        """Let another trial through after the trial ended without an outcome (the caller stopped reading)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips}
+
+
+class OutboundEndpoint:
+    """Calls to one kind of backend with deadlines, retries and a circuit breaker per target host.
+
+    Every call gets connect_timeout to connect and read_timeout between
+    received bytes. Idempotent calls are retried up to retries times on
+    timeouts, connection errors and overload statuses, after a full-jitter
+    exponential backoff. Failures are raised as typed OutboundErrors.
+    """
+
+    def __init__(self, name: str, connect_timeout: float, read_timeout: float, retries: int = 0,
+                 backoff: float = 0.2, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = requests.Session()  # Keep-alive connections, shared by every Streamlit session
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retry_count = 0
+        self._lock = threading.Lock()
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """The breaker for the host a URL points at."""
+        parts = urlsplit(url)
+        target = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            if target not in self.breakers:
+                self.breakers[target] = CircuitBreaker(self.name, self.failure_threshold, self.reset_timeout)
+            return self.breakers[target]
+
+    def post(self, url: str, idempotent: bool = False, **kwargs) -> requests.Response:
+        """Send a POST and return the successful response, or raise an OutboundError."""
+        breaker = self.breaker(url)
+        attempt = 0
+        while True:
+            try:
+                trial = breaker.before_call()
+                return self._send(breaker, trial, url, **kwargs)
+            except OutboundError as e:
+                if attempt >= self.retries or not self._retryable(e, idempotent):
+                    raise
+            attempt += 1
+            with self._lock:
+                self.retry_count += 1
+            time.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+
+    def _send(self, breaker: CircuitBreaker, trial: bool, url: str, **kwargs) -> requests.Response:
+        try:
+            response = self.session.post(url, timeout=self.timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            breaker.record_failure(trial)
+            raise self._error(e) from e
+        if response.status_code >= 500:
+            breaker.record_failure(trial)
+        else:
+            breaker.record_success(trial)  # A client error still shows the backend is up
+        if not response.ok:
+            raise OutboundStatusError(self.name, response.status_code)
+        return response
+
+    @contextmanager
+    def stream(self, url: str, **kwargs) -> Iterator[requests.Response]:
+        """POST with a streamed response; the read deadline applies to each chunk. Streams are never retried."""
+        breaker = self.breaker(url)
+        trial = breaker.before_call()
+        try:
+            with self.session.post(url, timeout=self.timeout, stream=True, **kwargs) as response:
+                if response.status_code >= 500:
+                    breaker.record_failure(trial)
+                if not response.ok:
+                    raise OutboundStatusError(self.name, response.status_code)
+                yield response
+        except requests.exceptions.RequestException as e:
+            breaker.record_failure(trial)
+            raise self._error(e) from e
+        finally:
+            if trial:
+                breaker.release()
+        breaker.record_success(trial)
+
+    def _error(self, error: requests.exceptions.RequestException) -> OutboundError:
+        # A connect timeout is a Timeout too, but like a refused connection nothing was sent
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return OutboundUnavailable(self.name, f"no connection within {self.timeout[0]:g} seconds")
+        if isinstance(error, requests.exceptions.Timeout):
+            return OutboundTimeout(self.name, f"no response within {self.timeout[1]:g} seconds")
+        if isinstance(error, requests.exceptions.ConnectionError):
+            return OutboundUnavailable(self.name, f"cannot connect: {error}")
+        return OutboundError(self.name, f"{type(error).__name__}: {error}")
+
+    @staticmethod
+    def _retryable(error: OutboundError, idempotent: bool) -> bool:
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, OutboundStatusError):
+            return idempotent and error.status_code in RETRY_STATUSES
+        return idempotent
+
+    def stats(self) -> Dict:
+        return {
+            "max_retries": self.retries,
+            "retries": self.retry_count,
+            "circuits": {target: breaker.stats() for target, breaker in self.breakers.items()},
+        }
+
+
+@st.cache_resource
+def get_endpoint(name: str, connect_timeout: float, read_timeout: float, retries: int = 0, backoff: float = 0.2,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0) -> OutboundEndpoint:
+    """Share one endpoint, and so its circuit breakers, across sessions and reruns."""
+    return OutboundEndpoint(name, connect_timeout, read_timeout, retries, backoff, failure_threshold, reset_timeout)
@@ -1,58 +1,53 @@
-import requests
 import numpy as np
 import streamlit as st
-from sklearn.metrics.pairwise import cosine_similarity
 from config import AppConfig
-from typing import Tuple
+from services.outbound import OutboundError, get_endpoint
+from typing import List, Tuple
 
 class SemanticSearchService:
     """Handles semantic search for item type matching."""
     
     def __init__(self, config: AppConfig):
         self.config = config
+        self.outbound = get_endpoint(
+            "model_server", config.MODEL_SERVER_CONNECT_TIMEOUT, config.MODEL_SERVER_READ_TIMEOUT,
+            config.MODEL_SERVER_RETRIES, config.OUTBOUND_RETRY_BACKOFF,
+            config.BREAKER_FAILURE_THRESHOLD, config.BREAKER_RESET_TIMEOUT,
+        )
     
-    def get_type_embedding(self, item_type: str) -> np.ndarray:
-        """Get embedding for an item type using the model server."""
-        payload = {"type": item_type}
-        try:
-            response = requests.post(f"{self.config.MODEL_SERVER_URL}/encode", json=payload)
-            response.raise_for_status()
-            embeddings = response.json().get("embeddings", [])
-            return np.array(embeddings)
-        except requests.exceptions.RequestException as e:
-            st.error(f"Error connecting to model server: {e}")
-            return np.array([])
+    def get_type_embeddings(self, item_types: List[str]) -> np.ndarray:
+        """Get embeddings for several item types in one model server request; raises an OutboundError on failure."""
+        response = self.outbound.post(
+            f"{self.config.MODEL_SERVER_URL}/encode-batch", idempotent=True, json={"texts": item_types}
+        )
+        embeddings = np.array(response.json().get("embeddings", []))
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(item_types):
+            raise OutboundError("model_server", f"expected {len(item_types)} embeddings, got shape {embeddings.shape}")
+        return embeddings
     
-    def find_closest_match(self, item_type: str) -> Tuple[str, str]:
-        """Find the closest matching item type in the database."""
+    def find_closest_matches_batch(self, item_types: List[str]) -> List[Tuple[str, str]]:
+        """Find the closest matches for all item types in a response with at most one embedding request.
+
+        Types are deduplicated, types already resolved for this image are reused,
+        and the remaining embeddings are scored in one matrix product. Raises an
+        OutboundError when the model server fails.
+        """
         # Initialize saved types if not exists
         if "saved_types" not in st.session_state:
             st.session_state.saved_types = {}
+        saved_types = st.session_state.saved_types
         
-        # Return cached result if available
-        if item_type in st.session_state.saved_types:
-            cached = st.session_state.saved_types[item_type]
-            return cached["cb_type"], cached["product_code"]
-        
-        # Get embedding and find closest match
-        item_embedding = self.get_type_embedding(item_type)
-        if item_embedding.size == 0:
-            return "", ""
-        
-        similarities = cosine_similarity(
-            item_embedding, 
-            st.session_state.ALIAS_EMBEDDINGS
-        )[0]
-        
-        closest_index = np.argmax(similarities)
-        closest_alias = st.session_state.ALIASES[closest_index]
-        closest_pc = st.session_state.ALIAS_TO_PC.get(closest_alias, "")
-        closest_cb_item = st.session_state.PC_TO_ITEM.get(closest_pc, "")
-        
-        # Cache the result
-        st.session_state.saved_types[item_type] = {
-            "cb_type": closest_cb_item,
-            "product_code": closest_pc
-        }
+        missing = [item_type for item_type in dict.fromkeys(item_types) if item_type not in saved_types]
+        if missing:
+            # Get embeddings and find closest matches
+            embeddings = self.get_type_embeddings(missing)
+            indices, _ = st.session_state.ALIAS_INDEX.best(embeddings)
+            for item_type, closest_index in zip(missing, indices):
+                closest_alias = st.session_state.ALIASES[closest_index]
+                closest_pc = st.session_state.ALIAS_TO_PC.get(closest_alias, "")
+                closest_cb_item = st.session_state.PC_TO_ITEM.get(closest_pc, "")
+                
+                # Cache the result
+                saved_types[item_type] = {"cb_type": closest_cb_item, "product_code": closest_pc}
         
-        return closest_cb_item, closest_pc
+        return [(saved_types[item_type]["cb_type"], saved_types[item_type]["product_code"]) for item_type in item_types]
@@ -1,20 +1,86 @@
-import requests
 import json
 import base64
+import hashlib
+import logging
 import streamlit as st
 from config import AppConfig
+from services.image_preprocessor import preprocess_image
+from services.result_cache import ResultCache
+from services.json_stream import IncrementalJsonParser
+from services.outbound import get_endpoint
+from typing import Any, Iterator, Optional, Tuple
+
+# Timing and token counts Ollama reports with the final response of a generation
+OLLAMA_STATS_FIELDS = (
+    "total_duration", "load_duration", "prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration",
+)
+
+@st.cache_resource
+def get_result_cache(max_size: int, ttl: float, path: str) -> ResultCache:
+    """Share one result cache across sessions and reruns."""
+    return ResultCache(max_size, ttl, path)
 
 class VisionService:
     """Handles vision analysis requests."""
     
     def __init__(self, config: AppConfig):
         self.config = config
+        self.fingerprint = self._request_fingerprint()  # Changes whenever MODEL, SYSTEM_PROMPT or options change
+        self.result_cache = get_result_cache(
+            config.RESULT_CACHE_SIZE, config.RESULT_CACHE_TTL, config.RESULT_CACHE_PATH
+        )
+        # Generations are not retried: a retry repeats the whole inference
+        self.outbound = get_endpoint(
+            "ollama", config.OLLAMA_CONNECT_TIMEOUT, config.OLLAMA_READ_TIMEOUT,
+            failure_threshold=config.BREAKER_FAILURE_THRESHOLD, reset_timeout=config.BREAKER_RESET_TIMEOUT,
+        )
+    
+    def get_cached(self, image_bytes: bytes) -> Optional[dict]:
+        """Return the cached result for identical image bytes, or None."""
+        return self.result_cache.get(self.result_cache.make_key(image_bytes, self.fingerprint))
     
-    def analyze_image(self, image_bytes: bytes) -> dict:
-        """Analyze an image using the vision model."""
-        image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+    def analyze_image_stream(self, image_bytes: bytes) -> Iterator[Tuple[str, str, Any]]:
+        """
+        Analyze an image with a streamed generation. Yields ("field", key, value)
+        and ("item", key, element) events as they complete, then ("stats", "", ollama_stats)
+        and ("result", "", parsed_output), which is cached for get_cached.
+        """
+        payload = self._build_payload(self._prepare_image(image_bytes), stream=True)
+        parser = IncrementalJsonParser()
+        chunks = []
+        stats = {}
         
-        payload = {
+        with self.outbound.stream(f"{self.config.OLLAMA_HOST}/api/generate", json=payload) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                text = chunk.get("response", "")
+                chunks.append(text)
+                for kind, key, value in parser.feed(text):
+                    yield kind, key, self._clean_item(value) if kind == "item" and isinstance(value, dict) else value
+                if chunk.get("done"):
+                    stats = {field: chunk[field] for field in OLLAMA_STATS_FIELDS if field in chunk}
+                    break
+        
+        logging.info(f"Ollama stats: {stats}")
+        yield "stats", "", stats
+        result = self._parse_json_output("".join(chunks).strip())
+        if result:
+            self.result_cache.set(self.result_cache.make_key(image_bytes, self.fingerprint), result)
+        yield "result", "", result
+    
+    def _prepare_image(self, image_bytes: bytes) -> str:
+        """Downscale and re-encode an image, returning it base64-encoded."""
+        prepared = preprocess_image(
+            image_bytes, self.config.IMAGE_MAX_SIDE, self.config.IMAGE_MAX_PIXELS, self.config.IMAGE_JPEG_QUALITY
+        )
+        logging.info(f"Image preprocessed: {prepared.summary()}")
+        return base64.b64encode(prepared.data).decode("utf-8")
+    
+    def _build_payload(self, image_b64: str, stream: bool = False) -> dict:
+        """Build the Ollama /api/generate payload for one image."""
+        return {
             "model": self.config.MODEL,
             "prompt": self.config.SYSTEM_PROMPT,
             "images": [image_b64],
@@ -24,14 +90,17 @@ class VisionService:
                 "num_predict": 1024,
             },
             "format": "json",
-            "stream": False
+            "stream": stream
         }
-        
-        response = requests.post(f"{self.config.OLLAMA_HOST}/api/generate", json=payload)
-        response.raise_for_status()
-        
-        raw_output = response.json().get("response", "").strip()
-        return self._parse_json_output(raw_output)
+    
+    def _request_fingerprint(self) -> str:
+        """Hash everything besides the image that determines the model output."""
+        payload = self._build_payload("")
+        del payload["images"]
+        payload["preprocessing"] = [
+            self.config.IMAGE_MAX_SIDE, self.config.IMAGE_MAX_PIXELS, self.config.IMAGE_JPEG_QUALITY
+        ]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
     
     def _parse_json_output(self, text: str) -> dict:
         """Parse JSON output from the model."""
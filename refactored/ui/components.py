@@ -13,32 +13,34 @@ class UIComponents:
         st.text("Upload an image, and our AI-powered vision model will instantly analyze it, returning a detailed JSON description of the item(s) in the frame. This is a demonstration tool to showcase our capabilities.")
         st.info("Tip: For best results, use clear, well-lit photos with the item centered and in focus. Avoid cluttered backgrounds and ensure the entire item is visible.")
     
-    def display_results(self, response: dict, response_time: float):
+    def display_results(self, response: dict, response_time: float, cached: bool = False):
         """Display analysis results."""
-        st.success(f"Response received in {response_time} seconds.")
+        source = " from cache" if cached else ""
+        st.success(f"Response received{source} in {response_time} seconds.")
         st.subheader("Results:")
         
         if "items" in response:
             for item in response["items"]:
-                self._display_item_result(item)
+                self.display_item_result(item)
 
             self._show_next_button(response)
 
         if "items" not in response or not response["items"]:
             st.info("No results found, please try another photo")
     
-    def _display_item_result(self, item: dict):
+    def display_item_result(self, item: dict):
         """Display results for a single item."""
         col1, col2 = st.columns([0.4, 0.6])
         
         # Display Chargerback type and product code
-        cb_type = item.get("cb_type", "")
-        product_code = item.get("product_code", "")
-        
-        cb_type_formatted = self._format_cb_type(cb_type)
-        
-        col1.markdown(f"##### Chargerback Type: :green[{cb_type_formatted or 'Unknown'}]")
-        col1.markdown(f"##### Product Code: :green[{product_code or 'Unknown'}]")
+        if "cb_type" in item:
+            cb_type_formatted = self._format_cb_type(item["cb_type"])
+            product_code = item.get("product_code", "")
+            col1.markdown(f"##### Chargerback Type: :green[{cb_type_formatted or 'Unknown'}]")
+            col1.markdown(f"##### Product Code: :green[{product_code or 'Unknown'}]")
+        else:
+            # Streamed before type matching, which runs once for all items at the end
+            col1.markdown(f"##### Type: :gray[{item.get('type', 'Unknown')}]")
         
         # Display CB attributes
         self._display_cb_attributes(col1, item)
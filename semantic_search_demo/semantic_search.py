@@ -2,12 +2,18 @@ import signal
 import sys
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import requests
 import os
-import pickle
+
+# The catalog reader lives alongside the Streamlit UI that builds the bundle
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "streamlit_ui"))
+from catalog import load_catalog
+from vector_index import VectorIndex
 
 MODEL_SERVER_URL = "http://localhost:8000"
+CATALOG_DIR = os.getenv("CATALOG_DIR", os.path.join(BASE_DIR, "..", "streamlit_ui", "catalog"))
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 def on_exit(sig, frame):
     print("Stopping the model_server...")
@@ -15,23 +21,10 @@ def on_exit(sig, frame):
     os.system('pkill -f "uvicorn model_server:app" || true')
     sys.exit(0)
 
-def load_pickle_files():
-    """Load all necessary pickle files for the application."""
-    base_dir = os.path.dirname(__file__)  # Get the directory of the current script
-    
-    with open(os.path.join(base_dir, "pc_to_item.pkl"), "rb") as f:
-        pc_to_item = pickle.load(f)
-    
-    with open(os.path.join(base_dir, "alias_to_pc.pkl"), "rb") as f:
-        alias_to_pc = pickle.load(f)
-    
-    with open(os.path.join(base_dir, "aliases.pkl"), "rb") as f:
-        aliases = pickle.load(f)
-    
-    with open(os.path.join(base_dir, "alias_embeddings.pkl"), "rb") as f:
-        embeddings = pickle.load(f)
-
-    return pc_to_item, alias_to_pc, aliases, embeddings
+def load_catalog_data():
+    """Load the catalog bundle built by streamlit_ui/setup.py."""
+    data = load_catalog(CATALOG_DIR, EMBEDDING_MODEL)
+    return data["PC_TO_ITEM"], data["ALIAS_TO_PC"], data["ALIASES"], VectorIndex(data["ALIAS_EMBEDDINGS"])
 
 def get_type_embedding(item_type):
     """Get the embedding for a given item type using the model server."""
@@ -48,17 +41,14 @@ def get_type_embedding(item_type):
 def find_closest_matches(item_type):
     item_embedding = get_type_embedding(item_type)
 
-    # Compute cosine similarities
-    similarities = cosine_similarity(item_embedding, ALIAS_EMBEDDINGS)[0]
-    
     # Get indices of the top 5 most similar items
-    top_indices = np.argsort(similarities)[::-1][:5]
+    top_indices, top_scores = ALIAS_INDEX.top_k(item_embedding, 5)
     results = []
-    for idx in top_indices:
+    for idx, score in zip(top_indices[0], top_scores[0]):
         closest_alias = ALIASES[idx]
         closest_pc = ALIAS_TO_PC.get(closest_alias, "")
         closest_cb_item = PC_TO_ITEM.get(closest_pc, "")
-        score = float(similarities[idx])
+        score = float(score)
         results.append({
             "closest_alias": closest_alias,
             "closest_type": closest_cb_item,
@@ -96,7 +86,7 @@ signal.signal(signal.SIGINT, on_exit)
 
 if __name__ == "__main__":
     # Load the model and data
-    PC_TO_ITEM, ALIAS_TO_PC, ALIASES, ALIAS_EMBEDDINGS = load_pickle_files()
+    PC_TO_ITEM, ALIAS_TO_PC, ALIASES, ALIAS_INDEX = load_catalog_data()
     
     # Main loop to accept user input
     while True:
@@ -0,0 +1,144 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with a size bound and optional TTL."""
+
+    def __init__(self, max_size: int, ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl  # Seconds; 0 disables expiry
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, stored_at: Optional[float] = None):
+        """Insert or refresh a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (value, stored_at if stored_at is not None else time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Return size and hit/miss counters."""
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class DiskStore:
+    """SQLite-backed key/value store that survives restarts and is shared between worker processes.
+
+    The store is a cache, so it fails open: a read that fails (locked, corrupt
+    or missing database) counts as a miss, and a write that fails is dropped.
+    With a writer (an SQLiteWriter on the same path), writes are queued to its
+    background thread instead of committing on the caller's thread.
+    """
+
+    PRUNE_EVERY = 1000  # Writes between expiry sweeps
+
+    def __init__(self, path: str, table: str, ttl: float = 0, writer=None):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.writer = writer
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        # WAL lets several worker processes read while one writes; NORMAL sync avoids an fsync per commit
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value BLOB, created_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return (value, created_at) for a key, or None on a miss or expired entry."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            self._failed("read", e)
+            row = None
+
+        if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return row[0], row[1]
+
+    def set(self, key: str, value: Any):
+        """Insert or replace a value."""
+        writes = [(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+            (key, value, time.time()),
+        )]
+        self._writes += 1
+        if self.ttl and self._writes % self.PRUNE_EVERY == 0:
+            writes.append((f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl,)))
+
+        if self.writer is not None:
+            for sql, params in writes:
+                self.writer.execute(sql, params)
+            return
+        try:
+            with self._lock, self._conn:  # Commits, or rolls back on error
+                for sql, params in writes:
+                    self._conn.execute(sql, params)
+        except sqlite3.Error as e:
+            self._failed("write", e)
+
+    def clear(self):
+        """Delete all entries."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _failed(self, operation: str, error: sqlite3.Error):
+        self.errors += 1
+        print(f"Disk cache {self.path} ({self.table}) {operation} failed, skipped: {error}", flush=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss and error counters."""
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
@@ -0,0 +1,51 @@
+import numpy as np
+from typing import Tuple
+
+class VectorIndex:
+    """Cosine-similarity search over an embedding matrix that is L2-normalized once at load.
+
+    Queries are scored with a single matrix product, and top-k uses partial
+    selection (argpartition) instead of a full sort.
+    """
+
+    def __init__(self, embeddings: np.ndarray):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1)
+
+        # Already-normalized matrices (e.g. a memory-mapped catalog) are used as-is, without a copy
+        if not np.allclose(norms, 1.0, atol=1e-3):
+            norms[norms == 0] = 1.0
+            matrix = matrix / norms[:, None]
+
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def _normalize(queries: np.ndarray) -> np.ndarray:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return queries / norms
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Return a (num_queries, num_vectors) matrix of cosine similarities."""
+        return self._normalize(queries) @ self.matrix.T
+
+    def best(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the index and score of the closest vector for each query."""
+        scores = self.scores(queries)
+        indices = scores.argmax(axis=1)
+        return indices, scores[np.arange(len(indices)), indices]
+
+    def top_k(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the indices and scores of the k closest vectors per query, best first."""
+        scores = self.scores(queries)
+        k = min(k, scores.shape[1])
+        rows = np.arange(scores.shape[0])[:, None]
+
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-scores[rows, candidates], axis=1)
+        indices = candidates[rows, order]
+        return indices, scores[rows, indices]
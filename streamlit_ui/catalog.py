@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Bump when the bundle layout changes; readers refuse bundles they don't understand.
+CATALOG_SCHEMA_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+# A catalog directory holds versions/<version>/ bundles and a CURRENT file naming the live one
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+# Manifest fields load_catalog relies on
+MANIFEST_KEYS = ("version", "alias_count", "embedding_dim")
+# Superseded versions kept so processes still on them can finish reloading
+KEEP_VERSIONS = 3
+
+
+class CatalogError(Exception):
+    """Raised when a catalog bundle is missing, malformed or built for another model."""
+
+
+def resolve_catalog_dir(catalog_dir: str) -> str:
+    """Return the bundle directory CURRENT points at, or catalog_dir itself for an unversioned bundle."""
+    try:
+        with open(os.path.join(catalog_dir, CURRENT_FILE)) as f:
+            return os.path.join(catalog_dir, VERSIONS_DIR, f.read().strip())
+    except FileNotFoundError:
+        return catalog_dir
+
+
+def catalog_version(catalog_dir: str) -> Optional[str]:
+    """Return the published catalog version without loading it (cheap enough to poll), or None if there is none."""
+    try:
+        with open(os.path.join(catalog_dir, CURRENT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        raise CatalogError(f"Cannot read {CURRENT_FILE} in {catalog_dir}: {e}")
+    try:
+        with open(os.path.join(catalog_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return manifest.get("version") if isinstance(manifest, dict) else None
+
+
+def read_manifest(bundle_dir: str) -> dict:
+    try:
+        with open(os.path.join(bundle_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise CatalogError(f"Cannot read catalog manifest in {bundle_dir}: {e}")
+    if not isinstance(manifest, dict):
+        raise CatalogError(f"Catalog manifest in {bundle_dir} is not a JSON object")
+    return manifest
+
+
+def write_catalog(catalog_dir: str, pc_to_item: Dict[int, str], alias_to_pc: Dict[str, int],
+                  aliases: List[str], embeddings: np.ndarray, embedding_model: str) -> dict:
+    """Write a catalog bundle as a new version and publish it.
+
+    The bundle is written to a temporary directory that is renamed into
+    versions/ once complete, then CURRENT is replaced atomically, so readers
+    see either the old version or the whole new one.
+    """
+    versions_dir = os.path.join(catalog_dir, VERSIONS_DIR)
+    os.makedirs(versions_dir, exist_ok=True)
+
+    # Store unit-length rows so readers can score with a plain dot product straight off the memory map
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    embeddings = np.ascontiguousarray(embeddings / norms)
+    pc_codes = sorted(pc_to_item)
+    arrays = {
+        "alias_embeddings": embeddings,
+        "aliases": np.array(aliases, dtype=str),
+        "alias_pcs": np.array([alias_to_pc[alias] for alias in aliases], dtype=np.int32),
+        "pc_codes": np.array(pc_codes, dtype=np.int32),
+        "pc_items": np.array([pc_to_item[pc] for pc in pc_codes], dtype=str),
+    }
+
+    digest = hashlib.sha256()
+    for array in arrays.values():
+        digest.update(array.tobytes())
+
+    manifest = {
+        "schema_version": CATALOG_SCHEMA_VERSION,
+        "version": digest.hexdigest()[:16],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "embedding_model": embedding_model,
+        "embedding_dim": int(embeddings.shape[1]),
+        "alias_count": len(aliases),
+        "product_code_count": len(pc_codes),
+    }
+    bundle_dir = os.path.join(versions_dir, manifest["version"])
+    if not os.path.isdir(bundle_dir):
+        staging_dir = os.path.join(versions_dir, f".{manifest['version']}.{os.getpid()}.tmp")
+        os.makedirs(staging_dir, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging_dir, f"{name}.npy"), array)
+        with open(os.path.join(staging_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging_dir, bundle_dir)
+
+    _publish(catalog_dir, manifest["version"])
+    _prune_versions(catalog_dir, manifest["version"])
+    return manifest
+
+
+def _publish(catalog_dir: str, version: str):
+    staging_file = os.path.join(catalog_dir, f".{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(staging_file, "w") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(staging_file, os.path.join(catalog_dir, CURRENT_FILE))
+
+
+def _prune_versions(catalog_dir: str, current: str):
+    """Delete all but the KEEP_VERSIONS newest versions; open memory maps stay valid after the unlink."""
+    versions_dir = os.path.join(catalog_dir, VERSIONS_DIR)
+    paths = [os.path.join(versions_dir, name) for name in os.listdir(versions_dir)
+             if not name.startswith(".") and name != current]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[KEEP_VERSIONS - 1:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def build_catalog(catalog_dir: str, pc_to_item: Dict[int, str], alias_to_pc: Dict[str, int],
+                  encode: Callable[[List[str]], np.ndarray], embedding_model: str,
+                  batch_size: int = 256) -> Tuple[dict, Dict[str, int]]:
+    """Publish a catalog for the given tables, encoding only aliases the current version lacks.
+
+    An embedding depends only on the alias text and the model, so rows are
+    matched to the current version by their text: a changed product code is
+    re-labelled without encoding, and renamed or new aliases are encoded in
+    batches of batch_size. Returns the published manifest and row counts; if
+    nothing changed, the current version is kept and no new one is written.
+    """
+    aliases = list(alias_to_pc)
+    previous, current = {}, None
+    try:
+        current = load_catalog(catalog_dir, embedding_model)
+        previous = dict(zip(current["ALIASES"].tolist(), current["ALIAS_EMBEDDINGS"]))
+    except CatalogError as e:
+        print(f"No reusable catalog ({e}); encoding every alias", flush=True)
+
+    missing = [alias for alias in aliases if alias not in previous]
+    encoded = {}
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        encoded.update(zip(batch, np.asarray(encode(batch), dtype=np.float32)))
+
+    stats = {
+        "aliases": len(aliases),
+        "reused": len(aliases) - len(missing),
+        "encoded": len(missing),
+        "removed": len(set(previous) - set(alias_to_pc)),
+    }
+    if current is not None and current["ALIASES"].tolist() == aliases \
+            and current["ALIAS_TO_PC"] == alias_to_pc and current["PC_TO_ITEM"] == pc_to_item:
+        return read_manifest(resolve_catalog_dir(catalog_dir)), stats
+
+    embeddings = np.vstack([previous[alias] if alias in previous else encoded[alias] for alias in aliases])
+    return write_catalog(catalog_dir, pc_to_item, alias_to_pc, aliases, embeddings, embedding_model), stats
+
+
+def load_catalog(catalog_dir: str, embedding_model: str) -> Dict:
+    """Load the current catalog version, memory-mapping the arrays so the OS page cache shares them across processes."""
+    catalog_dir = resolve_catalog_dir(catalog_dir)
+    manifest = read_manifest(catalog_dir)
+
+    if manifest.get("schema_version") != CATALOG_SCHEMA_VERSION:
+        raise CatalogError(
+            f"Catalog schema {manifest.get('schema_version')} is not supported (expected {CATALOG_SCHEMA_VERSION})"
+        )
+    if manifest.get("embedding_model") != embedding_model:
+        raise CatalogError(
+            f"Catalog was built with {manifest.get('embedding_model')}, but {embedding_model} is configured"
+        )
+
+    missing = [key for key in MANIFEST_KEYS if key not in manifest]
+    if missing:
+        raise CatalogError(f"Catalog manifest in {catalog_dir} lacks {', '.join(missing)}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(catalog_dir, f"{name}.npy"), mmap_mode="r")
+
+    try:
+        embeddings = load("alias_embeddings")
+        aliases = load("aliases")
+        alias_pcs = load("alias_pcs")
+        pc_codes = load("pc_codes")
+        pc_items = load("pc_items")
+    except (OSError, ValueError) as e:
+        raise CatalogError(f"Cannot read catalog arrays in {catalog_dir}: {e}")
+
+    if embeddings.shape != (manifest["alias_count"], manifest["embedding_dim"]) or len(aliases) != len(alias_pcs):
+        raise CatalogError(f"Catalog arrays in {catalog_dir} do not match the manifest")
+
+    return {
+        "PC_TO_ITEM": dict(zip(pc_codes.tolist(), pc_items.tolist())),
+        "ALIAS_TO_PC": dict(zip(aliases.tolist(), alias_pcs.tolist())),
+        "ALIASES": aliases,
+        "ALIAS_PCS": alias_pcs,
+        "ALIAS_EMBEDDINGS": embeddings,
+        "CATALOG_VERSION": manifest["version"],
+    }
@@ -1,27 +1,182 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
 from pydantic import BaseModel
 from sentence_transformers import SentenceTransformer
+from typing import List
+import asyncio
+import os
+import time
 import torch
 import gc
 
-torch.cuda.empty_cache()
-gc.collect()
+# Micro-batching settings: concurrent requests that arrive within MAX_WAIT_MS
+# of each other are merged into a single model.encode call.
+MAX_BATCH_SIZE = int(os.getenv("ENCODE_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("ENCODE_MAX_WAIT_MS", "5"))
+
+# Metrics, served at /metrics in Prometheus text format
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+REQUEST_LATENCY = Histogram("model_server_request_seconds", "Request latency by endpoint", ["endpoint"], buckets=LATENCY_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge("model_server_requests_in_flight", "Requests currently being handled, by endpoint", ["endpoint"])
+QUEUE_WAIT = Histogram("model_server_queue_wait_seconds", "Time texts wait before their batch starts encoding", buckets=LATENCY_BUCKETS)
+ENCODE_LATENCY = Histogram("model_server_encode_seconds", "Latency of one batched model.encode call", buckets=LATENCY_BUCKETS)
+BATCH_SIZE = Histogram("model_server_batch_size", "Unique texts per model.encode call", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+QUEUE_DEPTH = Gauge("model_server_queue_depth", "Texts waiting to be batched")
 
-app = FastAPI()
+if torch.cuda.is_available():
+    torch.cuda.empty_cache()
+gc.collect()
 
 try:
     model = SentenceTransformer("all-MiniLM-L6-v2")  # Loads once at server start
-    print(f"After loading - Allocated: {torch.cuda.memory_allocated() / 1e9:.2f} GB")
-    print(f"After loading - Reserved: {torch.cuda.memory_reserved() / 1e9:.2f} GB")
+    if torch.cuda.is_available():
+        print(f"After loading - Allocated: {torch.cuda.memory_allocated() / 1e9:.2f} GB")
+        print(f"After loading - Reserved: {torch.cuda.memory_reserved() / 1e9:.2f} GB")
 except Exception as e:
     print(f"Error loading model: {e}")
 
+
+def encode_texts(texts: List[str]) -> List[List[float]]:
+    """Encode a batch of texts in a single forward pass."""
+    return model.encode(texts, batch_size=len(texts)).tolist()
+
+
+class EncodeBatcher:
+    """Coalesces concurrent encode requests into batched model calls."""
+
+    def __init__(self, encode_fn, max_batch_size: int, max_wait_ms: float):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+
+    def start(self):
+        """Start the background batching task on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the background batching task."""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def encode(self, texts: List[str]) -> List[List[float]]:
+        """Queue texts for encoding and wait for their embeddings."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future, time.perf_counter()))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def _collect_batch(self) -> list:
+        """Wait for one request, then gather more until the batch is full or MAX_WAIT elapses."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            collected = await self._collect_batch()
+            started = time.perf_counter()
+            for _, _, enqueued in collected:
+                QUEUE_WAIT.observe(started - enqueued)
+            QUEUE_DEPTH.set(self._queue.qsize())
+
+            batch = [(text, future) for text, future, _ in collected if not future.cancelled()]
+            if not batch:
+                continue
+
+            # Identical texts in the same window share one slot in the forward pass
+            unique_texts = list(dict.fromkeys(text for text, _ in batch))
+
+            BATCH_SIZE.observe(len(unique_texts))
+            try:
+                with ENCODE_LATENCY.time():
+                    vectors = await loop.run_in_executor(None, self.encode_fn, unique_texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            by_text = dict(zip(unique_texts, vectors))
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+
+
+batcher = EncodeBatcher(encode_texts, MAX_BATCH_SIZE, MAX_WAIT_MS)
+
+
+# Paths of the app's routes, the only values the endpoint metric label takes besides "other"
+ROUTE_PATHS = set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ROUTE_PATHS.update(route.path for route in app.routes)  # Every route is registered by now
+    batcher.start()
+    yield
+    await batcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    """Record in-flight requests and latency per endpoint."""
+    endpoint = request.url.path if request.url.path in ROUTE_PATHS else "other"
+    with REQUESTS_IN_FLIGHT.labels(endpoint).track_inprogress(), REQUEST_LATENCY.labels(endpoint).time():
+        return await call_next(request)
+
+
 class EncodeRequest(BaseModel):
     type: str
 
+
+class EncodeBatchRequest(BaseModel):
+    texts: List[str]
+
+
 @app.post("/encode")
-def encode(req: EncodeRequest):
-    embedding = model.encode([req.type]).tolist()
+async def encode(req: EncodeRequest):
+    embedding = await batcher.encode([req.type])
     return {"embeddings": embedding}
 
-# Run with command: uvicorn model_server:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+
+@app.post("/encode-batch")
+async def encode_batch(req: EncodeBatchRequest):
+    embeddings = await batcher.encode(req.texts) if req.texts else []
+    return {"embeddings": embeddings}
+
+
+@app.get("/metrics")
+async def metrics():
+    QUEUE_DEPTH.set(batcher._queue.qsize() if batcher._queue else 0)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+# Run with command: uvicorn model_server:app --host 0.0.0.0 --port 8000
@@ -0,0 +1,46 @@
+import copy
+import hashlib
+import json
+from cache import LRUCache, DiskStore
+from typing import Optional
+
+class ResultCache:
+    """Content-addressed cache of parsed VLM results.
+
+    Keys combine a hash of the uploaded image bytes with a fingerprint of the
+    model, prompt and options, so changing any of those invalidates old entries.
+    """
+
+    def __init__(self, max_size: int, ttl: float = 0, path: str = ""):
+        self.memory = LRUCache(max_size, ttl)
+        self.disk = DiskStore(path, "analysis_results", ttl) if path else None
+
+    @staticmethod
+    def make_key(image_bytes: bytes, fingerprint: str) -> str:
+        """Build a cache key from the image bytes and the request fingerprint."""
+        return f"{fingerprint}:{hashlib.sha256(image_bytes).hexdigest()}"
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return a copy of the cached result, or None on a miss."""
+        result = self.memory.get(key)
+        if result is None and self.disk is not None:
+            row = self.disk.get(key)
+            if row is not None:
+                result = json.loads(row[0])
+                self.memory.set(key, result, stored_at=row[1])
+
+        # Callers enrich results in place, so never hand out the cached object
+        return copy.deepcopy(result) if result is not None else None
+
+    def set(self, key: str, result: dict):
+        """Cache a copy of a parsed result."""
+        self.memory.set(key, copy.deepcopy(result))
+        if self.disk is not None:
+            self.disk.set(key, json.dumps(result))
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for each tier."""
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
@@ -1,9 +1,19 @@
 import os
-import pickle
-from sentence_transformers import SentenceTransformer
+from catalog import build_catalog
 
-# Load the model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+CATALOG_DIR = os.getenv("CATALOG_DIR", "catalog")
+ENCODE_BATCH_SIZE = int(os.getenv("ENCODE_BATCH_SIZE", "256"))
+
+# Load the model only if some aliases need encoding
+model = None
+
+def encode(texts):
+    global model
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(EMBEDDING_MODEL)
+    return model.encode(texts, batch_size=ENCODE_BATCH_SIZE)
 
 # Load item types from item_to_pc.csv
 pc_to_item = {}
@@ -16,25 +26,9 @@ alias_to_pc = {}
 with open("alias_to_pc.csv", "r") as file:
     lines = file.readlines()
     alias_to_pc = {line.strip().split(",")[0]: int(line.strip().split(",")[1]) for line in lines if line.strip()}
-    aliases = list(alias_to_pc.keys())
-
-
-# Calculate embeddings
-embeddings = model.encode(aliases)
 
 
-# Save the data to pickle files
-# with open("sentence_transformer_model.pkl", "wb") as f:
-#     pickle.dump(model, f)
-    
-with open("pc_to_item.pkl", "wb") as f:
-    pickle.dump(pc_to_item, f)
-    
-with open("alias_to_pc.pkl", "wb") as f:
-    pickle.dump(alias_to_pc, f)
-    
-with open("aliases.pkl", "wb") as f:
-    pickle.dump(aliases, f)
-    
-with open("alias_embeddings.pkl", "wb") as f:
-    pickle.dump(embeddings, f)
+# Publish a new catalog version, reusing the current version's embeddings for unchanged aliases
+manifest, stats = build_catalog(CATALOG_DIR, pc_to_item, alias_to_pc, encode, EMBEDDING_MODEL, ENCODE_BATCH_SIZE)
+print(f"Catalog {manifest['version']} with {manifest['alias_count']} aliases in {CATALOG_DIR}: "
+      f"{stats['encoded']} encoded, {stats['reused']} reused, {stats['removed']} removed")
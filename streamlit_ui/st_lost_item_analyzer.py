@@ -1,24 +1,42 @@
 import base64
+import hashlib
 import requests
 import streamlit as st
 import os
 import json
 import time
-import pickle
 import logging
 import uuid
-import sqlite3
+import sqlite_writer
+from image_store import ImageStore
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from catalog import CatalogError, catalog_version, load_catalog
+from vector_index import VectorIndex
+from image_preprocessor import preprocess_image
+from result_cache import ResultCache
+from json_stream import IncrementalJsonParser
 
 # --- Configuration Variables ---
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://host.docker.internal:11434")
 MODEL_SERVER_URL = os.getenv("MODEL_SERVER", "http://host.docker.internal:8000")
+# (connect, read) deadlines in seconds; the read deadline is the longest wait for the next byte
+OLLAMA_TIMEOUT = (float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5")), float(os.getenv("OLLAMA_READ_TIMEOUT", "180")))
+MODEL_SERVER_TIMEOUT = (
+    float(os.getenv("MODEL_SERVER_CONNECT_TIMEOUT", "2")), float(os.getenv("MODEL_SERVER_READ_TIMEOUT", "10"))
+)
 LOG_FILE = os.path.join("/app/logs", "streamlit_log.log")
+CATALOG_DIR = os.getenv("CATALOG_DIR", "catalog")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 MODEL = "qwen2.5vl:7b"  # Use the 7B model for better performance
 TEMPERATURE = 0.0
 REPEAT_PENALTY = 1.2
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1280"))  # Longest side in pixels; 0 disables
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "1003520"))  # ~1280 vision tokens; 0 disables
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1000"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "86400"))  # Seconds; 0 disables expiry
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "")  # Set to persist results on disk
 SYSTEM_PROMPT = """
 You are an expert in visual recognition. Analyze the uploaded image of lost item(s) and extract detailed, structured information for each item visible in the image.
 
@@ -91,6 +109,21 @@ You are an expert in visual recognition. Analyze the uploaded image of lost item
 - When uncertain about brand, leave the brand field empty or omit it entirely
 """
 
+OLLAMA_OPTIONS = {
+    "temperature": TEMPERATURE,
+    "repeat_penalty": REPEAT_PENALTY,
+    "num_predict": 1024,
+}
+
+# Changes whenever MODEL, SYSTEM_PROMPT, options or preprocessing change, invalidating cached results
+REQUEST_FINGERPRINT = hashlib.sha256(json.dumps({
+    "model": MODEL,
+    "prompt": SYSTEM_PROMPT,
+    "options": OLLAMA_OPTIONS,
+    "format": "json",
+    "preprocessing": [IMAGE_MAX_SIDE, IMAGE_MAX_PIXELS, IMAGE_JPEG_QUALITY],
+}, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
 # --- Logging Configuration ---
 logging.basicConfig(
     filename=LOG_FILE,
@@ -98,132 +131,142 @@ logging.basicConfig(
     format='%(asctime)s [%(levelname)s] %(message)s'
 )
 
-# --- Load data from Pickle Files ---
-@st.cache_resource
-def load_pickle_files():
-    """Load all necessary pickle files for the application."""
-    
-    with open("pc_to_item.pkl", "rb") as f:
-        pc_to_item = pickle.load(f)
-    
-    with open("alias_to_pc.pkl", "rb") as f:
-        alias_to_pc = pickle.load(f)
-    
-    with open("aliases.pkl", "rb") as f:
-        aliases = pickle.load(f)
-    
-    with open("alias_embeddings.pkl", "rb") as f:
-        embeddings = pickle.load(f)
+# --- Load data from the Catalog Bundle ---
+@st.cache_resource(max_entries=2)
+def load_catalog_data(version):
+    """Load the catalog bundle (embeddings are memory-mapped and shared via the OS page cache).
 
-    return pc_to_item, alias_to_pc, aliases, embeddings
+    Cached per published version, so a new version is loaded once and shared by all sessions.
+    """
+    data = load_catalog(CATALOG_DIR, EMBEDDING_MODEL)
+    alias_index = VectorIndex(data["ALIAS_EMBEDDINGS"])
+    return data["PC_TO_ITEM"], data["ALIAS_TO_PC"], data["ALIASES"], alias_index
 
-if "data_loaded" not in st.session_state:
+# Check for a newly published catalog on every rerun; a session switches versions between runs, never during one
+catalog_version_published = catalog_version(CATALOG_DIR)
+if st.session_state.get("catalog_version") != catalog_version_published:
     start_load_time = time.time()
-    print("Loading pickle file data...", flush=True)
+    print(f"Loading catalog {catalog_version_published}...", flush=True)
 
-    pc_to_item, alias_to_pc, aliases, alias_embeddings = load_pickle_files()
+    try:
+        pc_to_item, alias_to_pc, aliases, alias_index = load_catalog_data(catalog_version_published)
+    except CatalogError as e:
+        if "data_loaded" not in st.session_state:
+            raise
+        print(f"Catalog reload failed, keeping {st.session_state.catalog_version}: {e}", flush=True)
+    else:
+        st.session_state.PC_TO_ITEM = pc_to_item
+        st.session_state.ALIAS_TO_PC = alias_to_pc
+        st.session_state.ALIASES = aliases
+        st.session_state.ALIAS_INDEX = alias_index
+        st.session_state.catalog_version = catalog_version_published
+        st.session_state.data_loaded = True
 
-    st.session_state.PC_TO_ITEM = pc_to_item
-    st.session_state.ALIAS_TO_PC = alias_to_pc
-    st.session_state.ALIASES = aliases
-    st.session_state.ALIAS_EMBEDDINGS = alias_embeddings
-    st.session_state.data_loaded = True  # Ensure data is loaded only once
-    
-    end_load_time = time.time()
-    print(f"Data loaded in {end_load_time - start_load_time:.2f} seconds", flush=True)
+        end_load_time = time.time()
+        print(f"Data loaded in {end_load_time - start_load_time:.2f} seconds", flush=True)
+
+@st.cache_resource
+def get_result_cache():
+    """Share one analysis result cache across sessions and reruns."""
+    return ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL, RESULT_CACHE_PATH)
 
 # --- SQLite Database Configuration ---
-def get_db_connection():
-    conn = sqlite3.connect(os.path.join("/app/logs", "streamlit_db.db"))
-    return conn
+DB_FILE = os.path.join("/app/logs", "streamlit_db.db")
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "/app/logs/images")  # Uploaded images, stored once per SHA-256
 
-with get_db_connection() as conn: # Create the logs table if it doesn't exist
+with sqlite_writer.connect(DB_FILE) as conn: # Create the logs table if it doesn't exist
     cursor = conn.cursor()
-    cursor.execute('CREATE TABLE IF NOT EXISTS logs (request_id TEXT PRIMARY KEY, image BLOB, response TEXT, response_time REAL, feedback TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS logs (request_id TEXT PRIMARY KEY, image BLOB, image_hash TEXT, image_size INTEGER, response TEXT, response_time REAL, feedback TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)')
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(logs)")}
+    for column, column_type in (("image_hash", "TEXT"), ("image_size", "INTEGER")):
+        if column not in existing:  # Databases created before the image store
+            cursor.execute(f"ALTER TABLE logs ADD COLUMN {column} {column_type}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_created_at ON logs (created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_feedback ON logs (feedback, created_at) WHERE feedback IS NOT NULL")
     conn.commit()
 
+@st.cache_resource
+def get_log_writer():
+    """One background writer for all sessions; log calls only queue their write."""
+    return sqlite_writer.SQLiteWriter(DB_FILE)
+
 # --- Logging Helper Functions ---
-def log_response():
+def log_response(image_bytes: bytes):
     state = st.session_state
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM logs WHERE request_id = ?", (state.request_id,))
-        already_logged = cursor.fetchone() is not None
-
-        if already_logged:
-            return  # Skip logging if this request_id already exists
-
-        cursor.execute(
-            '''
-            INSERT INTO logs (request_id, image, response, response_time)
-            VALUES (?, ?, ?, ?)
-            ''',
-            (state.request_id, state.image, json.dumps(state.response), state.response_time)
-        )
-        conn.commit()
+    # The log row only references the image; identical uploads are stored once
+    image_hash, image_size = ImageStore(IMAGE_STORE_DIR).put(image_bytes)
+    # A request that is already logged keeps its first response
+    get_log_writer().execute(
+        '''
+        INSERT INTO logs (request_id, image_hash, image_size, response, response_time)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(request_id) DO NOTHING
+        ''',
+        (state.request_id, image_hash, image_size, json.dumps(state.response), state.response_time)
+    )
     
 def log_feedback():
     if "feedback" not in st.session_state:
         st.session_state.feedback = None  # Ensure feedback is initialized
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE logs SET feedback = ? WHERE request_id = ?",
-            (st.session_state.feedback, st.session_state.request_id)
-        )
-        conn.commit()
+    # Queued after the response, so the row exists by the time this runs
+    get_log_writer().execute(
+        "UPDATE logs SET feedback = ? WHERE request_id = ?",
+        (st.session_state.feedback, st.session_state.request_id)
+    )
 
 def log_types():
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE logs SET types = ? WHERE request_id = ?",
-            (json.dumps(st.session_state.saved_types), st.session_state.request_id)
-        )
-        conn.commit()
+    get_log_writer().execute(
+        "UPDATE logs SET types = ? WHERE request_id = ?",
+        (json.dumps(st.session_state.saved_types), st.session_state.request_id)
+    )
 
 
 # --- Semantic Search for Item Types ---
-def get_type_embedding(item_type: str) -> np.ndarray:
-    """Get the embedding for a given item type using the model server."""
-    payload = {"type": item_type}
+def get_type_embeddings(item_types: list) -> np.ndarray:
+    """Get the embeddings for several item types in one model server request."""
     try:
-        response = requests.post(f"{MODEL_SERVER_URL}/encode", json=payload)
+        response = requests.post(
+            f"{MODEL_SERVER_URL}/encode-batch", json={"texts": item_types}, timeout=MODEL_SERVER_TIMEOUT
+        )
         response.raise_for_status()
-        embeddings = response.json().get("embeddings", [])
-        np_embeddings = np.array(embeddings)
-        return np_embeddings  # Return as a flat list
+        return np.array(response.json().get("embeddings", []))
     except requests.exceptions.RequestException as e:
         st.error(f"Error connecting to model server: {e}")
         return np.array([])
 
-def find_closest_match(item_type):
-    # Check if the item type is already saved in session state
+def find_closest_matches_batch(item_types):
+    """Match every item type in a response with at most one embedding request and one similarity pass."""
+    # Check which item types are already saved in session state
     if "saved_types" not in st.session_state:
         st.session_state.saved_types = {}
-
-    if item_type in st.session_state.saved_types:
-        # If already saved, return the saved item
-        saved_item = st.session_state.saved_types[item_type]
-        return saved_item["cb_type"], saved_item["product_code"]
-    
-    item_embedding = get_type_embedding(item_type)
-
-    # Compute cosine similarities
-    similarities = cosine_similarity(item_embedding, ALIAS_EMBEDDINGS)[0]
-
-    # Find the index of the most similar item
-    closest_index = np.argmax(similarities)
-
-    closest_alias = ALIASES[closest_index]
-    closest_pc = ALIAS_TO_PC.get(closest_alias, "")
-    closest_cb_item = PC_TO_ITEM.get(closest_pc, "")
-
-    # Save the closest known item to session state
-    st.session_state.saved_types[item_type] = {"cb_type": closest_cb_item, "product_code": closest_pc}
-    # Return the closest known item
-    return closest_cb_item, closest_pc
+    saved_types = st.session_state.saved_types
+
+    missing = [item_type for item_type in dict.fromkeys(item_types) if item_type not in saved_types]
+    if missing:
+        item_embeddings = get_type_embeddings(missing)
+
+        # Find the index of the most similar item for each type
+        if item_embeddings.ndim == 2 and item_embeddings.shape[0] == len(missing):
+            indices, _ = ALIAS_INDEX.best(item_embeddings)
+            for item_type, closest_index in zip(missing, indices):
+                closest_alias = ALIASES[closest_index]
+                closest_pc = ALIAS_TO_PC.get(closest_alias, "")
+                closest_cb_item = PC_TO_ITEM.get(closest_pc, "")
+
+                # Save the closest known item to session state
+                saved_types[item_type] = {"cb_type": closest_cb_item, "product_code": closest_pc}
+
+    # Types whose embedding could not be fetched resolve to empty strings
+    return [
+        (saved_types[item_type]["cb_type"], saved_types[item_type]["product_code"])
+        if item_type in saved_types else ("", "")
+        for item_type in item_types
+    ]
+
+# Remove any attribute from an item that is empty, None, or "unknown"
+def clean_item(item):
+    return {k: v for k, v in item.items() if v not in ("", None, "unknown", [], {})}
 
 # --- Helper Function to Parse JSON Safely ---
 def parse_json_output(text):
@@ -238,10 +281,6 @@ def parse_json_output(text):
     except json.JSONDecodeError as e:
         st.warning(f"⚠️ Failed to parse JSON: {e}")
         return None
-    
-    # Remove any attribute from parsed_output that is empty, None, or "unknown"
-    def clean_item(item):
-        return {k: v for k, v in item.items() if v not in ("", None, "unknown", [], {})}
 
     if parsed_output and "items" in parsed_output:
         parsed_output["items"] = [clean_item(item) for item in parsed_output["items"]]
@@ -273,6 +312,44 @@ def format_json_as_bullets(data, indent=0):
 
     return formatted
 
+def display_item(item):
+    """Pretty print one item as a bulleted outline, with its Chargerback match once it has one."""
+    col1, col2 = st.columns([0.4, 0.6])
+    if "cb_type" in item:
+        cb_type = item["cb_type"]
+        if cb_type.lower().startswith("ip"):
+            cb_type_formatted = cb_type.replace("p", "P", 1)
+        else:
+            cb_type_formatted = cb_type[:1].upper() + cb_type[1:] if cb_type else ""
+        col1.markdown("##### Chargerback Type: :green[" + (cb_type_formatted if cb_type_formatted else "Unknown") + "]")
+        col1.markdown("##### Product Code: :green[" + (str(item["product_code"]) if item["product_code"] else "Unknown") + "]")
+    else:
+        # Streamed before type matching, which runs once for all items at the end
+        col1.markdown(f"##### Type: :gray[{item.get('type', 'Unknown')}]")
+
+    # Highlight known CB Attributes in the left column
+    cb_attributes = {"brand", "amount", "currency_type", "color", "material", "case_color"}
+    for attr in cb_attributes:
+        if attr in item:
+            value = item[attr]
+
+            if value == 0 or value is None or value == "":
+                continue
+
+            if isinstance(value, list):
+                value = ", ".join(value)
+
+            if not isinstance(value, (int, float, np.number)):
+                value = value[0].upper() + value[1:] if value else "Unknown"
+
+            col1.markdown(f"##### {attr.replace('_', ' ').title()}: :green[{value}]")
+
+    with col2:
+        item_no_cb = {k: v for k, v in item.items() if k not in ("cb_type", "product_code", "type") and k not in cb_attributes}
+        formatted_item = format_json_as_bullets(item_no_cb)
+        st.markdown(f"```\n{formatted_item}\n```")
+    st.divider()
+
 def reset_uploader():
     st.session_state["file_uploader_key"] += 1  # Increment key to reset the uploader
 
@@ -280,7 +357,7 @@ def reset_uploader():
 PC_TO_ITEM = st.session_state.PC_TO_ITEM
 ALIAS_TO_PC = st.session_state.ALIAS_TO_PC
 ALIASES = st.session_state.ALIASES
-ALIAS_EMBEDDINGS = st.session_state.ALIAS_EMBEDDINGS
+ALIAS_INDEX = st.session_state.ALIAS_INDEX
 
 # --- Streamlit UI ---
 st.set_page_config(page_title="Chargerback Vision Demo", layout="centered")
@@ -354,7 +431,7 @@ if image_file and image_bytes:
     # --- Reset session state if a new file is uploaded ---
     if "last_image_id" not in st.session_state or st.session_state.last_image_id != current_image_id:
         # Clear only the analysis-related session state, keep UI state
-        analysis_keys = ['response', 'response_time', 'feedback', 'saved_types']
+        analysis_keys = ['response', 'response_time', 'cached', 'feedback', 'saved_types']
         for key in analysis_keys:
             if key in st.session_state:
                 del st.session_state[key]
@@ -362,8 +439,6 @@ if image_file and image_bytes:
         st.session_state.last_image_id = current_image_id
         st.session_state.request_id = str(uuid.uuid4())  # Generate a new request ID for this session
 
-    image_b64 = base64.b64encode(image_bytes).decode("utf-8")
-    st.session_state.image = image_b64  # Save the base64 image in session state
     st.image(image_bytes, caption=f"Image from {current_image_source}", use_container_width=True)
 
     # -- Initialize session state variables if not already set ---
@@ -379,86 +454,103 @@ if image_file and image_bytes:
         loading_placeholder = st.empty()
         loading_placeholder.info("⏳ Analyzing image...")
 
-        payload = {
-            "model": MODEL,
-            "prompt": SYSTEM_PROMPT,
-            "images": [image_b64],
-            "options": {
-                "temperature": TEMPERATURE,
-                "repeat_penalty": REPEAT_PENALTY,
-                "num_predict": 1024,
-            },
-            "format": "json",
-            "stream": False
-        }
-
-        try:
-            start_time = time.time()
-            response = requests.post(f"{OLLAMA_HOST}/api/generate", json=payload)
-            response.raise_for_status()
-            loading_placeholder.empty()
-            end_time = time.time()
-
-            # Parse the response and save results
-            raw_output = response.json().get("response", "").strip()
-            parsed_output = parse_json_output(raw_output)
+        # Identical bytes with the same model, prompt and options reuse the earlier result
+        result_cache = get_result_cache()
+        cache_key = result_cache.make_key(image_bytes, REQUEST_FINGERPRINT)
+        cached_output = result_cache.get(cache_key)
 
-            st.session_state.response = parsed_output
-            st.session_state.response_time = round(end_time - start_time, 2)
+        if cached_output is not None:
+            loading_placeholder.empty()
+            st.session_state.response = cached_output
+            st.session_state.response_time = 0.0
+            st.session_state.cached = True
             st.session_state.feedback = None  # Reset feedback on new analysis
-            
-            logging.info(f"Request ID: {st.session_state.request_id}, Response time: {st.session_state.response_time} seconds")
 
-        except requests.exceptions.RequestException as req_err:
-            st.error(f"Request failed: {req_err}")
-            logging.error(f"Request failed: {req_err}")
-        except Exception as e:
-            st.error(f"Unexpected error: {e}")
-            logging.error(f"Unexpected error: {e}")
+            logging.info(f"Request ID: {st.session_state.request_id}, served from result cache")
+        else:
+            # Orient, downscale and re-encode before sending to the VLM
+            prepared = preprocess_image(image_bytes, IMAGE_MAX_SIDE, IMAGE_MAX_PIXELS, IMAGE_JPEG_QUALITY)
+            logging.info(f"Image preprocessed: {prepared.summary()}")
+
+            payload = {
+                "model": MODEL,
+                "prompt": SYSTEM_PROMPT,
+                "images": [base64.b64encode(prepared.data).decode("utf-8")],
+                "options": OLLAMA_OPTIONS,
+                "format": "json",
+                "stream": True
+            }
+
+            try:
+                start_time = time.time()
+                first_item_time = None
+                found_types = []
+                chunks = []
+
+                # Stream the generation and show each item as soon as the model finishes describing it;
+                # the streamed cards are replaced by the matched results below
+                parser = IncrementalJsonParser()
+                progress = st.empty()
+                streamed_items = progress.container()
+                with requests.post(f"{OLLAMA_HOST}/api/generate", json=payload, stream=True, timeout=OLLAMA_TIMEOUT) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        chunks.append(chunk.get("response", ""))
+                        for kind, key, value in parser.feed(chunks[-1]):
+                            if kind == "item" and key == "items" and isinstance(value, dict):
+                                if first_item_time is None:
+                                    first_item_time = round(time.time() - start_time, 2)
+                                found_types.append(str(value.get("type", "item")))
+                                loading_placeholder.info(f"⏳ Analyzing image... found: {', '.join(found_types)}")
+                                with streamed_items:
+                                    display_item(clean_item(value))
+                        if chunk.get("done"):
+                            break
+                loading_placeholder.empty()
+                progress.empty()
+                end_time = time.time()
+
+                # Parse the response and save results
+                raw_output = "".join(chunks).strip()
+                parsed_output = parse_json_output(raw_output)
+                if parsed_output is not None:
+                    result_cache.set(cache_key, parsed_output)
+
+                st.session_state.response = parsed_output
+                st.session_state.response_time = round(end_time - start_time, 2)
+                st.session_state.cached = False
+                st.session_state.feedback = None  # Reset feedback on new analysis
+                
+                logging.info(f"Request ID: {st.session_state.request_id}, First item: {first_item_time} seconds, Response time: {st.session_state.response_time} seconds")
+
+            except requests.exceptions.Timeout as timeout_err:
+                st.error(f"Ollama did not answer in time: {timeout_err}")
+                logging.error(f"Request timed out: {timeout_err}")
+            except requests.exceptions.RequestException as req_err:
+                st.error(f"Request failed: {req_err}")
+                logging.error(f"Request failed: {req_err}")
+            except Exception as e:
+                st.error(f"Unexpected error: {e}")
+                logging.error(f"Unexpected error: {e}")
 
     # --- Display response and feedback section ---
     if st.session_state.response:
-        st.success(f"Response received in {st.session_state.response_time} seconds.")
+        source = " from cache" if st.session_state.get("cached") else ""
+        st.success(f"Response received{source} in {st.session_state.response_time} seconds.")
         st.subheader("Results:")
 
         if "items" in st.session_state.response:
-            for item in st.session_state.response["items"]:
-                item["cb_type"], item["product_code"] = find_closest_match(item.get("type", "unknown"))
-
-                # Pretty print results as a bulleted outline
-                col1, col2 = st.columns([0.4, 0.6])
-                cb_type = item["cb_type"]
-                if cb_type.lower().startswith("ip"):
-                    cb_type_formatted = cb_type.replace("p", "P", 1)
-                else:
-                    cb_type_formatted = cb_type[:1].upper() + cb_type[1:] if cb_type else ""
-                col1.markdown("##### Chargerback Type: :green[" + (cb_type_formatted if cb_type_formatted else "Unknown") + "]")
-                col1.markdown("##### Product Code: :green[" + (str(item["product_code"]) if item["product_code"] else "Unknown") + "]")
-                
-                # Highlight known CB Attributes in the left column
-                cb_attributes = {"brand", "amount", "currency_type", "color", "material", "case_color"}
-                for attr in cb_attributes:
-                    if attr in item:
-                        value = item[attr]
-                        
-                        if value == 0 or value is None or value == "":
-                            continue
-                        
-                        if isinstance(value, list):
-                            value = ", ".join(value)
-                        
-                        if not isinstance(value, (int, float, np.number)):
-                            value = value[0].upper() + value[1:] if value else "Unknown"
-
-                        col1.markdown(f"##### {attr.replace('_', ' ').title()}: :green[{value}]")
-
-                with col2:
-                    item_no_cb = {k: v for k, v in item.items() if k not in ("cb_type", "product_code", "type") and k not in cb_attributes}
-                    formatted_item = format_json_as_bullets(item_no_cb)
-                    st.markdown(f"```\n{formatted_item}\n```")
-                st.divider()
+            items = st.session_state.response["items"]
+            matches = find_closest_matches_batch([item.get("type", "unknown") for item in items])
+            for item, (cb_type, product_code) in zip(items, matches):
+                item["cb_type"], item["product_code"] = cb_type, product_code
+
+                display_item(item)
                 
-            log_response()
+            log_response(image_bytes)
 
         # Feedback section (allows changing/removing feedback)
         sentiment_mapping = ["negative", "positive"]